@@ -0,0 +1,231 @@
+# alerts.py — 보낸이별 자가진단 알림 규칙
+# - 규칙 예: "통증 ≥ 7", "기분이 7일 평균보다 2점 하락", "2일 동안 제출 없음", "custom:<id> = 아니오"
+# - 상태(규칙/워터마크/받는이별 최근 값/알림함)는 보낸이마다 alerts/<보낸이>.json 하나
+# - poll() 은 워터마크 이후 새로 붙은 기록만 평가한다 (전체 기록을 다시 훑지 않음)
+#   그중 날짜가 지난 기록(백업 가져오기/백필 — 받는이의 마지막 기록보다 이르거나 ALERT_LATE_DAYS 보다 오래된 것)은
+#   상태에만 반영하고 알리지 않는다. 자가진단 제출은 언제나 그 날 날짜로 들어온다
+# - 상태를 바꾸는 곳은 모두 _change(): 읽고 고쳐 저장하되, 그 사이 다른 탭/프로세스가 먼저 저장했으면
+#   (_version 이 다르면 WriteConflict) 다시 읽어 처음부터 — 같은 기록으로 알림이 두 번 생기지 않는다
+
+import os
+import copy
+import time
+import random
+import secrets
+from datetime import datetime, timedelta
+
+import storage
+from locking import WriteConflict
+
+ALERTS_DIR = f"{storage.DATA_DIR}/alerts"
+INBOX_LIMIT = 200
+UPDATE_RETRIES = 8
+ALERT_LATE_DAYS = int(os.environ.get("ALERT_LATE_DAYS", 1))  # 이 날수보다 오래된 날짜의 기록은 알리지 않는다
+
+RULE_TYPES = {
+    "compare": "값 비교",
+    "drop_vs_avg": "평균 대비 하락",
+    "no_submission": "제출 없음",
+}
+OPS = {
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+
+
+def state_path(sender): return f"{ALERTS_DIR}/{sender}.json"
+
+
+def empty_state():
+    return {"rules": [], "watermark": None, "recv": {}, "inbox": []}
+
+
+def describe(rule):
+    t = rule["type"]
+    if t == "compare":
+        v = rule["value"]
+        return f"{rule['field']} {rule['op']} {v:g}" if isinstance(v, float) else f"{rule['field']} {rule['op']} {v}"
+    if t == "drop_vs_avg":
+        return f"{rule['field']} 이(가) {rule['days']}일 평균보다 {rule['drop']}점 이상 하락"
+    if t == "no_submission":
+        return f"{rule['days']}일 동안 제출 없음"
+    return str(rule)
+
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _coerce(v, like):
+    # 규칙 값이 숫자면 숫자로, 아니면 문자열로 비교
+    n = _num(like)
+    return _num(v) if n is not None else (None if v is None else str(v))
+
+
+class AlertEngine:
+    def __init__(self, store):
+        self.store = store
+        os.makedirs(ALERTS_DIR, exist_ok=True)
+
+    # 상태
+    def load(self, sender):
+        # 저장소 캐시 값은 읽기 전용이므로 복사해서 고친다 (상태는 작게 유지됨)
+        return copy.deepcopy(self.store.load(state_path(sender), empty_state()))
+
+    def save(self, sender, state):
+        self.store.save(state_path(sender), state)
+
+    def _change(self, sender, fn):
+        """fn(state) 로 고쳐 저장하고 fn 의 결과를 돌려준다. 바뀐 것이 없으면 저장하지 않는다.
+        충돌하면 새로 읽어 fn 을 다시 부르므로 fn 은 state 만 고쳐야 한다"""
+        for attempt in range(UPDATE_RETRIES):
+            state = self.load(sender)
+            state.setdefault("_version", 0)  # 아직 파일이 없어도 먼저 만든 쪽만 이긴다
+            before = copy.deepcopy(state)
+            out = fn(state)
+            if state == before:
+                return out
+            try:
+                self.save(sender, state)
+                return out
+            except WriteConflict:
+                time.sleep(random.uniform(0, 0.01 * (2 ** attempt)))
+        raise WriteConflict(state_path(sender))
+
+    # 규칙 관리
+    def add_rule(self, sender, rule):
+        rule = dict(rule, id=f"r_{int(time.time() * 1000)}_{secrets.token_hex(2)}")
+
+        def fn(state):
+            state["rules"].append(rule)
+            if state["watermark"] is None:
+                # 처음 규칙을 만들 때부터의 제출만 평가 (과거 기록으로 알림이 쏟아지지 않게)
+                state["watermark"] = self.store.records_since(None)[1]
+        self._change(sender, fn)
+        return rule
+
+    def remove_rule(self, sender, rule_id):
+        def fn(state):
+            state["rules"] = [r for r in state["rules"] if r["id"] != rule_id]
+        self._change(sender, fn)
+
+    def mark_all_read(self, sender):
+        def fn(state):
+            for a in state["inbox"]:
+                a["read"] = True
+        self._change(sender, fn)
+
+    def unread(self, sender):
+        return [a for a in self.store.load(state_path(sender), empty_state())["inbox"] if not a.get("read")]
+
+    # 받는이 상태: 마지막 제출일, 규칙에 필요한 필드의 최근 값들 [[date, value], ...]
+    def _seed(self, state, receiver, before=None):
+        recent = [r for r in self.store.records_for([receiver]) if before is None or r["date"] < before][-31:]
+        rs = {"last_date": recent[-1]["date"] if recent else None, "values": {}}
+        state["recv"][receiver] = rs
+        for r in recent:
+            self._remember(state, rs, r)
+        return rs
+
+    def _remember(self, state, rs, rec):
+        keep_days = max([rule.get("days", 7) for rule in state["rules"] if rule["type"] == "drop_vs_avg"] or [7])
+        cutoff = (datetime.strptime(rec["date"], "%Y-%m-%d") - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+        for rule in state["rules"]:
+            if rule["type"] != "drop_vs_avg":
+                continue
+            v = _num(rec.get("answers", {}).get(rule["field"]))
+            if v is None:
+                continue
+            hist = rs["values"].setdefault(rule["field"], [])
+            hist.append([rec["date"], v])
+            rs["values"][rule["field"]] = [h for h in hist if h[0] > cutoff]
+        if not rs["last_date"] or rec["date"] > rs["last_date"]:
+            rs["last_date"] = rec["date"]
+
+    def _fire(self, state, rule, receiver, date_key, text):
+        state["inbox"].insert(0, {
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "rule_id": rule["id"], "receiver": receiver, "date": date_key,
+            "text": f"{receiver} · {date_key} · {text}", "read": False,
+        })
+        del state["inbox"][INBOX_LIMIT:]
+
+    def _evaluate(self, state, rs, receiver, rec):
+        answers = rec.get("answers", {})
+        for rule in state["rules"]:
+            t = rule["type"]
+            if t == "compare":
+                v = _coerce(answers.get(rule["field"]), rule["value"])
+                target = _coerce(rule["value"], rule["value"])
+                if v is not None and OPS[rule["op"]](v, target):
+                    self._fire(state, rule, receiver, rec["date"], f"{rule['field']} = {answers.get(rule['field'])} ({describe(rule)})")
+            elif t == "drop_vs_avg":
+                v = _num(answers.get(rule["field"]))
+                start = (datetime.strptime(rec["date"], "%Y-%m-%d") - timedelta(days=rule["days"])).strftime("%Y-%m-%d")
+                prev = [h[1] for h in rs["values"].get(rule["field"], []) if start <= h[0] < rec["date"]]
+                if v is not None and prev:
+                    avg = sum(prev) / len(prev)
+                    if avg - v >= rule["drop"]:
+                        self._fire(state, rule, receiver, rec["date"],
+                                   f"{rule['field']} {v:g} (최근 {rule['days']}일 평균 {avg:.1f})")
+
+    # 평가
+    def poll(self, sender, receivers):
+        """새로 들어온 기록만 규칙에 통과시키고, 새 알림 수를 돌려준다"""
+        return self._change(sender, lambda state: self._poll(state, receivers))
+
+    def _poll(self, state, receivers):
+        if not state["rules"]:
+            return 0
+        before = len(state["inbox"])
+        wanted = set(receivers)
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        oldest = (datetime.now() - timedelta(days=ALERT_LATE_DAYS)).strftime("%Y-%m-%d")
+        recs, mark = self.store.records_since(state["watermark"])
+        for rec in recs:
+            receiver = rec.get("username")
+            if receiver not in wanted:
+                continue
+            rs = state["recv"].get(receiver)
+            if rs is None:
+                rs = self._seed(state, receiver, before=rec["date"])  # 처음 보는 받는이: 이전 기록으로 상태 채우기
+            if rs["last_date"] and rec["date"] < rs["last_date"]:
+                continue  # 이미 본 날짜보다 이른 기록 (가져오기) — 이동평균 상태도 건드리지 않는다
+            if rec["date"] >= oldest:
+                self._evaluate(state, rs, receiver, rec)
+            self._remember(state, rs, rec)
+        state["watermark"] = mark
+
+        # 제출 없음: 받는이 수에 비례 (기록을 훑지 않음). 같은 공백에 대해 한 번만 알린다
+        for rule in [r for r in state["rules"] if r["type"] == "no_submission"]:
+            for receiver in receivers:
+                rs = state["recv"].get(receiver)
+                if rs is None:
+                    rs = self._seed(state, receiver)
+                last = rs.get("last_date")
+                if not last:
+                    continue
+                gap = (datetime.strptime(today, "%Y-%m-%d") - datetime.strptime(last, "%Y-%m-%d")).days
+                fired = rs.setdefault("nosub_fired", {})
+                if gap >= rule["days"] and fired.get(rule["id"]) != last:
+                    fired[rule["id"]] = last
+                    self._fire(state, rule, receiver, today, f"마지막 제출 {last} ({gap}일 전)")
+        return len(state["inbox"]) - before
+
+
+_engine = None
+
+
+def get_engine(store):
+    global _engine
+    if _engine is None or _engine.store is not store:
+        _engine = AlertEngine(store)
+    return _engine
@@ -0,0 +1,209 @@
+# analytics.py — 자가진단 모니터링용 열(column) 저장소와 일/주 단위 집계 (NumPy)
+# - 받는이마다 하루/주 단위 합계·개수를 프로세스 전역으로 유지하고, 새 기록이 붙으면 그 날/그 주 칸만 더한다
+# - 7일 이동평균/기준선 대비 변화는 바뀐 날부터 끝까지만 다시 계산한다 (기록 전체를 다시 훑지 않는다)
+# - 새 기록 확인은 store.records_from(마지막으로 본 위치) — 전체 목록을 다시 가져오지 않는다
+# - 원본 표는 받는이별 날짜순 목록을 병합해 필요한 페이지만 만든다
+
+import heapq
+import itertools
+import threading
+
+import numpy as np
+
+METRICS = ("mood", "sleep", "pain", "activity")
+METRIC_LABELS = {"mood": "기분", "sleep": "수면", "pain": "통증", "activity": "활동"}
+BASELINE_DAYS = 14  # 처음 이 만큼의 기록 평균을 기준선으로
+
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _grow(arr, need, fill):
+    # 하루 축 버퍼: 모자라면 두 배로 늘린다 (기록이 붙을 때마다 전체를 복사하지 않게)
+    if need <= len(arr):
+        return arr
+    out = np.full(max(need, 2 * len(arr), 64), fill, dtype=arr.dtype)
+    out[:len(arr)] = arr
+    return out
+
+
+class ReceiverSeries:
+    """한 받는이의 하루 단위 집계 (기록은 날짜순으로만 붙는다 — 앞에 끼어들면 MonitoringAnalytics 가 다시 만든다)
+    일/주 합계는 기록마다 그 칸만, 7일 이동평균/기준선 대비 변화는 바뀐 날부터 끝까지만 다시 계산한다"""
+
+    def __init__(self, username):
+        self.username = username
+        self.n = 0
+        self.last_date = None
+        self.last_rec = None
+        self.start = None   # 첫 기록 날 (하루 축의 0번)
+        self.ndays = 0
+        self._off = 0       # 첫 주 월요일부터 start 까지 날 수
+        self.counts = np.zeros(0)
+        self.sums = {m: np.zeros(0) for m in METRICS}
+        self.cnts = {m: np.zeros(0) for m in METRICS}
+        self.daily = {m: np.zeros(0) for m in METRICS}
+        self.rolling7 = {m: np.zeros(0) for m in METRICS}
+        self.delta = {m: np.zeros(0) for m in METRICS}
+        self.wsums = {m: np.zeros(0) for m in METRICS}
+        self.wcnts = {m: np.zeros(0) for m in METRICS}
+        self.base_vals = {m: [] for m in METRICS}
+        self.baseline = {m: np.nan for m in METRICS}
+        self._dirty = None          # 이동평균을 다시 계산할 첫 날
+        self._base_dirty = False    # 기준선이 바뀌어 변화 열 전체를 다시
+        self._rollup = None
+
+    def _day(self, date):
+        try:
+            d = np.datetime64(date, "D")
+        except (TypeError, ValueError):
+            return None
+        if np.isnat(d):
+            return None
+        if self.start is None:
+            self.start = d
+            self._off = int((d.astype(np.int64) - 4) % 7)  # 1970-01-01 은 목요일 → 월요일 기준
+        i = int((d - self.start).astype(np.int64))
+        if i < 0:
+            raise ValueError("기록이 날짜순이 아님")
+        if i >= self.ndays:
+            self.counts = _grow(self.counts, i + 1, 0.0)
+            for m in METRICS:
+                for buf in (self.sums, self.cnts):
+                    buf[m] = _grow(buf[m], i + 1, 0.0)
+                for buf in (self.daily, self.rolling7, self.delta):
+                    buf[m] = _grow(buf[m], i + 1, np.nan)
+                nweeks = (i + self._off) // 7 + 1
+                self.wsums[m] = _grow(self.wsums[m], nweeks, 0.0)
+                self.wcnts[m] = _grow(self.wcnts[m], nweeks, 0.0)
+            self._dirty = self.ndays if self._dirty is None else min(self._dirty, self.ndays)
+            self.ndays = i + 1
+        return i
+
+    def extend(self, recs):
+        for r in recs:
+            i = self._day(r.get("date", ""))
+            self.n += 1
+            self.last_date, self.last_rec = r.get("date"), r
+            if i is None:
+                continue
+            self.counts[i] += 1
+            w = (i + self._off) // 7
+            answers = r.get("answers", {})
+            for m in METRICS:
+                v = _num(answers.get(m))
+                if np.isnan(v):
+                    continue
+                self.sums[m][i] += v
+                self.cnts[m][i] += 1
+                self.daily[m][i] = self.sums[m][i] / self.cnts[m][i]
+                self.wsums[m][w] += v
+                self.wcnts[m][w] += 1
+                if len(self.base_vals[m]) < BASELINE_DAYS:
+                    self.base_vals[m].append(v)
+                    self.baseline[m] = float(np.mean(self.base_vals[m]))
+                    self._base_dirty = True
+            self._dirty = i if self._dirty is None else min(self._dirty, i)
+        if recs:
+            self._rollup = None
+
+    def _refresh(self):
+        # 바뀐 날 ~ 끝: 그 앞 6일을 포함한 구간의 누적합으로 7일 창 합/개수
+        lo = self._dirty
+        if lo is not None:
+            a = max(lo - 6, 0)
+            for m in METRICS:
+                cs = np.concatenate([[0.0], np.cumsum(self.sums[m][a:self.ndays])])
+                cc = np.concatenate([[0.0], np.cumsum(self.cnts[m][a:self.ndays])])
+                hi = np.arange(lo - a + 1, self.ndays - a + 1)
+                win_c = cc[hi] - cc[np.maximum(hi - 7, 0)]
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    self.rolling7[m][lo:self.ndays] = np.where(win_c > 0, (cs[hi] - cs[np.maximum(hi - 7, 0)]) / win_c,
+                                                               np.nan)
+        if self._base_dirty:
+            lo = 0
+        if lo is not None:
+            for m in METRICS:
+                self.delta[m][lo:self.ndays] = self.rolling7[m][lo:self.ndays] - self.baseline[m]
+        self._dirty, self._base_dirty = None, False
+
+    def rollup(self):
+        """일별 평균 / 7일 이동평균 / 기준선 대비 변화 / 주간 평균 (바뀐 끝부분만 다시 계산, 배열은 다음 extend 전까지 유효)"""
+        if self._rollup is not None:
+            return self._rollup
+        if self.n == 0 or self.start is None:
+            self._rollup = {"days": np.empty(0, dtype="datetime64[D]"), "daily": {}, "rolling7": {},
+                            "delta": {}, "baseline": {}, "weeks": np.empty(0, dtype="datetime64[D]"), "weekly": {}}
+            return self._rollup
+        self._refresh()
+        nd, nw = self.ndays, (self.ndays - 1 + self._off) // 7 + 1
+        weekly = {}
+        for m in METRICS:
+            wc = self.wcnts[m][:nw]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                weekly[m] = np.where(wc > 0, self.wsums[m][:nw] / wc, np.nan)
+        days = self.start + np.arange(nd)
+        self._rollup = {"days": days, "counts": self.counts[:nd],
+                        "daily": {m: self.daily[m][:nd] for m in METRICS},
+                        "rolling7": {m: self.rolling7[m][:nd] for m in METRICS},
+                        "delta": {m: self.delta[m][:nd] for m in METRICS},
+                        "baseline": dict(self.baseline),
+                        "weeks": (self.start - self._off) + 7 * np.arange(nw), "weekly": weekly}
+        return self._rollup
+
+    def summary(self):
+        r = self.rollup()
+        row = {"아이디": self.username, "기록 수": self.n, "마지막 기록": self.last_date or "-"}
+        if self.n and self.ndays:
+            for m in METRICS:
+                last = r["rolling7"][m][-1]
+                d = r["delta"][m][-1]
+                row[f"{METRIC_LABELS[m]}(7일)"] = None if np.isnan(last) else round(float(last), 2)
+                row[f"{METRIC_LABELS[m]} 변화"] = None if np.isnan(d) else round(float(d), 2)
+        return row
+
+
+class MonitoringAnalytics:
+    """프로세스 전역 — 받는이별 ReceiverSeries 를 새 기록만큼만 갱신해서 돌려준다"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def series(self, store, username):
+        with self._lock:
+            s = self._series.get(username)
+            if s is not None:
+                # 마지막으로 본 기록부터만 읽는다 (그 기록이 그 자리에 그대로면 뒤에 붙은 것만 이어 붙임)
+                tail = store.records_from(username, max(s.n - 1, 0))
+                if s.n == 0 or (tail and tail[0] == s.last_rec):
+                    try:
+                        s.extend(tail[1:] if s.n else tail)
+                        return s
+                    except ValueError:
+                        pass  # 날짜가 거꾸로 — 아래에서 다시 만든다
+            s = ReceiverSeries(username)  # 처음이거나 중간에 끼어든 기록이 있으면 다시 만든다
+            s.extend(store.records_for([username]))
+            self._series[username] = s
+            return s
+
+
+def page_records(store, usernames, page, page_size):
+    """받는이별 날짜순 목록을 (날짜, 아이디) 내림차순으로 병합해 한 페이지만 꺼낸다"""
+    lists = [store.records_for([u]) for u in usernames]
+    total = sum(len(lst) for lst in lists)
+    merged = heapq.merge(*[reversed(lst) for lst in lists],
+                         key=lambda r: (r.get("date", ""), r.get("username", "")), reverse=True)
+    start = page * page_size
+    return list(itertools.islice(merged, start, start + page_size)), total
+
+
+_analytics = MonitoringAnalytics()
+
+
+def get_analytics():
+    return _analytics
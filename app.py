@@ -1,55 +1,146 @@
 # app.py — 하루 추억 캘린더 (안정판: 매직링크 제거, Keep-Alive만 유지)
-# - Streamlit Cloud 대비: st_autorefresh(있으면 사용)로 15분 간격 keep-alive
+# - Streamlit Cloud 대비: 빈 fragment(run_every)로 15분 간격 keep-alive (페이지 본문은 다시 실행하지 않음)
 # - 모달/iframe 미사용. 버튼 이벤트만 사용(날짜 클릭 안정)
 # - 기능: 로그인/회원가입(해시), 그룹, 달력 꾸미기, 추억 기록, 자가진단(받는이), 모니터링(보낸이)
 
 import os
-import json
-import hashlib
+import html
+import functools
 import calendar
 from datetime import datetime
 import streamlit as st
-
-# -------------------- 기본 설정 & 폴더 --------------------
-st.set_page_config(page_title="하루 추억 캘린더", layout="wide")
-os.makedirs("accounts", exist_ok=True)
-os.makedirs("accounts/memories", exist_ok=True)
-os.makedirs("accounts/decos", exist_ok=True)
-
-# -------------------- Keep-Alive (있으면 사용, 없으면 무시) --------------------
 try:
-    from streamlit_autorefresh import st_autorefresh
-    st_autorefresh(interval=15 * 60 * 1000, key="keepalive_15m")  # 15분마다 자동 새로고침
-except Exception:
-    pass
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:  # fragment 이전 버전
+    def get_script_run_ctx(): return None
+import pandas as pd
+import altair as alt
+import storage
+import migrations
+import profiling
+import replication
+from profiling import span
+from sessions import get_sessions
+from passwords import hash_pw, verify_pw, verify_missing, needs_rehash, throttle, throttle_ip, PasswordBusy
+from analytics import get_analytics, page_records, METRICS, METRIC_LABELS
+from alerts import get_engine, describe as describe_rule, RULE_TYPES, OPS
+from blobs import get_blobs, kind_of, valid_attachment, IMAGE_TYPES, AUDIO_TYPES, BlobTooLarge
+from media import get_pipeline
+from search import get_search
+import transfer
+import changefeed
+
+# -------------------- 기본 설정 & 저장소 --------------------
+st.set_page_config(page_title="하루 추억 캘린더", layout="wide")
+replicator = replication.get_replicator()  # 버킷 복제 (콜드 스타트면 먼저 복원) — 저장소를 열기 전에
+store = storage.get_store()  # STORAGE_BACKEND=json|sqlite (폴더 생성은 저장소가 담당)
+if replicator:
+    replicator.backpressure()  # 업로드가 되는데 한참 밀렸을 때만 잠시 (잠금을 쥐기 전, 실행 시작에서)
+
+@st.cache_resource
+def startup():
+    # 프로세스 시작 시 한 번만: 스키마 마이그레이션(비밀번호 해시, 샤딩 등) + 캐시/인덱스 데우기(백그라운드)
+    changefeed.watch(storage.DATA_DIR)  # 다른 프로세스의 쓰기도 변경 알림으로 (watchdog 이 있으면)
+    return migrations.startup(store)
+
+startup()
+analytics = get_analytics()  # 받는이별 자가진단 열 저장소 (프로세스 전역)
+alert_engine = get_engine(store)  # 보낸이별 알림 규칙/알림함
+sessions = get_sessions(store)  # 토큰(?sid=) 기반 로그인 세션
+blobs = get_blobs()  # 첨부 원본 (sha256 주소, 중복 제거)
+media = get_pipeline()  # 썸네일/음성 정규화 작업 풀 (별도 프로세스)
+search_index = get_search(store)  # 사용자별 추억 전문 검색 (bigram 역색인)
+feed = changefeed.get_feed()  # 저장소 쓰기 알림 — 모니터링/달력/질문 목록이 구독
+MONITOR_PAGE_SIZE = 50
+USER_PICK_LIMIT = int(os.environ.get("USER_PICK_LIMIT", 20))  # 아이디 검색 결과 최대 개수
+THUMB_WAIT_TICKS = int(os.environ.get("THUMB_WAIT_TICKS", 20))  # 썸네일을 기다리며 달력을 다시 읽는 최대 횟수
 
 # -------------------- 유틸 --------------------
-def load_json(path, default):
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return default
-    return default
-
-def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def load_json(path, default): return store.load(path, default)
+def save_json(path, data): store.save(path, data)
+
+def load_mems(username): return store.load_mems(username)
+def save_mems(username, data): store.save_mems(username, data)
+
+def load_decos(username): return store.load_decos(username)
+def save_decos(username, data): store.save_decos(username, data)
+
+# 보이는 달/하루만 읽기 (월별 샤드)
+def load_decos_month(username, year, month): return store.load_decos_month(username, f"{int(year)}-{int(month):02d}")
+def load_day_mems(username, date_key): return store.mems_for_day(username, date_key)
+
+# 부분 재실행(fragment): 지원하지 않는 구버전이면 일반 함수로 동작
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+def fragment(fn=None, *, run_every=None):
+    # run_every: 그 주기(초)마다 그 영역만 다시 돈다 (변경 알림 구독용). 구버전이면 일반 함수
+    if fn is None:
+        return functools.partial(fragment, run_every=run_every)
+    if _fragment is None:
+        return fn
+    wrap = functools.partial(_fragment, run_every=run_every) if run_every else _fragment
+    # 측정이 켜져 있으면 fragment 만 다시 도는 rerun 도 기록 하나로 남긴다
+    if not profiling.ENABLED:
+        return wrap(fn)
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        with profiling.fragment_scope(fn.__name__, partial=in_fragment_rerun()):
+            return fn(*args, **kwargs)
+    return wrap(run)
+
+def live_state(key, ident, kinds, refresh, users=None):
+    """변경 알림 구독: refresh(prev, evs) 가 cursor 이후 관련 이벤트만 보고 값을 고친다
+    (prev=None 이면 처음이거나 알림 보관 범위를 넘긴 것 → 전부 읽기). 값과 cursor 는 세션에"""
+    box = st.session_state.get(key)
+    if box is None or box["ident"] != ident:
+        box = st.session_state[key] = {"ident": ident, "cursor": feed.seq, "value": None}
+        evs = []
+    else:
+        evs, box["cursor"] = feed.since(box["cursor"], kinds, users)
+    prev = box["value"] if evs is not None else None
+    box["value"] = refresh(prev, evs or [])
+    return box["value"]
+
+def live_stale(key, kinds, users=None):
+    # live_state(key, ...) 값이 낡았는지만 본다 (cursor 는 그대로 — 다시 그릴 때 refresh 가 이벤트를 받는다)
+    box = st.session_state.get(key)
+    if box is None:
+        return False
+    evs, _ = feed.since(box["cursor"], kinds, users)
+    return evs is None or bool(evs) or bool(isinstance(box["value"], dict) and box["value"].get("pending"))
+
+@fragment(run_every=changefeed.FEED_POLL_SECONDS)
+def feed_watch(*watches):
+    # 아무것도 그리지 않는 fragment: 주기마다 알림만 확인하고, 관련 변경이 있을 때만 다시 실행한다
+    # (표/차트/달력을 주기마다 다시 보내지 않는다 — 쉬고 있는 탭은 이 확인만 돈다)
+    if any(live_stale(*w) for w in watches):
+        st.rerun()
 
-def hash_pw(pw: str) -> str:
-    return hashlib.sha256(pw.encode("utf-8")).hexdigest()
+def in_fragment_rerun():
+    # fragment 만 다시 도는 중인지 (전체 실행 중에 fragment 본문을 지나는 경우는 아님 — 그때는 scope="fragment" 불가)
+    ctx = get_script_run_ctx()
+    return bool(getattr(ctx, "fragment_ids_this_run", None))
 
-def is_sha256_hex(s: str) -> bool:
-    return isinstance(s, str) and len(s) == 64 and all(c in "0123456789abcdef" for c in s)
+def rerun_fragment():
+    # fragment 재실행 중이면 그 영역만, 전체 실행 중이거나 구버전이면 전체를 다시 실행
+    if _fragment is not None and in_fragment_rerun():
+        st.rerun(scope="fragment")
+    else:
+        st.rerun()
 
-def mem_path(username): return f"accounts/memories/{username}.json"
-def load_mems(username): return load_json(mem_path(username), {"memories": {}})
-def save_mems(username, data): save_json(mem_path(username), data)
+def receivers_of(username):
+    # 멤버십 인덱스(같은 그룹 사람)에서 바로 — 전체 그룹을 훑지 않는다
+    return store.receivers_of(username)
 
-def deco_path(username): return f"accounts/decos/{username}.json"
-def load_decos(username): return load_json(deco_path(username), {"decos": {}})
-def save_decos(username, data): save_json(deco_path(username), data)
+def user_picker(label, key, exclude=(), multi=False):
+    """아이디 앞부분으로 찾아 고르기 (전체 사용자 목록을 만들지 않는다)"""
+    q = st.text_input(f"{label} — 아이디 검색", key=f"{key}_q", placeholder="아이디 앞부분을 입력하세요").strip()
+    hits = store.search_users(q, USER_PICK_LIMIT, exclude) if q else []
+    if multi:
+        chosen = [u for u in st.session_state.get(key, []) if u not in exclude]
+        return st.multiselect(label, list(dict.fromkeys(chosen + hits)), key=key)
+    return st.selectbox(label, ["선택 없음"] + hits, key=key)
 
 def get_query_params():
     try:
@@ -69,6 +160,27 @@ def set_query_params(**kwargs):
         except Exception:
             pass
 
+def clear_query_param(key):
+    try:
+        if key in st.query_params:
+            del st.query_params[key]
+        return
+    except Exception:
+        qp = get_query_params()
+        qp.pop(key, None)
+        try:
+            st.experimental_set_query_params(**qp)
+        except Exception:
+            pass
+
+def ip_keys():
+    # 로그인 제한용 IP 키 (믿을 수 있는 주소가 없으면 빈 튜플 → 아이디 별로만 센다)
+    try:
+        ip = throttle_ip(st.context.headers.get("X-Forwarded-For", ""), st.context.ip_address)
+    except Exception:
+        ip = None
+    return (f"ip:{ip}",) if ip else ()
+
 def get_query_value(key, default=None):
     qp = get_query_params()
     if key in qp:
@@ -77,25 +189,10 @@ def get_query_value(key, default=None):
     return default
 
 # -------------------- 데이터 파일 --------------------
-ACCOUNTS_FILE  = "accounts/accounts.json"
-GROUPS_FILE    = "accounts/groups.json"
-SESSION_FILE   = "accounts/sessions.json"
-DIAGNOSIS_FILE = "accounts/diagnosis.json"
-QUESTIONS_FILE = "accounts/questions.json"
-
-accounts       = load_json(ACCOUNTS_FILE, {"users": []})
-groups         = load_json(GROUPS_FILE, {"groups": []})
-diagnosis_data = load_json(DIAGNOSIS_FILE, {"records": []})
-questions_data = load_json(QUESTIONS_FILE, {"custom_questions": []})
-
-# 비밀번호 평문 → 해시 마이그레이션
-changed = False
-for u in accounts["users"]:
-    if not is_sha256_hex(u.get("password", "")):
-        u["password"] = hash_pw(u.get("password", ""))
-        changed = True
-if changed:
-    save_json(ACCOUNTS_FILE, accounts)
+ACCOUNTS_FILE  = storage.ACCOUNTS_FILE
+GROUPS_FILE    = storage.GROUPS_FILE
+DIAGNOSIS_FILE = storage.DIAGNOSIS_FILE
+QUESTIONS_FILE = storage.QUESTIONS_FILE
 
 # -------------------- 세션 --------------------
 for k, v in [
@@ -104,20 +201,47 @@ for k, v in [
     ("role", ""),
     ("selected_date", None),
     ("theme", "기본"),
+    ("prof_session", os.urandom(4).hex()),
 ]:
     if k not in st.session_state:
         st.session_state[k] = v
 
-# 이전 세션 복원
-if not st.session_state.logged_in and os.path.exists(SESSION_FILE):
-    sess = load_json(SESSION_FILE, {})
+profiling.begin_rerun(st.session_state.prof_session, st.session_state.username)  # PROFILE=1 일 때만 기록
+
+# 이전 세션 복원 (이 브라우저의 ?sid= 토큰으로만)
+if not st.session_state.logged_in:
+    sid = get_query_value("sid")
+    sess = sessions.get(sid) if sid else None
     if sess:
         st.session_state.logged_in = True
-        st.session_state.username = sess.get("username", "")
-        st.session_state.role = sess.get("role", "")
+        st.session_state.username = sess["username"]
+        st.session_state.role = sess["role"]
+    elif sid:
+        clear_query_param("sid")  # 만료되었거나 없는 토큰
+
+# -------------------- Keep-Alive --------------------
+# 빈 fragment 만 주기적으로 다시 실행 → 연결은 유지하되 파일 읽기/달력 렌더링은 하지 않는다
+KEEPALIVE_SECONDS = int(os.environ.get("KEEPALIVE_SECONDS", 15 * 60))
+
+def keepalive():
+    # 로그인 중이면 세션 만료만 연장 (프로세스 LRU 조회)
+    sid = get_query_value("sid")
+    if sid and st.session_state.logged_in:
+        sessions.get(sid)
+
+if hasattr(st, "fragment"):
+    st.fragment(run_every=KEEPALIVE_SECONDS)(keepalive)()
+else:
+    try:
+        # 오래된 Streamlit: 있으면 전체 새로고침으로 대신
+        from streamlit_autorefresh import st_autorefresh
+        st_autorefresh(interval=KEEPALIVE_SECONDS * 1000, key="keepalive_15m")
+    except Exception:
+        pass
 
 # -------------------- 로그인/회원가입 --------------------
 if not st.session_state.logged_in:
+    profiling.set_page("로그인")
     st.title("💌 하루 추억 캘린더 로그인")
     mode = st.radio("선택하세요", ["로그인", "회원가입"], horizontal=True)
 
@@ -126,29 +250,52 @@ if not st.session_state.logged_in:
         pw = st.text_input("비밀번호", type="password")
         role = st.selectbox("역할", ["보낸이", "받는이"])
         if st.button("회원가입"):
-            if not uid or not pw:
+            keys = ip_keys()
+            wait = throttle.wait_time(*keys)
+            if wait:
+                st.error(f"요청이 너무 많습니다. {int(wait) + 1}초 후 다시 시도해주세요.")
+            elif not uid or not pw:
                 st.warning("아이디와 비밀번호를 입력해주세요.")
-            elif any(u["username"] == uid for u in accounts["users"]):
+            elif store.get_user(uid):
+                throttle.fail(*keys)  # 실패만 센다 (있는 아이디를 찔러보는 것)
                 st.warning("이미 존재하는 아이디입니다.")
             else:
-                accounts["users"].append({"username": uid, "password": hash_pw(pw), "role": role})
-                save_json(ACCOUNTS_FILE, accounts)
-                st.success("가입 완료! 로그인해주세요.")
+                try:
+                    store.add_user({"username": uid, "password": hash_pw(pw), "role": role})
+                    st.success("가입 완료! 로그인해주세요.")
+                except storage.UserExists:
+                    throttle.fail(*keys)
+                    st.warning("이미 존재하는 아이디입니다.")
+                except PasswordBusy:
+                    st.error("요청이 많아 잠시 후 다시 시도해주세요.")
 
     else:
         uid = st.text_input("아이디")
         pw = st.text_input("비밀번호", type="password")
         if st.button("로그인"):
-            hashed = hash_pw(pw)
-            user = next((u for u in accounts["users"] if u["username"] == uid and u["password"] == hashed), None)
-            if user:
-                st.session_state.logged_in = True
-                st.session_state.username = uid
-                st.session_state.role = user["role"]
-                save_json(SESSION_FILE, {"username": uid, "role": user["role"]})
-                st.rerun()
+            keys = (f"user:{uid}",) + ip_keys()
+            wait = throttle.login_wait(*keys)
+            if wait:
+                st.error(f"로그인 시도가 너무 많습니다. {int(wait) + 1}초 후 다시 시도해주세요.")
             else:
-                st.warning("아이디 또는 비밀번호가 올바르지 않습니다.")
+                user = store.get_user(uid)
+                try:
+                    ok = verify_pw(pw, user["password"]) if user else verify_missing(pw)
+                    if ok and needs_rehash(user["password"]):
+                        store.set_password(uid, hash_pw(pw))  # 예전 sha256 → scrypt
+                except PasswordBusy:
+                    ok = None
+                    st.error("요청이 많아 잠시 후 다시 시도해주세요.")
+                if ok:
+                    throttle.reset(keys[0])
+                    st.session_state.logged_in = True
+                    st.session_state.username = uid
+                    st.session_state.role = user["role"]
+                    set_query_params(sid=sessions.create(uid, user["role"]))
+                    st.rerun()
+                elif ok is False:
+                    throttle.fail(*keys)
+                    st.warning("아이디 또는 비밀번호가 올바르지 않습니다.")
 
 # -------------------- 로그인 후 --------------------
 else:
@@ -157,15 +304,38 @@ else:
 
     # 사이드바: 사용자/로그아웃
     st.sidebar.markdown(f"**{username}님 ({role})**")
+    if replication.init_error:
+        st.sidebar.warning("백업 저장소에 연결하지 못했습니다. 이 서버에만 저장됩니다.")
+    elif replicator and replicator.failing:
+        st.sidebar.warning(f"백업 업로드가 실패하고 있습니다 ({replicator.last_error}). 이 서버에는 저장됩니다.")
+    elif replicator and replicator.status()["lag"] > replication.REPLICA_MAX_LAG:
+        st.sidebar.warning("백업이 밀려 있습니다. 잠시 후 다시 확인해주세요.")
     if st.sidebar.button("로그아웃"):
         st.session_state.logged_in = False
         st.session_state.username = ""
         st.session_state.role = ""
         st.session_state.selected_date = None
-        if os.path.exists(SESSION_FILE):
-            os.remove(SESSION_FILE)
+        sid = get_query_value("sid")
+        if sid:
+            sessions.delete(sid)
+            clear_query_param("sid")
         st.rerun()
 
+    # 알림함 (보낸이): 지난번 이후 새로 들어온 자가진단만 규칙으로 평가
+    my_receivers = receivers_of(username) if role == "보낸이" else []  # 한 번만 구해 알림함/모니터링이 같이 쓴다
+    if role == "보낸이":
+        alert_engine.poll(username, my_receivers)
+        unread = alert_engine.unread(username)
+        with st.sidebar.expander(f"🔔 알림 ({len(unread)})", expanded=bool(unread)):
+            if unread:
+                for al in unread[:20]:
+                    st.markdown(f"- {al['text']}")
+                if st.button("모두 읽음", key="alerts_read"):
+                    alert_engine.mark_all_read(username)
+                    st.rerun()
+            else:
+                st.caption("새 알림이 없습니다.")
+
     # 메뉴
     menu_items = ["달력"]
     if role == "받는이":
@@ -173,7 +343,25 @@ else:
     elif role == "보낸이":
         menu_items.append("자가진단 모니터링")
     menu_items.append("그룹 편집")
+    menu_items.append("백업")
     menu = st.sidebar.radio("메뉴", menu_items, index=0)
+    profiling.set_page(menu, username)
+
+    # 성능 패널 (PROFILE=1, PROFILE_ADMINS 에 있는 사용자만): 지난 rerun 들의 구간별 시간
+    if profiling.can_view(username):
+        with st.sidebar.expander("⏱ 성능"):
+            stats = profiling.page_stats()
+            if stats:
+                st.dataframe([{"페이지": s["page"], "횟수": s["n"], "p50(ms)": s["p50"], "p95(ms)": s["p95"]}
+                              for s in stats], use_container_width=True, hide_index=True)
+                for r in profiling.recent(10):
+                    parts = sorted(r["spans"].items(), key=lambda kv: -kv[1][0])[:4]
+                    st.caption(f"{r['ts'][11:]} · {r['page']} · {r['total_ms']:.0f}ms"
+                               f"{' (중단)' if r['interrupted'] else ''} — "
+                               + ", ".join(f"{k} {v[0]:.0f}" for k, v in parts)
+                               + f", 기타 {r['other_ms']:.0f} · 읽기 {r['bytes_read']}B 쓰기 {r['bytes_written']}B")
+            else:
+                st.caption("아직 기록이 없습니다.")
 
     # 전역 큰 글꼴/버튼(어르신 UI)
     st.markdown("""
@@ -193,7 +381,39 @@ else:
     STICKER_PRESETS = ["🌸", "🌼", "🌟", "💖", "✨", "🍀", "🧸", "🎀", "📸", "☕", "🍰", "🎈", "📝", "👣", "🎵"]
 
 
-        # -------------------- 상세(상단 고정 오버레이) --------------------
+    # -------------------- 첨부 (사진/음성) --------------------
+    def save_attachments(files):
+        # 업로드를 조각 단위로 blob 저장소에 옮긴다 (같은 내용은 한 번만 저장)
+        atts = []
+        for f in files:
+            kind = kind_of(f.name)
+            if kind is None:
+                continue
+            f.seek(0)
+            sha, size, _ = blobs.put_stream(f)
+            atts.append({"sha": sha, "kind": kind, "name": f.name, "mime": f.type, "size": size})
+        return atts
+
+    def render_attachments(atts):
+        for att in filter(valid_attachment, atts):  # 예전에 가져온 잘못된 첨부는 건너뛴다
+            if att["kind"] == "image":
+                thumb = media.thumbnail(att["sha"])
+                if thumb:
+                    st.image(thumb, caption=att.get("name"), width=240)
+                elif media.failed(att):
+                    st.caption(f"🖼 {att.get('name', '')} (미리보기를 만들 수 없어요)")
+                else:
+                    media.process(att)  # 재시작 등으로 빠진 썸네일은 다시 맡긴다
+                    st.caption(f"🖼 {att.get('name', '')} (미리보기 준비 중…)")
+            elif att["kind"] == "audio":
+                norm = media.audio(att["sha"])
+                if norm is None and not media.failed(att):
+                    media.process(att)
+                st.audio(norm or blobs.path(att["sha"]))
+
+    # -------------------- 상세(상단 고정 오버레이) --------------------
+    # fragment: 질문 버튼/추억 저장은 이 패널만 다시 그린다
+    @fragment
     def render_detail_panel(sel_date: str):
 
         # ✨ 오늘의 질문 힌트용 세션 값 초기화
@@ -235,10 +455,11 @@ else:
                     st.session_state["memory_hint"] = q + "\n"
 
         # 기존에 저장된 추억들 목록
-        mem = load_mems(username)["memories"].get(sel_date, [])
+        mem = load_day_mems(username, sel_date)
         if mem:
             for item in mem:
                 st.markdown(f"- **{item['title']}** — {item['text']}")
+                render_attachments(item.get("attachments", []))
         else:
             st.info("아직 기록이 없어요!")
 
@@ -250,51 +471,195 @@ else:
                 height=120,
                 value=st.session_state.get("memory_hint", "")
             )
+            files = st.file_uploader("📸 사진 / 🎙 음성 (선택)", type=list(IMAGE_TYPES + AUDIO_TYPES),
+                                     accept_multiple_files=True)
             save_btn = st.form_submit_button("저장")
             if save_btn:
                 if not t or not c:
                     st.warning("제목과 내용을 입력해주세요.")
                 else:
-                    data = load_mems(username)
-                    data["memories"].setdefault(sel_date, []).append(
-                        {"title": t, "text": c, "ts": datetime.now().isoformat(timespec="seconds")}
-                    )
-                    save_mems(username, data)
-                    st.success("추억이 저장되었습니다!")
-                    # 저장 후 힌트 비우기
-                    st.session_state["memory_hint"] = ""
-                    st.rerun()
-
-        # 패널 닫기 버튼
-        if st.button("닫기", key=f"close_{sel_date}"):
-            st.session_state.selected_date = None
-            st.rerun()
+                    try:
+                        atts = save_attachments(files or [])
+                    except BlobTooLarge:
+                        atts = None
+                        st.warning("첨부 파일이 너무 큽니다.")
+                    if atts is not None:
+                        item = {"title": t, "text": c, "ts": datetime.now().isoformat(timespec="seconds")}
+                        if atts:
+                            item["attachments"] = atts
+                        store.add_memory(username, sel_date, item)
+                        search_index.add(username, sel_date, item)
+                        for att in atts:
+                            media.process(att)  # 썸네일/정규화는 백그라운드 — 기다리지 않는다
+                        st.success("추억이 저장되었습니다!")
+                        # 저장 후 힌트 비우기
+                        st.session_state["memory_hint"] = ""
+                        rerun_fragment()
 
     # -------------------- 달력 --------------------
-    if menu == "달력":
-        st.title("🗓 하루 추억 달력")
-        decos = load_decos(username)
+    def month_thumbs(username, year, month):
+        # 날짜마다 첫 사진의 작은 썸네일(data: URI, 만들어진 것만 — 없으면 칸에 스티커만) + 아직 만드는 중인 사진이 있는지
+        # 만들다 실패한 사진은 기다리지 않는다. 맡긴 적 없는 사진(재시작 등)은 여기서 다시 맡긴다
+        out, pending = {}, False
+        mems = store.load_mems_month(username, f"{year}-{month:02d}").get("memories", {})
+        for date_key, items in mems.items():
+            for item in items:
+                att = next((a for a in item.get("attachments", []) if valid_attachment(a) and a["kind"] == "image"),
+                           None)
+                cell = att and media.cell_thumbnail(att["sha"])
+                if cell:
+                    out[date_key] = cell
+                    break
+                if att is not None and not media.failed(att):
+                    media.process(att)  # 이미 만드는 중이면 그 작업을 그대로 쓴다
+                    pending = True
+        return out, pending
+
+    def month_grid_html(year, month, decos, selected=None, thumbs=None):
+        # 한 달 전체를 HTML 한 덩어리로 (칸마다 st.markdown 을 부르지 않는다)
+        cells = [f"<div class='cal-head'>{w}</div>" for w in "월화수목금토일"]
+        for week in calendar.monthcalendar(year, month):
+            for day in week:
+                if day == 0:
+                    cells.append("<div></div>")
+                    continue
+                date_key = f"{year}-{month:02d}-{day:02d}"
+                dconf = decos.get(date_key, {})
+                bg = html.escape(str(dconf.get("bg", "#ffffff")), quote=True)
+                radius = html.escape(str(dconf.get("radius", "12px")), quote=True)
+                stickers = html.escape(" ".join(dconf.get("stickers", [])))
+                sel = " cal-sel" if date_key == selected else ""
+                thumb = (thumbs or {}).get(date_key)
+                photo = (f"<img class='cal-thumb' loading='lazy' alt='' src='{html.escape(thumb, quote=True)}'>"
+                         if thumb else "")
+                cells.append(
+                    f"<div class='cal-card{sel}' style='background:{bg}; border-radius:{radius};'>"
+                    f"<div class='cal-day'>{day}</div>"
+                    f"<div class='cal-stickers'>{stickers}</div>"
+                    f"{photo}"
+                    f"</div>"
+                )
+        return "<div class='cal-grid'>" + "".join(cells) + "</div>"
+
+    def pick_date(pick_key, ym):
+        day = st.session_state.get(pick_key)
+        st.session_state.selected_date = f"{ym}-{int(day):02d}" if day else None
 
+    def clear_date(pick_key):
+        st.session_state.selected_date = None
+        st.session_state[pick_key] = None
+
+    def jump_to(date_key):
+        # 검색 결과 → 그 달로 이동 + 날짜 열기
+        y, m, d = (int(x) for x in date_key.split("-"))
+        st.session_state.cal_year, st.session_state.cal_month = y, m
+        st.session_state[f"day_pick_{y}-{m:02d}"] = d
+        st.session_state.selected_date = date_key
+
+    # 달력 칸: 이 사람의 그 달 추억/꾸미기 알림이 올 때만 다시 읽는다 (다른 세션/기기에서 저장해도 몇 초 안에)
+    def month_grid(year, month, selected):
+        ym = f"{year}-{month:02d}"
+
+        def refresh(prev, evs):
+            changed = prev is None or any(not e.dates or any(d[:7] == ym for d in e.dates) for e in evs)
+            if changed or prev["pending"]:
+                # 썸네일만 기다리는 중이면 THUMB_WAIT_TICKS 번까지만 다시 읽는다 (새 알림이 오면 처음부터)
+                waits = 0 if changed else prev["waits"] + 1
+                thumbs, pending = month_thumbs(username, year, month)
+                return {"decos": load_decos_month(username, year, month)["decos"], "thumbs": thumbs,
+                        "pending": pending and waits < THUMB_WAIT_TICKS, "waits": waits}
+            return prev
+
+        with span("calendar.grid"):
+            grid = live_state("grid_live", (username, ym), ("memory", "deco"), refresh, users={username})
+            st.markdown(month_grid_html(year, month, grid["decos"], selected, grid["thumbs"]),
+                        unsafe_allow_html=True)
+
+    # 연간 히트맵: 하루 요약(추억 수/꾸미기/기분/통증)만 읽어 차트 하나로 (추억 본문은 읽지 않는다)
+    HEAT_METRICS = {"추억": ("mems", "greens"), "기분": ("mood", "blues"), "통증": ("pain", "reds")}
+
+    def year_frame(username, year):
+        days = store.day_summaries(username, year)
+        idx = pd.date_range(f"{year}-01-01", f"{year}-12-31")
+        keys = idx.strftime("%Y-%m-%d")
+        df = pd.DataFrame.from_dict(days, orient="index", columns=["mems", "deco", "mood", "pain"]).reindex(keys)
+        df["mems"] = df["mems"].fillna(0).astype(int)
+        df["deco"] = df["deco"].fillna(0).astype(int)
+        df["date"] = keys
+        df["week"] = (idx.dayofyear - 1 + idx[0].weekday()) // 7  # 월요일 시작 주 번호
+        df["weekday"] = idx.weekday
+        return df
+
+    def year_heatmap(df, metric):
+        field, scheme = HEAT_METRICS[metric]
+        pick = alt.selection_point(name="pick", fields=["date"], on="click")
+        has = "datum.mems > 0" if field == "mems" else f"isValid(datum.{field})"
+        return alt.Chart(df).mark_rect(cornerRadius=2, strokeWidth=1.5).encode(
+            x=alt.X("week:O", axis=None),
+            y=alt.Y("weekday:O", axis=alt.Axis(title=None, labelExpr="['월','화','수','목','금','토','일'][datum.value]")),
+            color=alt.condition(has, alt.Color(f"{field}:Q", scale=alt.Scale(scheme=scheme), title=metric),
+                                alt.value("#eeeeee")),
+            stroke=alt.condition("datum.deco > 0", alt.value("#F39C12"), alt.value(None)),
+            tooltip=[alt.Tooltip("date:N", title="날짜"), alt.Tooltip("mems:Q", title="추억"),
+                     alt.Tooltip("mood:Q", title="기분"), alt.Tooltip("pain:Q", title="통증")],
+        ).add_params(pick).properties(height=150)
+
+    def heat_pick(key):
+        # 히트맵 칸 클릭 → 그 날짜 열기
+        state = st.session_state.get(key) or {}
+        points = (state.get("selection") or {}).get("pick") or []
+        if points and points[0].get("date"):
+            jump_to(points[0]["date"])
+
+    # fragment: 날짜 선택/꾸미기 저장은 달력 영역만 다시 그린다 (전역 로드·CSS·사이드바는 그대로)
+    @fragment
+    def calendar_page():
         left, right = st.columns([1, 3], gap="large")
         with left:
             st.markdown("#### 📅 달력 조정")
-            year = st.number_input("연도", 2000, 2100, datetime.now().year, step=1)
-            month = st.number_input("월", 1, 12, datetime.now().month, step=1)
+            st.session_state.setdefault("cal_year", datetime.now().year)
+            st.session_state.setdefault("cal_month", datetime.now().month)
+            year = int(st.number_input("연도", 2000, 2100, step=1, key="cal_year"))
+            month = int(st.number_input("월", 1, 12, step=1, key="cal_month"))
             decorate_mode = st.toggle("🎀 꾸미기 모드", value=False, help="날짜별 배경/스티커/모서리 둥글기 저장")
+            year_view = st.toggle("📊 연간 보기", key="year_view", help="한 해의 기록을 한눈에 (칸을 누르면 그 날짜가 열립니다)")
+            ym = f"{year}-{month:02d}"
+            pick_key = f"day_pick_{ym}"
 
             if st.session_state.selected_date:
                 st.info(f"선택된 날짜: **{st.session_state.selected_date}**")
-                if st.button("선택 해제", key="left_unselect"):
-                    st.session_state.selected_date = None
-                    st.rerun()
-
+                st.button("선택 해제", key="left_unselect", on_click=clear_date, args=(pick_key,))
+
+            st.markdown("#### 🔎 추억 검색")
+            q = st.text_input("검색어", key="mem_search", placeholder="제목/내용 (예: 산책, 생일)",
+                              label_visibility="collapsed")
+            if q.strip():
+                with span("calendar.search"):
+                    hits = search_index.search(username, q)
+                if not hits:
+                    st.caption("검색 결과가 없습니다.")
+                for i, h in enumerate(hits):
+                    st.button(f"{h['date']} · {h['title'] or '(제목 없음)'}", key=f"hit_{i}_{h['date']}",
+                              help=h["snippet"], on_click=jump_to, args=(h["date"],),
+                              use_container_width=True)
 
         with right:
-            st.subheader(f"{int(year)}년 {int(month)}월")
+            if year_view:
+                metric = st.radio("표시", list(HEAT_METRICS), horizontal=True, key="heat_metric")
+                heat_key = f"year_heat_{year}_{metric}"
+                with span("calendar.heatmap"):
+                    st.altair_chart(year_heatmap(year_frame(username, year), metric), key=heat_key,
+                                    on_select=functools.partial(heat_pick, heat_key), selection_mode="pick",
+                                    use_container_width=True)
+                st.caption("🟧 테두리 = 꾸민 날")
+
+            st.subheader(f"{year}년 {month}월")
 
             # 그리드 스타일
             st.markdown("""
             <style>
+                .cal-grid { display:grid; grid-template-columns:repeat(7, 1fr); gap:6px; }
+                .cal-head { text-align:center; font-weight:700; color:#666; }
                 .cal-card {
                     border:1px solid rgba(0,0,0,.08);
                     border-radius:12px;
@@ -302,36 +667,24 @@ else:
                     padding:8px;
                     background:#fff;
                 }
+                .cal-sel { outline:3px solid #F39C12; }
                 .cal-day { font-weight:800; margin-bottom:6px; }
                 .cal-stickers { font-size:20px; line-height:1.1; }
+                .cal-thumb { width:44px; height:44px; object-fit:cover; border-radius:8px; margin-top:4px; }
             </style>
             """, unsafe_allow_html=True)
 
-            cal_mat = calendar.monthcalendar(int(year), int(month))
-            for week in cal_mat:
-                cols = st.columns(7, gap="small")
-                for i, day in enumerate(week):
-                    with cols[i]:
-                        if day == 0:
-                            st.write("")
-                            continue
-                        date_key = f"{int(year)}-{int(month):02d}-{day:02d}"
-                        dconf = decos["decos"].get(date_key, {})
-                        bg = dconf.get("bg", "#ffffff")
-                        radius = dconf.get("radius", "12px")
-                        stickers = " ".join(dconf.get("stickers", []))
-
-                        st.markdown(
-                            f"<div class='cal-card' style='background:{bg}; border-radius:{radius};'>"
-                            f"<div class='cal-day'>{day}</div>"
-                            f"<div class='cal-stickers'>{stickers}</div>"
-                            f"</div>",
-                            unsafe_allow_html=True
-                        )
-
-                        if st.button("열기", key=f"open_{date_key}", use_container_width=True):
-                            st.session_state.selected_date = date_key
-                            st.rerun()
+            month_grid(year, month, st.session_state.selected_date)
+            feed_watch(("grid_live", ("memory", "deco"), {username}))
+
+            # 날짜 열기: 위젯 하나 (42개 버튼 대신)
+            days = [d for week in calendar.monthcalendar(year, month) for d in week if d]
+            if hasattr(st, "pills"):
+                st.pills("열 날짜", days, selection_mode="single", key=pick_key,
+                         on_change=pick_date, args=(pick_key, ym))
+            else:
+                st.radio("열 날짜", days, index=None, horizontal=True, key=pick_key,
+                         on_change=pick_date, args=(pick_key, ym))
 
         # 🎀 꾸미기 패널
         if decorate_mode:
@@ -341,7 +694,7 @@ else:
                 st.info("달력에서 날짜를 먼저 선택하세요.")
             else:
                 date_key = st.session_state.selected_date
-                decos = load_decos(username)  # 최신 로드
+                decos = store.load_decos_month(username, date_key[:7])  # 최신 로드 (그 달만)
                 d = decos["decos"].get(date_key, {})
                 c1, c2 = st.columns([2, 1], gap="large")
                 with c1:
@@ -360,41 +713,43 @@ else:
                     col_s, col_r, col_c = st.columns(3)
                     with col_s:
                         if st.button("🗂 꾸미기 저장"):
-                            decos["decos"][date_key] = {"bg": bg, "radius": radius, "stickers": picked}
-                            save_decos(username, decos)
+                            store.put_deco(username, date_key, {"bg": bg, "radius": radius, "stickers": picked})
                             st.success("저장되었습니다! 달력/상세에 즉시 반영됩니다.")
-                            st.rerun()
+                            rerun_fragment()
                     with col_r:
                         if st.button("♻️ 이 날짜 초기화"):
                             if date_key in decos["decos"]:
-                                del decos["decos"][date_key]
-                                save_decos(username, decos)
+                                store.delete_deco(username, date_key)
                                 st.info("초기화했습니다.")
-                                st.rerun()
+                                rerun_fragment()
                     with col_c:
-                        if st.button("선택 해제", key="decor_unselect"):
-                            st.session_state.selected_date = None
-                            st.rerun()
+                        st.button("선택 해제", key="decor_unselect", on_click=clear_date, args=(pick_key,))
 
                 with c2:
                     st.markdown("**미리보기**")
                     st.markdown(
                         f"<div class='cal-card' style='background:{bg}; border-radius:{radius}; min-height:140px;'>"
                         f"<div class='cal-day'>{date_key[-2:]}</div>"
-                        f"<div class='cal-stickers'>{' '.join(picked)}</div>"
+                        f"<div class='cal-stickers'>{html.escape(' '.join(picked))}</div>"
                         f"</div>",
                         unsafe_allow_html=True
                     )
 
-        # 선택된 날짜가 있으면 상단 오버레이 표시
-        if st.session_state.get("selected_date"):
-            render_detail_panel(st.session_state["selected_date"])
+        # 선택된 날짜가 있으면 상단 오버레이 표시 (닫기는 달력 영역을 다시 그려야 하므로 패널 밖에서)
+        sel = st.session_state.get("selected_date")
+        if sel:
+            render_detail_panel(sel)
+            st.button("닫기", key=f"close_{sel}", on_click=clear_date, args=(pick_key,))
+
+    if menu == "달력":
+        st.title("🗓 하루 추억 달력")
+        calendar_page()
 
     # -------------------- 자가진단 (받는이) --------------------
     if menu == "자가진단" and role == "받는이":
         st.title("📝 오늘의 자가진단")
         today = datetime.now().strftime("%Y-%m-%d")
-        done = any(r.get("username") == username and r.get("date") == today for r in diagnosis_data["records"])
+        done = store.has_record(username, today)
 
         # 기본 5문항
         def_qs = [
@@ -419,7 +774,7 @@ else:
 
             # 맞춤 질문
             st.markdown("### 📌 맞춤 질문")
-            custom_for_me = [q for q in questions_data.get("custom_questions", []) if username in q.get("targets", [])]
+            custom_for_me = store.questions_for(username)
             c_ans = {}
             if custom_for_me:
                 for i, cq in enumerate(custom_for_me):
@@ -442,35 +797,103 @@ else:
             memo = st.text_area("추가 메모", "")
 
             if st.button("자가진단 제출", type="primary"):
-                diagnosis_data["records"].append({
+                store.append_record({
                     "username": username,
                     "date": today,
                     "answers": {**answers, **{f"custom:{k}": v for k, v in c_ans.items()}},
                     "memo": memo
                 })
-                save_json(DIAGNOSIS_FILE, diagnosis_data)
                 st.success("오늘의 자가진단이 저장되었습니다!")
                 st.rerun()
 
     # -------------------- 자가진단 모니터링 (보낸이) --------------------
-    if menu == "자가진단 모니터링" and role == "보낸이":
-        st.title("👀 받는이 자가진단 모니터링")
-        my_groups = [g for g in groups["groups"] if username in g["members"]]
-        receivers = sorted({m for g in my_groups for m in g["members"] if m != username})
+    def monitor_refresh(prev, evs):
+        # 받는이 목록은 내 그룹이 바뀔 때만, 열/요약 행은 기록이 바뀐 받는이만 다시
+        if prev is None or any(e.kind in ("group", "db") and (not e.users or username in e.users) for e in evs):
+            receivers = receivers_of(username)
+            changed, series, summary = set(receivers), {}, {}
+        else:
+            receivers, series, summary = prev["receivers"], prev["series"], prev["summary"]
+            changed = {u for e in evs if e.kind == "record" for u in (e.users or receivers)} & set(receivers)
+            if not changed:
+                return prev
+        with span("monitoring.series"):
+            series = {r: analytics.series(store, r) if r in changed else series[r] for r in receivers}
+            summary = {r: series[r].summary() if r in changed else summary[r] for r in receivers}
+        return {"receivers": receivers, "series": series, "summary": summary,
+                "version": (prev or {}).get("version", 0) + 1}
+
+    # 요약 표/추세/기록: 받는이가 자가진단을 저장하거나 그룹이 바뀌면 feed_watch 가 다시 그리게 한다
+    # (fragment: 보기/쪽 바꾸기는 이 영역만)
+    @fragment
+    def monitoring_live():
+        mon = live_state("monitor_live", username, ("record", "group"), monitor_refresh)
+        receivers, series = mon["receivers"], mon["series"]
 
         if receivers:
-            recent = [r for r in diagnosis_data["records"] if r["username"] in receivers]
-            if recent:
-                st.dataframe(
-                    [{"날짜": r["date"], "아이디": r["username"], **(r.get("answers", {})), "메모": r.get("memo", "")}
-                     for r in sorted(recent, key=lambda x: (x["date"], x["username"]), reverse=True)],
-                    use_container_width=True
-                )
+            total = sum(s.n for s in series.values())
+            if total:
+                # 받는이별 요약 (7일 이동평균, 기준선 대비 변화)
+                st.subheader("📈 받는이별 요약")
+                with span("monitoring.summary"):
+                    st.dataframe(list(mon["summary"].values()), use_container_width=True)
+
+                # 받는이별 추세 차트
+                who = st.selectbox("추세를 볼 받는이", [r for r in receivers if series[r].n])
+                roll = series[who].rollup()
+                view = st.radio("보기", ["7일 이동평균", "일별", "주간 평균", "기준선 대비 변화"], horizontal=True)
+                col, axis = {"7일 이동평균": ("rolling7", "days"), "일별": ("daily", "days"),
+                             "주간 평균": ("weekly", "weeks"), "기준선 대비 변화": ("delta", "days")}[view]
+                with span("monitoring.chart"):
+                    st.line_chart({"날짜": roll[axis], **{METRIC_LABELS[m]: roll[col][m] for m in METRICS}}, x="날짜")
+
+                # 원본 기록 (페이지 단위) — 기록이 바뀌었거나 쪽을 옮겼을 때만 다시 병합
+                st.subheader("📋 자가진단 기록")
+                pages = (total + MONITOR_PAGE_SIZE - 1) // MONITOR_PAGE_SIZE
+                page = int(st.number_input(f"페이지 (전체 {pages}쪽, {total}건)", 1, pages, 1, step=1))
+                with span("monitoring.records"):
+                    cached = st.session_state.get("monitor_rows")
+                    if not cached or cached[:3] != (username, mon["version"], page):
+                        rows, _ = page_records(store, receivers, page - 1, MONITOR_PAGE_SIZE)
+                        cached = st.session_state["monitor_rows"] = (username, mon["version"], page, rows)
+                    st.dataframe(
+                        [{"날짜": r["date"], "아이디": r["username"], **(r.get("answers", {})), "메모": r.get("memo", "")}
+                         for r in cached[3]],
+                        use_container_width=True
+                    )
+
+                # 기록 내보내기 (예: 병원 제출용) — 누를 때 만들고 조각 단위로 흘려 쓴다
+                c1, c2 = st.columns([1, 3])
+                with c1:
+                    rec_fmt = st.selectbox("내보내기 형식", transfer.EXPORT_FORMATS, index=1, key="rec_export_fmt")
+                with c2:
+                    st.download_button(
+                        "⬇️ 받는이 기록 내보내기",
+                        data=lambda f=rec_fmt: transfer.spool(transfer.iter_records_export(store, receivers, f)),
+                        file_name=transfer.export_name(username, rec_fmt, "records"),
+                        mime=transfer.MIMES[rec_fmt], on_click="ignore")
             else:
                 st.info("아직 자가진단 기록이 없습니다.")
         else:
             st.warning("아직 연결된 받는이가 없습니다. ‘그룹 편집’에서 그룹을 만들어보세요.")
 
+    # 내가 만든 질문: 질문이 만들어지면(다른 기기에서도) 이 목록만 다시
+    def my_questions_live():
+        my_qs = live_state("my_qs_live", username, ("question",),
+                           lambda prev, evs: store.questions_by(username) if prev is None or evs else prev,
+                           users={username})
+        if my_qs:
+            for q in sorted(my_qs, key=lambda x: x["id"], reverse=True):
+                st.markdown(f"- **{q['text']}** *(유형: {q['type']}, 대상: {', '.join(q.get('targets', []))})*")
+        else:
+            st.info("아직 만든 질문이 없습니다.")
+
+    if menu == "자가진단 모니터링" and role == "보낸이":
+        st.title("👀 받는이 자가진단 모니터링")
+        receivers = my_receivers
+
+        monitoring_live()
+
         st.markdown("---")
         st.subheader("🛠 맞춤 질문 만들기 & 배포")
         with st.form("custom_q_form"):
@@ -483,7 +906,6 @@ else:
             opts_txt = st.text_input("choice 옵션(쉼표로 구분)", value="아니오,예")
             d_idx = st.number_input("choice 기본 인덱스", value=0, step=1)
 
-            receivers = sorted({m for g in my_groups for m in g["members"] if m != username})
             targets = st.multiselect("질문을 받을 받는이", receivers)
 
             sub = st.form_submit_button("질문 생성")
@@ -500,29 +922,64 @@ else:
                     elif q_type == "choice":
                         opts = [o.strip() for o in opts_txt.split(",") if o.strip()] or ["아니오", "예"]
                         item.update({"opts": opts, "default_index": int(d_idx)})
-                    questions_data.setdefault("custom_questions", []).append(item)
-                    save_json(QUESTIONS_FILE, questions_data)
+                    store.add_question(item)
                     st.success("맞춤 질문이 생성되어 배포되었습니다!")
 
         st.markdown("### 📋 내가 만든 질문")
-        my_qs = [q for q in questions_data.get("custom_questions", []) if q.get("creator") == username]
-        if my_qs:
-            for q in sorted(my_qs, key=lambda x: x["id"], reverse=True):
-                st.markdown(f"- **{q['text']}** *(유형: {q['type']}, 대상: {', '.join(q.get('targets', []))})*")
+        my_questions_live()
+        feed_watch(("monitor_live", ("record", "group"), None), ("my_qs_live", ("question",), {username}))
+        my_qs = store.questions_by(username)  # 알림 규칙 항목용
+
+        # 🔔 알림 규칙
+        st.markdown("---")
+        st.subheader("🔔 알림 규칙")
+        with st.form("alert_rule_form"):
+            r_type = st.selectbox("규칙 종류", list(RULE_TYPES), format_func=RULE_TYPES.get)
+            fields = list(METRICS) + ["appetite"] + [f"custom:{q['id']}" for q in my_qs]
+            r_field = st.selectbox("항목 (값 비교 / 평균 대비 하락)", fields,
+                                   format_func=lambda f: METRIC_LABELS.get(f, f))
+            colA, colB, colC, colD = st.columns(4)
+            with colA: r_op = st.selectbox("비교", list(OPS))
+            with colB: r_value = st.text_input("값", value="7")
+            with colC: r_days = st.number_input("기간(일)", min_value=1, max_value=60, value=7, step=1)
+            with colD: r_drop = st.number_input("하락 폭(점)", min_value=0.5, max_value=10.0, value=2.0, step=0.5)
+            if st.form_submit_button("규칙 추가"):
+                if r_type == "compare":
+                    try:
+                        value = float(r_value)
+                    except ValueError:
+                        value = r_value.strip()
+                    rule = {"type": r_type, "field": r_field, "op": r_op, "value": value}
+                elif r_type == "drop_vs_avg":
+                    rule = {"type": r_type, "field": r_field, "drop": float(r_drop), "days": int(r_days)}
+                else:
+                    rule = {"type": r_type, "days": int(r_days)}
+                alert_engine.add_rule(username, rule)
+                st.success(f"규칙을 추가했습니다: {describe_rule(rule)}")
+
+        my_rules = alert_engine.load(username)["rules"]
+        if my_rules:
+            for rule in my_rules:
+                c1, c2 = st.columns([4, 1])
+                with c1:
+                    st.markdown(f"- {describe_rule(rule)}")
+                with c2:
+                    if st.button("삭제", key=f"del_rule_{rule['id']}"):
+                        alert_engine.remove_rule(username, rule["id"])
+                        st.rerun()
         else:
-            st.info("아직 만든 질문이 없습니다.")
+            st.info("아직 만든 알림 규칙이 없습니다.")
 
     # -------------------- 그룹 편집 --------------------
     if menu == "그룹 편집":
         st.title("✏️ 그룹 편집")
-        my_groups = [g for g in groups["groups"] if username in g["members"]]
+        my_groups = store.groups_of(username)
 
         with st.expander("➕ 새 그룹 만들기", expanded=not my_groups):
             new_name = st.text_input("그룹 이름")
-            all_users = sorted([u["username"] for u in accounts["users"] if u["username"] != username])
-            add_members = st.multiselect("멤버 추가", all_users)
+            add_members = user_picker("멤버 추가", "new_group_members", exclude=(username,), multi=True)
             if st.button("그룹 생성"):
-                mine = [g for g in groups["groups"] if username in g["members"]]
+                mine = store.groups_of(username)
                 proposed = [username] + add_members
                 dup_name = any(g["group_name"] == new_name for g in mine)
                 dup_members = any(set(g["members"]) == set(proposed) for g in mine)
@@ -533,8 +990,7 @@ else:
                 elif dup_members:
                     st.warning("같은 멤버 구성의 그룹이 이미 있어요.")
                 else:
-                    groups["groups"].append({"group_name": new_name, "members": proposed})
-                    save_json(GROUPS_FILE, groups)
+                    store.create_group(new_name, proposed)
                     st.success(f"그룹 '{new_name}'이(가) 생성되었습니다.")
                     st.rerun()
 
@@ -545,21 +1001,44 @@ else:
                 with c1:
                     st.markdown(f"**{g['group_name']}** - 멤버: {', '.join(g['members'])}")
                 with c2:
-                    candidates = [u["username"] for u in accounts["users"] if u["username"] not in g["members"]]
-                    add_user = st.selectbox(f"멤버 추가 ({g['group_name']})", ["선택 없음"] + candidates, key=f"add_{g['group_name']}_{idx}")
+                    add_user = user_picker(f"멤버 추가 ({g['group_name']})", f"add_{g['group_name']}_{idx}",
+                                           exclude=g["members"])
                 with c3:
                     if st.button("멤버 추가", key=f"add_btn_{g['group_name']}_{idx}"):
                         if add_user and add_user != "선택 없음":
-                            g["members"].append(add_user)
-                            save_json(GROUPS_FILE, groups)
+                            store.add_group_member(g, add_user)
                             st.success(f"{add_user} 님을 추가했습니다.")
                             st.rerun()
                 if st.button(f"그룹 나가기 ({g['group_name']})", key=f"leave_{g['group_name']}_{idx}"):
-                    g["members"].remove(username)
-                    if len(g["members"]) == 0:
-                        groups["groups"].remove(g)
-                    save_json(GROUPS_FILE, groups)
+                    store.leave_group(g, username)
                     st.success(f"'{g['group_name']}' 그룹에서 나갔습니다.")
                     st.rerun()
         else:
             st.info("아직 속한 그룹이 없습니다. 위에서 새 그룹을 만들어보세요.")
+
+    # -------------------- 백업 (내보내기 / 가져오기) --------------------
+    if menu == "백업":
+        st.title("📦 백업")
+        st.markdown("#### 내보내기")
+        fmt = st.radio("형식", transfer.EXPORT_FORMATS, horizontal=True,
+                       format_func={"zip": "ZIP (전체 + 첨부)", "jsonl": "JSONL (전체)", "csv": "CSV (추억만)"}.get)
+        st.download_button("⬇️ 내 기록 내려받기",
+                           data=lambda f=fmt: transfer.spool(transfer.iter_export(store, username, f)),
+                           file_name=transfer.export_name(username, fmt), mime=transfer.MIMES[fmt], on_click="ignore")
+
+        st.markdown("#### 가져오기")
+        st.caption("이 화면에서 내보낸 ZIP/JSONL/CSV 를 올리면 검사 후 묶어서 저장합니다. 이미 있는 추억과 같은 날 자가진단 기록은 건너뜁니다.")
+        up = st.file_uploader("백업 파일", type=["zip", "jsonl", "csv"], key="import_file")
+        if up is not None and st.button("가져오기", type="primary"):
+            with span("backup.import"):
+                report = transfer.import_file(store, username, up, name=up.name)
+            search_index.invalidate(username)
+            st.success(f"추억 {report['memories']}건, 꾸미기 {report['decos']}건, 자가진단 {report['records']}건, "
+                       f"첨부 {report['attachments']}개를 가져왔습니다. (건너뜀 {report['skipped']}건)")
+            if report["errors"]:
+                with st.expander(f"⚠️ 가져오지 못한 줄 {len(report['errors'])}개"):
+                    for line, why in report["errors"]:
+                        st.markdown(f"- {line}: {why}")
+
+# -------------------- 측정 마무리 --------------------
+profiling.end_rerun()
@@ -0,0 +1,225 @@
+# benchmark.py — AppTest 로 app.py 를 화면 없이 돌려 데이터 규모별 응답 시간을 잰다
+# - 규모마다 새 프로세스 + 새 데이터 폴더: datagen 으로 채운 뒤 로그인 → 달력 열기/저장 → 자가진단 제출
+#   → (보낸이) 모니터링 → 그룹 편집 순서로 조작하고, 조작마다 rerun 시간 / 읽은·쓴 바이트 / 최대 RSS 를 기록
+# - 읽기/쓰기 바이트는 /proc/self/io 의 rchar/wchar 차이 (리눅스가 아니면 null)
+# - 결과는 JSON 하나 → 버전 사이 비교용
+# - 사용: python benchmark.py --scales small,medium --backend json --repeat 3 --out bench.json
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, "app.py")
+
+SCALES = {
+    "small":  {"users": 10,  "groups": 3,  "years": 1, "questions": 5},
+    "medium": {"users": 50,  "groups": 15, "years": 2, "questions": 30},
+    "large":  {"users": 200, "groups": 60, "years": 3, "questions": 100},
+}
+
+
+def io_counters():
+    try:
+        with open("/proc/self/io", "r") as f:
+            kv = dict(line.split(":") for line in f.read().splitlines())
+        return int(kv["rchar"]), int(kv["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def peak_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # macOS 는 바이트
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}  # 조작 이름 -> [{"ms", "bytes_read", "bytes_written", "rss_kb"}, ...]
+        self.order = []
+
+    def measure(self, name, fn):
+        r0, w0 = io_counters()
+        t0 = time.perf_counter()
+        at = fn()
+        ms = (time.perf_counter() - t0) * 1000
+        r1, w1 = io_counters()
+        if at is not None and at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].message}")
+        if name not in self.samples:
+            self.order.append(name)
+        self.samples.setdefault(name, []).append({
+            "ms": round(ms, 2),
+            "bytes_read": None if r0 is None else r1 - r0,
+            "bytes_written": None if w0 is None else w1 - w0,
+            "rss_kb": peak_rss_kb(),
+        })
+        return at
+
+    def summary(self):
+        out = []
+        for name in self.order:
+            s = self.samples[name]
+            ms = [x["ms"] for x in s]
+            out.append({"name": name, "runs": len(s), "ms_median": round(statistics.median(ms), 2),
+                        "ms_min": min(ms), "ms_max": max(ms),
+                        "bytes_read": _median(s, "bytes_read"), "bytes_written": _median(s, "bytes_written"),
+                        "peak_rss_kb": max(x["rss_kb"] for x in s)})
+        return out
+
+
+def _median(samples, key):
+    vals = [x[key] for x in samples if x[key] is not None]
+    return int(statistics.median(vals)) if vals else None
+
+
+# -------------------- 조작 흐름 --------------------
+def _by_label(items, label):
+    return [x for x in items if x.label == label][0]
+
+
+def login(at, uid):
+    at.radio[0].set_value("로그인").run()
+    at.text_input[0].set_value(uid)
+    at.text_input[1].set_value("pw")
+    return at.button[0].click().run()
+
+
+def logout(at):
+    return at.sidebar.button[0].click().run()
+
+
+def run_flows(rec, sender, receiver, round_no):
+    from streamlit.testing.v1 import AppTest
+    import storage
+
+    store = storage.get_store()
+
+    at = rec.measure("open_login_page", lambda: AppTest.from_file(APP, default_timeout=120).run())
+
+    # 받는이: 달력 → 날짜 열기 → 추억 저장 → 자가진단
+    rec.measure("login_receiver", lambda: login(at, receiver))
+    rec.measure("calendar_open_day", lambda: at.get("button_group")[0].set_value(1 + round_no % 28).run())
+
+    def save_memory():
+        _by_label(at.text_input, "제목").set_value(f"벤치 {round_no}")
+        _by_label(at.text_area, "내용").set_value("벤치마크로 저장한 추억")
+        return _by_label(at.button, "저장").click().run()
+    rec.measure("calendar_save_memory", save_memory)
+    rec.measure("calendar_close_day", lambda: _by_label(at.button, "닫기").click().run())
+    rec.measure("diagnosis_open", lambda: at.sidebar.radio[0].set_value("자가진단").run())
+    if any(b.label == "자가진단 제출" for b in at.button):
+        rec.measure("diagnosis_submit", lambda: _by_label(at.button, "자가진단 제출").click().run())
+    rec.measure("logout", lambda: logout(at))
+
+    # 보낸이: 모니터링 → 주간 보기 → 그룹 편집 → 그룹 만들기
+    rec.measure("login_sender", lambda: login(at, sender))
+    rec.measure("monitoring_open", lambda: at.sidebar.radio[0].set_value("자가진단 모니터링").run())
+    rec.measure("monitoring_weekly", lambda: _by_label(at.radio, "보기").set_value("주간 평균").run())
+    rec.measure("groups_open", lambda: at.sidebar.radio[0].set_value("그룹 편집").run())
+
+    group_name = f"벤치그룹{round_no}"
+
+    def create_group():
+        # 멤버 선택은 아이디 검색형이라 검색어를 넣어야 목록이 채워진다
+        _by_label(at.text_input, "그룹 이름").set_value(group_name)
+        at.text_input(key="new_group_members_q").set_value("r").run()
+        taken = [set(g["members"]) for g in store.groups_of(sender)]
+        options = [u for u in at.multiselect(key="new_group_members").options if {sender, u} not in taken]
+        at.multiselect(key="new_group_members").set_value(options[round_no % len(options):][:1])  # 라운드마다 다른 구성
+        return _by_label(at.button, "그룹 생성").click().run()
+    rec.measure("groups_create", create_group)
+    if not any(g["group_name"] == group_name for g in store.groups_of(sender)):
+        raise RuntimeError(f"그룹 생성이 반영되지 않음 (라운드 {round_no})")
+    rec.measure("logout", lambda: logout(at))
+
+
+def child(scale, params, repeat):
+    """한 규모를 현재 프로세스에서 측정 (DATA_DIR 은 부모가 환경변수로 정해 둔다)"""
+    sys.path.insert(0, HERE)
+    import storage
+    import datagen
+
+    store = storage.get_store()
+    t0 = time.perf_counter()
+    counts = datagen.generate(store, **params)
+    gen_s = time.perf_counter() - t0
+    users = store.list_users()
+    sender, receiver = datagen.senders(users)[0], datagen.receivers(users)[0]
+
+    rec = Recorder()
+    for i in range(repeat):
+        run_flows(rec, sender, receiver, i)
+    return {"scale": scale, "params": params, "counts": counts, "generate_s": round(gen_s, 2),
+            "peak_rss_kb": peak_rss_kb(), "interactions": rec.summary()}
+
+
+def run_scale(scale, params, backend, repeat, keep):
+    root = tempfile.mkdtemp(prefix=f"bench_{scale}_")
+    env = dict(os.environ, DATA_DIR=os.path.join(root, "accounts"), STORAGE_BACKEND=backend,
+               LOGIN_FREE_ATTEMPTS="1000")
+    try:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", scale,
+                               "--params", json.dumps(params), "--repeat", str(repeat)],
+                              cwd=root, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {"scale": scale, "params": params, "error": proc.stderr.strip().splitlines()[-1:]}
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="app.py 헤드리스 벤치마크")
+    p.add_argument("--scales", default="small,medium", help=f"쉼표로 구분: {', '.join(SCALES)}")
+    p.add_argument("--backend", default=os.environ.get("STORAGE_BACKEND", "json"), choices=("json", "sqlite"))
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--out", default="bench.json")
+    p.add_argument("--keep", action="store_true", help="생성한 데이터 폴더를 지우지 않음")
+    p.add_argument("--child", help=argparse.SUPPRESS)
+    p.add_argument("--params", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(child(args.child, json.loads(args.params), args.repeat), ensure_ascii=False))
+        return 0
+
+    import streamlit
+    result = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "git": git_rev(), "backend": args.backend,
+              "python": platform.python_version(), "streamlit": streamlit.__version__,
+              "repeat": args.repeat, "scales": []}
+    for scale in [s.strip() for s in args.scales.split(",") if s.strip()]:
+        params = SCALES[scale]
+        print(f"[{scale}] {params} ...", file=sys.stderr)
+        res = run_scale(scale, params, args.backend, args.repeat, args.keep)
+        result["scales"].append(res)
+        for it in res.get("interactions", []):
+            print(f"  {it['name']:<22} {it['ms_median']:>9.1f} ms  read {it['bytes_read']}  "
+                  f"write {it['bytes_written']}  rss {it['peak_rss_kb']} KB", file=sys.stderr)
+        if "error" in res:
+            print(f"  실패: {res['error']}", file=sys.stderr)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"→ {args.out}", file=sys.stderr)
+    return 0 if all("error" not in s for s in result["scales"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# blobs.py — 첨부 파일(사진/음성)용 내용 주소 저장소
+# - 파일 이름 = 내용의 sha256 → 같은 파일을 여러 번 올려도 한 번만 저장 (중복 제거)
+# - blobs/<앞 2글자>/<sha256> 구조. 올릴 때는 조각(CHUNK) 단위로 읽으며 해시를 계산해 임시 파일에 쓰고
+#   끝나면 rename (이미 있으면 임시 파일만 지운다). 파일 전체를 한 번에 메모리에 올리지 않는다
+# - 파생 파일(썸네일, 정규화한 음성)은 media.py 의 작업 풀이 만든다
+# - sha 는 밖(가져오기 파일 등)에서 올 수 있으므로 소문자 16진수 64자가 아니면 경로를 만들지 않는다
+
+import os
+import re
+import hashlib
+import secrets
+
+import storage
+from locking import notify_write
+from profiling import count_write
+
+BLOB_DIR = f"{storage.DATA_DIR}/blobs"
+CHUNK = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+
+IMAGE_TYPES = ("jpg", "jpeg", "png", "webp", "gif")  # Pillow 가 읽을 수 있는 것만 (HEIF 디코더 없음)
+AUDIO_TYPES = ("mp3", "m4a", "wav", "ogg", "aac", "webm")
+KINDS = ("image", "audio")
+SHA_RE = re.compile(r"[0-9a-f]{64}")
+
+
+class BlobTooLarge(Exception):
+    """MAX_UPLOAD_BYTES 를 넘는 첨부"""
+
+
+def valid_sha(sha):
+    return isinstance(sha, str) and SHA_RE.fullmatch(sha) is not None
+
+
+def valid_attachment(att):
+    return isinstance(att, dict) and valid_sha(att.get("sha")) and att.get("kind") in KINDS
+
+
+def kind_of(name):
+    ext = os.path.splitext(name or "")[1].lower().lstrip(".")
+    if ext in IMAGE_TYPES:
+        return "image"
+    if ext in AUDIO_TYPES:
+        return "audio"
+    return None
+
+
+class BlobStore:
+    def __init__(self, root=BLOB_DIR):
+        self.root = root
+        self.tmp_dir = f"{root}/tmp"
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path(self, sha):
+        if not valid_sha(sha):
+            raise ValueError(f"잘못된 첨부 주소: {sha!r}")
+        return f"{self.root}/{sha[:2]}/{sha}"
+
+    def exists(self, sha): return valid_sha(sha) and os.path.exists(self.path(sha))
+
+    def put_stream(self, fileobj, max_bytes=MAX_UPLOAD_BYTES):
+        """fileobj 를 조각 단위로 저장하고 (sha256, 크기, 새로 저장했는지) 를 돌려준다"""
+        h = hashlib.sha256()
+        size = 0
+        tmp = f"{self.tmp_dir}/{os.getpid()}.{secrets.token_hex(6)}"
+        try:
+            with open(tmp, "wb") as out:
+                while True:
+                    chunk = fileobj.read(CHUNK)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise BlobTooLarge(size)
+                    h.update(chunk)
+                    out.write(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+            sha = h.hexdigest()
+            dst = self.path(sha)
+            if os.path.exists(dst):
+                return sha, size, False  # 이미 있는 내용 (중복)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            os.replace(tmp, dst)
+            count_write(size)
+            notify_write(dst)
+            return sha, size, True
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+_blobs = None
+
+
+def get_blobs():
+    global _blobs
+    if _blobs is None:
+        _blobs = BlobStore()
+    return _blobs
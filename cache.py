@@ -0,0 +1,101 @@
+# cache.py — 프로세스 전역 파일 캐시 (모든 세션이 공유)
+# - 키: 경로 + (mtime_ns, size). 다른 프로세스가 파일을 바꾸면 stat 이 달라져 자동으로 다시 읽는다
+# - 저장소가 쓰기 직후 invalidate() 를 호출한다 (write-through 무효화)
+# - 전역 파일(pinned)은 항상 유지, 사용자별 추억/꾸미기 파일은 용량 한도 안에서 LRU 로 내보낸다
+# - 캐시된 값은 여러 세션이 함께 보므로 읽기 전용으로 다룰 것 (수정은 저장소의 행 단위 쓰기로)
+
+import os
+import threading
+from collections import OrderedDict
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class FileCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=512, pinned=()):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.pinned = set(pinned)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # path -> (key, value, nbytes)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path, loader, deps=()):
+        """path(와 deps 파일들)의 stat 이 그대로면 캐시 값, 아니면 loader() 결과를 캐시"""
+        key = tuple(_stat_key(p) for p in (path, *deps))
+        with self._lock:
+            ent = self._entries.get(path)
+            if ent is not None and ent[0] == key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return ent[1]
+            self.misses += 1
+        value = loader()
+        self._store(path, key, value)
+        return value
+
+    def peek(self, path, deps=()):
+        """디스크와 같은 상태(stat 일치)의 캐시 값이 있으면 돌려준다. 없으면 None (카운터 변화 없음)"""
+        key = tuple(_stat_key(p) for p in (path, *deps))
+        with self._lock:
+            ent = self._entries.get(path)
+            return ent[1] if ent is not None and ent[0] == key else None
+
+    def put(self, path, value, deps=()):
+        """방금 디스크에 쓴 내용을 현재 stat 키로 캐시에 올린다"""
+        self._store(path, tuple(_stat_key(p) for p in (path, *deps)), value)
+
+    def _store(self, path, key, value):
+        nbytes = sum(k[1] for k in key if k)
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[path] = (key, value, nbytes)
+            self._bytes += nbytes
+            self._evict()
+
+    def invalidate(self, path):
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _evict(self):
+        # 오래 안 쓴 것부터, 전역 파일은 건너뛴다
+        if self._bytes <= self.max_bytes and len(self._entries) <= self.max_entries:
+            return
+        for path in list(self._entries):
+            if self._bytes <= self.max_bytes and len(self._entries) <= self.max_entries:
+                break
+            if path in self.pinned:
+                continue
+            _, _, nbytes = self._entries.pop(path)
+            self._bytes -= nbytes
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
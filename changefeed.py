@@ -0,0 +1,215 @@
+# changefeed.py — 변경 알림 (프로세스 안 pub/sub + 다른 프로세스는 파일 감시)
+# - 저장소 쓰기 메서드가 끝나면 종류가 있는 이벤트 하나를 발행: Event(seq, kind, users, dates, ts)
+#   kind: memory / deco / record / group / question / user / db(어느 행인지 모르는 SQLite 변경)
+#   users 가 비어 있으면 "누구인지 모름" → 그 종류를 보는 모든 구독자가 새로 읽는다
+#   dates 는 "YYYY-MM-DD" 또는 (파일 감시에서 온 경우) "YYYY-MM"
+# - 구독하는 화면(모니터링 표, 월 달력, 내가 만든 질문)은 아무것도 그리지 않는 작은 fragment 가 FEED_POLL_SECONDS 마다
+#   since(cursor) 로 관련 이벤트만 확인하고, 있을 때만 다시 실행해 그 행/그 달을 다시 읽는다 (없으면 그리지도 않는다)
+# - 최근 FEED_KEEP 개만 보관. cursor 가 그보다 오래됐으면 since() 가 None 을 돌려준다 → 전부 다시 읽기
+# - 여러 프로세스로 띄운 경우: watchdog(inotify)으로 데이터 폴더를 감시해 다른 프로세스의 쓰기를 이벤트로 바꾼다
+#   (이 프로세스가 쓴 파일은 notify_write 때의 수정 시각과 같으면 건너뛴다). watchdog 이 없으면 프로세스 안 알림만
+#   FEED_SETTLE 동안 모아서 본다: 같은 파일의 연속 알림을 합치고, notify_write 가 수정 시각을 남길 틈을 준다
+#   (그 사이 이 프로세스도 같은 파일을 썼다면 다른 프로세스의 쓰기는 이 프로세스 알림에 묻힐 수 있다.
+#    SQLite 는 어느 행인지 모르므로 "db" 하나 → 구독자가 전부 다시 읽는다)
+
+import os
+import time
+import functools
+import threading
+from collections import deque, namedtuple
+
+from locking import on_write
+
+FEED_POLL_SECONDS = float(os.environ.get("FEED_POLL_SECONDS", 20))  # 쉬는 태블릿도 도는 확인 주기
+FEED_KEEP = int(os.environ.get("FEED_KEEP", 1000))
+FEED_WATCH = os.environ.get("FEED_WATCH", "auto").lower()  # auto|on|off
+FEED_SETTLE = float(os.environ.get("FEED_SETTLE", 0.3))  # 초: 파일 감시 알림을 모았다가 한 번에
+
+Event = namedtuple("Event", "seq kind users dates ts")
+
+
+class ChangeFeed:
+    def __init__(self, keep=FEED_KEEP):
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=keep)
+        self._subs = []
+        self.seq = 0
+
+    def publish(self, kind, users=(), dates=()):
+        with self._lock:
+            last = self._events[-1] if self._events else None
+            if (last is not None and last.kind == kind and last.users == tuple(users)
+                    and last.dates == tuple(dates) and time.time() - last.ts < 0.5):
+                return last  # 파일 감시가 한 번의 쓰기에 여러 번 알리는 것을 합친다
+            self.seq += 1
+            ev = Event(self.seq, kind, tuple(users), tuple(dates), time.time())
+            self._events.append(ev)
+            subs = list(self._subs)
+        for fn in subs:
+            try:
+                fn(ev)
+            except Exception:
+                pass  # 구독자 오류가 쓰기를 막지 않게
+        return ev
+
+    def subscribe(self, fn):
+        with self._lock:
+            self._subs.append(fn)
+        return fn
+
+    def unsubscribe(self, fn):
+        with self._lock:
+            if fn in self._subs:
+                self._subs.remove(fn)
+
+    def since(self, cursor, kinds=None, users=None):
+        """cursor 이후의 관련 이벤트 목록과 새 cursor. 보관 범위를 벗어났으면 (None, 새 cursor)"""
+        with self._lock:
+            if self._events and cursor < self._events[0].seq - 1:
+                return None, self.seq
+            out = []
+            for ev in reversed(self._events):
+                if ev.seq <= cursor:
+                    break
+                if kinds is not None and ev.kind not in kinds and ev.kind != "db":
+                    continue
+                if users is not None and ev.users and not set(ev.users) & users:
+                    continue
+                out.append(ev)
+            return out[::-1], self.seq
+
+
+_feed = ChangeFeed()
+
+
+def get_feed():
+    return _feed
+
+
+def publish(kind, users=(), dates=()):
+    return _feed.publish(kind, users, dates)
+
+
+def emits(kind, who):
+    """저장소 쓰기 메서드용: 끝나면 who(인자들) → (users, dates) 로 이벤트 발행"""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            out = fn(self, *args, **kwargs)
+            users, dates = who(*args, **kwargs)
+            _feed.publish(kind, users, dates)
+            return out
+        return wrapper
+    return deco
+
+
+# 인자 → (users, dates)
+def by_day(username, date_key, *_): return (username,), (date_key,)
+def by_rows(username, rows): return (username,), tuple(sorted({d for d, _ in rows}))
+def by_keys(username, mapping): return (username,), tuple(sorted(mapping))
+def by_user(username, *_): return (username,), ()
+def by_record(rec): return (rec.get("username", ""),), (rec.get("date", ""),)
+def by_records(recs): return tuple(sorted({r.get("username", "") for r in recs})), tuple(sorted({r.get("date", "") for r in recs}))
+def by_members(group_name, members): return tuple(members), ()
+def by_group(group, username): return tuple(group.get("members", [])) + (username,), ()
+def by_question(item): return (item.get("creator"),) + tuple(item.get("targets", [])), ()
+def by_account(user): return (user.get("username", ""),), ()
+
+
+# -------------------- 파일 감시 (다른 프로세스의 쓰기) --------------------
+DOC_KINDS = {"accounts.json": "user", "groups.json": "group", "questions.json": "question",
+             "diagnosis.json": "record", "diagnosis.journal.jsonl": "record", "data.db-wal": "db"}  # SQLite 는 커밋마다 -wal 이 바뀐다
+SHARD_KINDS = {"memories": "memory", "decos": "deco"}
+
+_local_mtimes = {}  # 이 프로세스가 쓴 파일 -> 쓴 직후 수정 시각
+
+
+def _remember(path):
+    try:
+        _local_mtimes[os.path.abspath(path)] = os.stat(path).st_mtime_ns
+    except OSError:
+        _local_mtimes.pop(os.path.abspath(path), None)
+
+
+def event_for_path(root, path):
+    """데이터 폴더 안 파일 경로 → (kind, users, dates) 또는 None"""
+    rel = os.path.relpath(path, root).replace(os.sep, "/")
+    if rel.endswith((".lock", ".tmp")) or rel.startswith(".."):
+        return None
+    parts = rel.split("/")
+    if len(parts) == 1:
+        kind = DOC_KINDS.get(parts[0])
+        return (kind, (), ()) if kind else None
+    if len(parts) == 3 and parts[0] in SHARD_KINDS and parts[2].endswith(".json") and parts[2] != "manifest.json":
+        return SHARD_KINDS[parts[0]], (parts[1],), (parts[2][:-len(".json")],)
+    return None
+
+
+class FileWatcher:
+    def __init__(self, root, feed=_feed):
+        self.root = os.path.abspath(root)
+        self.feed = feed
+        self.observer = None
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._timer = None
+
+    def handle(self, path):
+        if event_for_path(self.root, path) is None:
+            return
+        with self._lock:
+            self._pending.add(os.path.abspath(path))
+            if self._timer is None:
+                self._timer = threading.Timer(FEED_SETTLE, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush(self):
+        with self._lock:
+            paths, self._pending, self._timer = self._pending, set(), None
+        for p in sorted(paths):
+            try:
+                if _local_mtimes.get(p) == os.stat(p).st_mtime_ns:
+                    continue  # 이 프로세스가 쓴 것 (이미 발행함)
+            except OSError:
+                pass
+            self.feed.publish(*event_for_path(self.root, p))
+
+    def start(self):
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory or event.event_type not in ("modified", "created", "moved", "deleted"):
+                    return
+                watcher.handle(getattr(event, "dest_path", "") or event.src_path)
+
+        self.observer = Observer()
+        self.observer.daemon = True
+        self.observer.schedule(Handler(), self.root, recursive=True)
+        self.observer.start()
+        return self
+
+
+_watcher = None
+_watch_lock = threading.Lock()
+watch_error = None  # 감시를 켜지 못한 이유 (프로세스 안 알림은 그대로 동작)
+
+
+def watch(root):
+    """프로세스에 한 번. FEED_WATCH=off 면 하지 않는다"""
+    global _watcher, watch_error
+    with _watch_lock:
+        if _watcher is not None or FEED_WATCH == "off":
+            return _watcher
+        on_write(_remember)
+        try:
+            _watcher = FileWatcher(root).start()
+        except Exception as e:  # watchdog 없음, inotify 한도 초과 등
+            watch_error = f"{type(e).__name__}: {e}"
+            if FEED_WATCH == "on":
+                raise
+        return _watcher
@@ -0,0 +1,137 @@
+# datagen.py — 벤치마크/부하 확인용 합성 데이터 만들기
+# - 사용자 N명(보낸이/받는이 반반), 그룹 M개, 몇 년치 추억/꾸미기/자가진단, 맞춤 질문 K개
+# - 저장소 API 로 통째 저장하므로 STORAGE_BACKEND=json|sqlite 어느 쪽이든 같은 모양이 된다
+# - 비밀번호는 모두 "pw" (해시는 한 번만 계산해서 재사용)
+# - 사용: DATA_DIR=/tmp/bench/accounts python datagen.py --users 50 --groups 10 --years 2 --questions 20
+
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+
+import storage
+import migrations
+from passwords import hash_pw
+
+PASSWORD = "pw"
+TITLES = ["산책", "가족 식사", "손주 전화", "병원 다녀옴", "시장 구경", "꽃 구경", "노래 교실", "운동"]
+TEXTS = ["날씨가 좋아서 오래 걸었어요.", "맛있는 반찬을 만들었어요.", "오랜만에 목소리를 들었어요.",
+         "조금 피곤했지만 즐거웠어요.", "사진을 많이 찍었어요."]
+STICKERS = ["🌸", "🎉", "💖", "⭐", "🍀", "🎂"]
+BGS = ["#FFFFFF", "#FFF7E6", "#E6F7FF", "#F0FFF0", "#FFE6F0"]
+
+
+def senders(users): return [u["username"] for u in users if u["role"] == "보낸이"]
+def receivers(users): return [u["username"] for u in users if u["role"] == "받는이"]
+
+
+def make_users(n, pw_hash):
+    return [{"username": f"{'s' if i % 2 == 0 else 'r'}{i // 2:03d}", "password": pw_hash,
+             "role": "보낸이" if i % 2 == 0 else "받는이"} for i in range(n)]
+
+
+def make_groups(rng, users, m):
+    s, r = senders(users), receivers(users)
+    groups = []
+    for i in range(m):
+        # 보낸이 한 명 + 받는이 몇 명 (첫 그룹은 s000 / r000 이 꼭 들어가게)
+        owner = s[i % len(s)]
+        members = [owner] + rng.sample(r, min(len(r), rng.randint(1, 4)))
+        if i == 0 and r:
+            members = [s[0]] + [r[0]] + [x for x in members[1:] if x != r[0]]
+        groups.append({"id": storage.new_group_id(), "group_name": f"그룹{i:03d}", "members": members})
+    return groups
+
+
+def days_back(end, years):
+    start = end - timedelta(days=365 * years)
+    d = start
+    while d <= end:
+        yield d.strftime("%Y-%m-%d")
+        d += timedelta(days=1)
+
+
+def make_memories(rng, days, rate=0.6):
+    mems = {}
+    for d in days:
+        if rng.random() < rate:
+            mems[d] = [{"title": rng.choice(TITLES), "text": rng.choice(TEXTS), "ts": f"{d}T20:00:00"}
+                       for _ in range(rng.randint(1, 2))]
+    return mems
+
+
+def make_decos(rng, days, rate=0.15):
+    return {d: {"bg": rng.choice(BGS), "radius": "12px", "stickers": rng.sample(STICKERS, rng.randint(1, 2))}
+            for d in days if rng.random() < rate}
+
+
+def make_questions(rng, users, groups, k):
+    out = []
+    for i in range(k):
+        g = groups[i % len(groups)]
+        targets = [m for m in g["members"][1:]] or receivers(users)[:1]
+        q = {"id": f"cq_bench_{i:04d}", "creator": g["members"][0], "targets": targets,
+             "text": f"맞춤 질문 {i}", "type": rng.choice(["scale", "choice", "text"])}
+        if q["type"] == "scale":
+            q.update({"min": 1, "max": 5, "default": 3})
+        elif q["type"] == "choice":
+            q.update({"opts": ["아니오", "예"], "default_index": 0})
+        out.append(q)
+    return out
+
+
+def make_records(rng, users, questions, days, rate=0.85):
+    by_target = {}
+    for q in questions:
+        for t in q["targets"]:
+            by_target.setdefault(t, []).append(q)
+    recs = []
+    for d in days:
+        for r in receivers(users):
+            if rng.random() >= rate:
+                continue
+            answers = {"mood": rng.randint(1, 5), "sleep": rng.randint(1, 5), "pain": rng.randint(0, 10),
+                       "appetite": rng.choice(["부족했어요", "보통이에요", "좋았어요"]), "activity": rng.randint(1, 5)}
+            for q in by_target.get(r, []):
+                answers[f"custom:{q['id']}"] = {"scale": rng.randint(1, 5), "choice": rng.choice(["아니오", "예"])}.get(q["type"], "괜찮아요")
+            recs.append({"username": r, "date": d, "answers": answers, "memo": ""})
+    return recs
+
+
+def generate(store, users=20, groups=5, years=1, questions=10, seed=0, end=None):
+    """데이터 폴더를 합성 데이터로 채우고 개수 요약을 돌려준다 (오늘 자가진단은 비워 둔다)"""
+    rng = random.Random(seed)
+    migrations.migrate(store)  # 스키마 버전을 최신으로 (이후 시작 때 마이그레이션이 돌지 않게)
+    end = end or (datetime.now() - timedelta(days=1))
+    days = list(days_back(end, years))
+
+    user_rows = make_users(users, hash_pw(PASSWORD))
+    group_rows = make_groups(rng, user_rows, groups)
+    q_rows = make_questions(rng, user_rows, group_rows, questions)
+    rec_rows = make_records(rng, user_rows, q_rows, days)
+
+    store.save(storage.ACCOUNTS_FILE, {"users": user_rows})
+    store.save(storage.GROUPS_FILE, {"groups": group_rows})
+    store.save(storage.QUESTIONS_FILE, {"custom_questions": q_rows})
+    store.save(storage.DIAGNOSIS_FILE, {"records": rec_rows})
+    n_mems = 0
+    for u in user_rows:
+        mems = make_memories(rng, days)
+        n_mems += sum(len(v) for v in mems.values())
+        store.save_mems(u["username"], {"memories": mems})
+        store.save_decos(u["username"], {"decos": make_decos(rng, days)})
+    return {"users": len(user_rows), "groups": len(group_rows), "days": len(days),
+            "questions": len(q_rows), "records": len(rec_rows), "memories": n_mems}
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="합성 데이터 생성 (DATA_DIR / STORAGE_BACKEND 환경변수를 따른다)")
+    p.add_argument("--users", type=int, default=20)
+    p.add_argument("--groups", type=int, default=5)
+    p.add_argument("--years", type=int, default=1)
+    p.add_argument("--questions", type=int, default=10)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+    counts = generate(storage.get_store(), args.users, args.groups, args.years, args.questions, args.seed)
+    print(f"{storage.DATA_DIR}: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+    sys.exit(0)
@@ -0,0 +1,158 @@
+# indexes.py — JSON 백엔드용 메모리 인덱스 (계정 / 자가진단 / 맞춤 질문 / 그룹)
+# - 인덱스는 캐시에 올라온 문서 객체로부터 한 번 만들고, 그 뒤 쓰기마다 한 건씩 갱신한다
+# - 문서 객체가 바뀌면(다른 프로세스가 파일을 고쳐 캐시가 다시 읽은 경우) 다음 조회 때 다시 만든다
+#   username -> 계정 / 정렬된 아이디 목록(앞부분 검색) / (username, date) -> 기록 / username -> 날짜순 기록 목록
+#   target -> 질문 목록 / username -> 그룹들 / username -> {같은 그룹 사람: 함께 속한 그룹 수}
+
+import bisect
+import threading
+import contextlib
+
+
+def _rec_date(r): return r.get("date", "")
+
+
+class DataIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._src = {}  # 이름 -> 인덱스를 만든 문서 객체
+        self.users = {}
+        self.records = {}
+        self.records_by_user = {}
+        self.q_by_target = {}
+        self.q_by_creator = {}
+        self.usernames = []
+        self.groups_by_user = {}  # username -> {group id: 그룹 (문서 안의 같은 객체)}
+        self.group_pos = {}       # group id -> 문서에서의 순서
+        self.peers = {}           # username -> {다른 멤버: 함께 속한 그룹 수}
+
+    def ensure(self, name, doc):
+        with self._lock:
+            if self._src.get(name) is not doc:
+                getattr(self, f"_build_{name}")(doc)
+                self._src[name] = doc
+
+    def built_from(self, name, doc):
+        return self._src.get(name) is doc
+
+    @contextlib.contextmanager
+    def swapping(self, old, new):
+        """캐시 문서를 새 사본으로 바꿔 끼우는 동안: old 로 만든 인덱스는 new 를 가리키게 하고 잠금을 쥔다"""
+        with self._lock:
+            for name, doc in self._src.items():
+                if doc is old:
+                    self._src[name] = new
+            yield
+
+    # 계정
+    def _build_users(self, doc):
+        self.users = {u["username"]: u for u in doc.get("users", [])}
+        self.usernames = sorted(self.users)
+
+    def add_user(self, user, doc):
+        with self._lock:
+            if self.built_from("users", doc):
+                if user["username"] not in self.users:
+                    bisect.insort(self.usernames, user["username"])
+                self.users[user["username"]] = user
+
+    def search_users(self, prefix, limit, exclude=()):
+        out = []
+        for name in self.usernames[bisect.bisect_left(self.usernames, prefix):]:
+            if not name.startswith(prefix) or len(out) >= limit:
+                break
+            if name not in exclude:
+                out.append(name)
+        return out
+
+    # 자가진단 기록
+    def _build_records(self, doc):
+        self.records = {}
+        self.records_by_user = {}
+        for r in doc.get("records", []):
+            self._add_record(r)
+
+    def _add_record(self, r):
+        u = r.get("username")
+        self.records[(u, r.get("date"))] = r
+        bisect.insort(self.records_by_user.setdefault(u, []), r, key=_rec_date)
+
+    def add_record(self, rec, doc):
+        with self._lock:
+            if self.built_from("records", doc):
+                self._add_record(rec)
+
+    # 맞춤 질문
+    def _build_questions(self, doc):
+        self.q_by_target = {}
+        self.q_by_creator = {}
+        for q in doc.get("custom_questions", []):
+            self._add_question(q)
+
+    def _add_question(self, q):
+        for t in q.get("targets", []):
+            self.q_by_target.setdefault(t, []).append(q)
+        self.q_by_creator.setdefault(q.get("creator"), []).append(q)
+
+    def add_question(self, q, doc):
+        with self._lock:
+            if self.built_from("questions", doc):
+                self._add_question(q)
+
+    # 그룹 (멤버 추가/나가기 때 그 그룹 멤버 수만큼만 갱신)
+    def _build_groups(self, doc):
+        self.groups_by_user, self.group_pos, self.peers = {}, {}, {}
+        for g in doc.get("groups", []):
+            self._add_group(g)
+
+    def _link(self, a, b, n):
+        for x, y in ((a, b), (b, a)):
+            p = self.peers.setdefault(x, {})
+            p[y] = p.get(y, 0) + n
+            if p[y] <= 0:
+                del p[y]
+
+    def _add_group(self, g):
+        self.group_pos[g["id"]] = len(self.group_pos)
+        members = list(dict.fromkeys(g["members"]))
+        for i, m in enumerate(members):
+            self.groups_by_user.setdefault(m, {})[g["id"]] = g
+            for other in members[:i]:
+                self._link(m, other, 1)
+
+    def add_group(self, g, doc):
+        with self._lock:
+            if self.built_from("groups", doc):
+                self._add_group(g)
+
+    def add_group_member(self, g, username, doc):
+        """username 을 더한 새 그룹 객체 g 로 바꿔 끼운 뒤 호출 (멤버들이 새 객체를 가리키게)"""
+        with self._lock:
+            if not self.built_from("groups", doc):
+                return
+            joined = g["id"] not in self.groups_by_user.get(username, {})
+            for m in g["members"]:
+                self.groups_by_user.setdefault(m, {})[g["id"]] = g
+            if joined:
+                for other in g["members"]:
+                    if other != username:
+                        self._link(username, other, 1)
+
+    def remove_group_member(self, g, username, doc):
+        """username 을 뺀 새 그룹 객체 g 로 바꿔 끼운 뒤 호출 (멤버가 없으면 문서에서는 빠진 그룹)"""
+        with self._lock:
+            if not self.built_from("groups", doc):
+                return
+            if self.groups_by_user.get(username, {}).pop(g["id"], None) is None:
+                return
+            for other in g["members"]:
+                self.groups_by_user.setdefault(other, {})[g["id"]] = g
+                if other != username:
+                    self._link(username, other, -1)
+
+    def groups_of(self, username):
+        mine = self.groups_by_user.get(username, {})
+        return sorted(mine.values(), key=lambda g: self.group_pos.get(g["id"], 0))
+
+    def peers_of(self, username):
+        return sorted(self.peers.get(username, {}))
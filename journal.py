@@ -0,0 +1,148 @@
+# journal.py — 추가 전용(JSONL) 저널
+# - append(): 한 줄 추가 후 flush + fsync (제출 1건 = O(1) 쓰기)
+# - replay(): 스냅샷 이후의 줄을 순서대로 돌려준다. 쓰다 끊긴 마지막 줄은 잘라내고 복구
+# - 각 줄은 {"seq": n, "rec": {...}} 모양. 스냅샷에 기록된 seq 이하 줄은 재생하지 않는다
+#   (스냅샷 저장 직후 저널 비우기 전에 죽어도 중복 없이 복구)
+# - 여러 프로세스가 함께 써도 되도록 추가/정리는 파일 잠금 안에서, seq 는 파일 끝 줄에서 이어받는다
+#   (정리 후에도 seq 가 되돌아가지 않게 맨 앞에 {"seq": n} 표시 줄을 남긴다)
+# - 잠금 순서는 언제나 파일 잠금 → self._lock. 저장소처럼 밖에서 file_lock(path) 를 먼저 잡고
+#   들어와도 같은 순서가 되도록 (반대로 잡는 곳이 있으면 추가와 읽기가 서로를 기다린다)
+
+import os
+import json
+import threading
+
+from locking import file_lock, notify_write
+from profiling import timed, count_read, count_write
+
+
+class Journal:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self.last_seq = 0
+        self.replay()
+
+    @timed("journal.append")
+    def append(self, rec):
+        with file_lock(self.path), self._lock:
+            self.last_seq = self.current_seq() + 1
+            line = json.dumps({"seq": self.last_seq, "rec": rec}, ensure_ascii=False) + "\n"
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                count_write(len(line.encode("utf-8")))
+                f.flush()
+                os.fsync(f.fileno())
+            notify_write(self.path)
+            return self.last_seq
+
+    @timed("journal.append_many")
+    def append_many(self, recs):
+        """여러 줄을 한 번에 (잠금·fsync 한 번). 마지막 seq 를 돌려준다"""
+        with file_lock(self.path), self._lock:
+            seq = self.current_seq()
+            lines = []
+            for rec in recs:
+                seq += 1
+                lines.append(json.dumps({"seq": seq, "rec": rec}, ensure_ascii=False) + "\n")
+            if not lines:
+                return seq
+            data = "".join(lines)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+                count_write(len(data.encode("utf-8")))
+                f.flush()
+                os.fsync(f.fileno())
+            self.last_seq = seq
+            notify_write(self.path)
+            return seq
+
+    def current_seq(self):
+        """파일 마지막 줄의 seq (다른 프로세스가 붙인 줄 포함). 끊긴 줄이 끝에 있으면 먼저 잘라낸다"""
+        with file_lock(self.path), self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                return self.last_seq
+            if size == 0:
+                return self.last_seq
+            with open(self.path, "rb") as f:
+                f.seek(max(0, size - 65536))
+                tail = f.read()
+            if not tail.endswith(b"\n"):
+                self.entries()  # 끊긴 마지막 줄 정리
+                return self.last_seq
+            for line in reversed(tail.splitlines()):
+                try:
+                    self.last_seq = max(self.last_seq, int(json.loads(line).get("seq", 0)))
+                    break
+                except Exception:
+                    continue
+            return self.last_seq
+
+    def replay(self, after_seq=0):
+        """after_seq 보다 큰 seq 의 레코드 목록"""
+        return [rec for _, rec in self.entries(after_seq)]
+
+    def entries(self, after_seq=0):
+        """(seq, rec) 목록. 끊긴 마지막 줄은 파일에서 잘라낸다."""
+        out = []
+        with file_lock(self.path), self._lock:
+            if not os.path.exists(self.path):
+                return out
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            count_read(len(raw))
+            good_end = 0
+            pos = 0
+            while pos < len(raw):
+                nl = raw.find(b"\n", pos)
+                if nl == -1:
+                    break  # 줄바꿈까지 쓰지 못한 마지막 줄 = 끊긴 줄
+                end = nl + 1
+                try:
+                    entry = json.loads(raw[pos:end].decode("utf-8"))
+                except Exception:
+                    pos = end  # 중간의 깨진 줄은 건너뛴다
+                    good_end = end
+                    continue
+                seq = int(entry.get("seq", 0))
+                self.last_seq = max(self.last_seq, seq)
+                if seq > after_seq and "rec" in entry:
+                    out.append((seq, entry["rec"]))
+                pos = good_end = end
+            if good_end < len(raw):
+                with open(self.path, "r+b") as f:
+                    f.truncate(good_end)
+                    f.flush()
+                    os.fsync(f.fileno())
+        return out
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def truncate(self, upto_seq):
+        """스냅샷이 upto_seq 까지 반영된 뒤 호출. 그 사이 새로 붙은 줄은 남긴다."""
+        with file_lock(self.path), self._lock:
+            if not os.path.exists(self.path):
+                return
+            keep = []
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        if "rec" in entry and int(entry.get("seq", 0)) > upto_seq:
+                            keep.append(line)
+                    except Exception:
+                        pass
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"seq": upto_seq}) + "\n")
+                f.writelines(keep)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            notify_write(self.path)
@@ -0,0 +1,156 @@
+# locking.py — 여러 세션/프로세스가 같은 accounts/ 를 쓸 때의 안전장치
+# - atomic_write_json(): 임시 파일에 쓰고 fsync 후 rename (중간에 죽어도 반쯤 쓴 JSON 이 남지 않음)
+# - file_lock(): 파일(또는 사용자 폴더)마다 따로 거는 advisory 잠금 (fcntl.flock, 같은 스레드 재진입 가능)
+# - update_json(): 버전(_version) 기반 낙관적 읽기-수정-쓰기. 그 사이 누가 먼저 썼으면 다시 시도
+# - on_write()/notify_write(): 파일이 바뀌거나 지워졌다고 알린다 (복제기가 버킷에 올릴 목록을 만든다)
+
+import os
+import re
+import json
+import time
+import random
+import threading
+import contextlib
+
+from profiling import count_read, count_write, ENABLED as PROFILING
+
+try:
+    import fcntl
+except ImportError:  # Windows 등: 프로세스 안 스레드끼리만 잠근다
+    fcntl = None
+
+
+class WriteConflict(Exception):
+    """재시도해도 다른 쓰기와 계속 겹칠 때"""
+
+
+class CorruptFile(Exception):
+    """파일은 있는데 JSON 으로 읽을 수 없을 때 (기본값으로 덮어쓰지 않도록 멈춘다)"""
+
+
+# -------------------- 쓰기 알림 --------------------
+_write_listeners = []
+
+
+def on_write(fn):
+    _write_listeners.append(fn)
+
+
+def notify_write(path):
+    for fn in _write_listeners:
+        try:
+            fn(path)
+        except Exception:
+            pass  # 알림 실패가 쓰기를 막지 않게
+
+
+# -------------------- 잠금 --------------------
+_held = threading.local()
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def holding_locks():
+    """이 스레드가 지금 file_lock 을 하나라도 쥐고 있는지"""
+    return any(getattr(_held, "counts", {}).values())
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    held = getattr(_held, "counts", None)
+    if held is None:
+        held = _held.counts = {}
+    if held.get(path):
+        held[path] += 1
+        try:
+            yield
+        finally:
+            held[path] -= 1
+        return
+
+    if fcntl is not None:
+        fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            held[path] = 1
+            try:
+                yield
+            finally:
+                held.pop(path, None)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+    else:
+        with _thread_locks_guard:
+            lk = _thread_locks.setdefault(path, threading.Lock())
+        with lk:
+            held[path] = 1
+            try:
+                yield
+            finally:
+                held.pop(path, None)
+
+
+# -------------------- 원자적 쓰기 --------------------
+def atomic_write_json(path, data, indent=2):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+            if PROFILING:
+                count_write(os.fstat(f.fileno()).st_size)
+        os.replace(tmp, path)
+        notify_write(path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# -------------------- 버전 --------------------
+_VERSION_RE = re.compile(rb'^\{\s*"_version":\s*(\d+)')
+
+
+def stamp(data, version):
+    # _version 을 맨 앞 키로 둬서 peek_version() 이 파일 앞부분만 읽고 알 수 있게 한다
+    return {"_version": version, **{k: v for k, v in data.items() if k != "_version"}}
+
+
+def peek_version(path):
+    try:
+        with open(path, "rb") as f:
+            head = f.read(64)
+    except OSError:
+        return 0
+    m = _VERSION_RE.match(head)
+    if m:
+        return int(m.group(1))
+    return read_versioned(path, {})[1]
+
+
+def read_versioned(path, default):
+    if not os.path.exists(path):
+        return default, 0
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if PROFILING:
+                count_read(os.fstat(f.fileno()).st_size)
+            data = json.load(f)
+    except Exception as e:
+        raise CorruptFile(path) from e
+    return data, int(data.get("_version", 0)) if isinstance(data, dict) else 0
+
+
+def update_json(path, default, fn, retries=8):
+    """잠금 없이 읽고 fn(data) 로 고친 뒤, 잠금 안에서 버전이 그대로일 때만 쓴다"""
+    for attempt in range(retries):
+        data, ver = read_versioned(path, default)
+        fn(data)
+        with file_lock(path):
+            if peek_version(path) == ver:
+                data = stamp(data, ver + 1)
+                atomic_write_json(path, data)
+                return data
+        time.sleep(random.uniform(0, 0.01 * (2 ** attempt)))
+    raise WriteConflict(path)
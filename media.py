@@ -0,0 +1,162 @@
+# media.py — 첨부 후처리 (별도 프로세스 풀)
+# - 사진: Pillow 로 썸네일(JPEG) → blobs/derived/thumbs/<sha>.jpg. 상세 화면은 st.image 로,
+#   달력 칸은 작게 줄인 data: URI 로 HTML 에 넣는다 (정적 서빙은 로그인 없이 열리므로 쓰지 않는다)
+# - 음성: pydub 로 음량 정규화 + 모노/44.1kHz → blobs/derived/<sha>.<mp3|wav> (ffmpeg 가 없으면 wav 만)
+# - 저장(추억 기록)은 작업을 넘기기만 하고 기다리지 않는다. 결과 파일이 생기기 전까지 화면은 원본/안내를 보여준다
+# - 결과 파일 이름이 원본 sha 로 정해지므로 같은 작업이 두 번 들어와도 한 번만 한다
+
+import os
+import io
+import base64
+import shutil
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, BrokenExecutor
+
+from blobs import BLOB_DIR, get_blobs, valid_sha, valid_attachment
+
+DERIVED_DIR = f"{BLOB_DIR}/derived"
+THUMB_DIR = os.environ.get("MEDIA_THUMB_DIR", f"{DERIVED_DIR}/thumbs")
+THUMB_SIZE = int(os.environ.get("MEDIA_THUMB_SIZE", 320))
+CELL_THUMB_SIZE = int(os.environ.get("MEDIA_CELL_THUMB_SIZE", 96))  # 달력 칸 (44px 의 2배 해상도 정도)
+MEDIA_WORKERS = int(os.environ.get("MEDIA_WORKERS", 2))
+AUDIO_FORMAT = "mp3" if shutil.which("ffmpeg") or shutil.which("avconv") else "wav"
+TARGET_DBFS = -16.0
+
+
+def thumb_path(sha): return os.path.join(THUMB_DIR, f"{sha}.jpg")
+def audio_path(sha): return f"{DERIVED_DIR}/{sha}.{AUDIO_FORMAT}"
+
+
+# -------------------- 작업 (다른 프로세스에서 실행) --------------------
+def _tmp(dst): return f"{dst}.{os.getpid()}.tmp"
+
+
+def make_thumbnail(src, dst, size=THUMB_SIZE):
+    if os.path.exists(dst):
+        return dst
+    from PIL import Image, ImageOps
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)  # 휴대폰 사진 회전 정보 반영
+        im.thumbnail((size, size))
+        if im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        im.save(_tmp(dst), "JPEG", quality=80, optimize=True)
+    os.replace(_tmp(dst), dst)
+    return dst
+
+
+def normalize_audio(src, dst, src_format=None, fmt=AUDIO_FORMAT):
+    if os.path.exists(dst):
+        return dst
+    from pydub import AudioSegment
+    seg = AudioSegment.from_file(src, format=src_format)  # wav 는 ffmpeg 없이도 읽힌다
+    seg = seg.set_channels(1).set_frame_rate(44100)
+    if seg.dBFS != float("-inf"):
+        seg = seg.apply_gain(TARGET_DBFS - seg.dBFS)
+    seg.export(_tmp(dst), format=fmt)
+    os.replace(_tmp(dst), dst)
+    return dst
+
+
+@functools.lru_cache(maxsize=2048)
+def _cell_data_uri(path, size=CELL_THUMB_SIZE):
+    # 경로가 원본 sha 로 정해지고 내용이 바뀌지 않으므로 프로세스 안에서 한 번만 만든다 (한 장 몇 KB)
+    from PIL import Image
+    with Image.open(path) as im:
+        im.thumbnail((size, size))
+        buf = io.BytesIO()
+        im.convert("RGB").save(buf, "JPEG", quality=70)
+    return "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+# -------------------- 풀 --------------------
+class MediaPipeline:
+    def __init__(self, workers=MEDIA_WORKERS):
+        self.workers = workers
+        os.makedirs(THUMB_DIR, exist_ok=True)
+        os.makedirs(DERIVED_DIR, exist_ok=True)
+        self.blobs = get_blobs()
+        self._lock = threading.Lock()
+        self._inflight = {}  # 결과 경로 -> Future
+        self._failed = set()  # 만들지 못한 결과 경로 (깨진 파일, ffmpeg 없음 등) — 다시 맡기지 않는다
+        self.pool = self._new_pool()
+
+    def _new_pool(self):
+        try:
+            # spawn: Streamlit 프로세스의 스레드 상태를 물려받지 않게
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        except Exception:
+            return ThreadPoolExecutor(max_workers=1, thread_name_prefix="media")
+
+    def _submit(self, fn, src, dst, *args):
+        if os.path.exists(dst) or dst in self._failed:
+            return None
+        with self._lock:
+            fut = self._inflight.get(dst)
+            if fut is not None and not fut.done():
+                return fut
+            try:
+                fut = self.pool.submit(fn, src, dst, *args)
+            except BrokenExecutor:
+                self.pool = self._new_pool()  # 작업 프로세스가 죽었으면 풀을 새로
+                fut = self.pool.submit(fn, src, dst, *args)
+            self._inflight[dst] = fut
+        fut.add_done_callback(lambda f: self._done(dst, f))
+        return fut
+
+    def _done(self, dst, fut):
+        with self._lock:
+            self._inflight.pop(dst, None)
+            if fut.cancelled() or fut.exception() is not None:
+                self._failed.add(dst)
+
+    def process(self, att):
+        """첨부 하나의 후처리를 맡긴다 (기다리지 않음)"""
+        if not valid_attachment(att):
+            return None
+        src = self.blobs.path(att["sha"])
+        if att["kind"] == "image":
+            return self._submit(make_thumbnail, src, thumb_path(att["sha"]))
+        if att["kind"] == "audio":
+            ext = os.path.splitext(att.get("name", ""))[1].lower().lstrip(".") or None
+            return self._submit(normalize_audio, src, audio_path(att["sha"]), ext)
+        return None
+
+    # 결과 조회 (없으면 None → 화면은 원본이나 "준비 중")
+    def thumbnail(self, sha):
+        if not valid_sha(sha):
+            return None
+        p = thumb_path(sha)
+        return p if os.path.exists(p) else None
+
+    def cell_thumbnail(self, sha):
+        """달력 칸용 작은 썸네일 data: URI (썸네일이 아직 없으면 None)"""
+        p = self.thumbnail(sha)
+        return _cell_data_uri(p) if p else None
+
+    def audio(self, sha):
+        if not valid_sha(sha):
+            return None
+        p = audio_path(sha)
+        return p if os.path.exists(p) else None
+
+    def failed(self, att):
+        if not valid_attachment(att):
+            return True
+        dst = thumb_path(att["sha"]) if att["kind"] == "image" else audio_path(att["sha"])
+        return dst in self._failed
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = MediaPipeline()
+    return _pipeline
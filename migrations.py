@@ -0,0 +1,136 @@
+# migrations.py — 데이터 폴더 스키마 버전과 순서대로 한 번씩만 도는 마이그레이션
+# - accounts/schema_version.json 에 적용된 버전을 기록한다
+# - 프로세스 시작 때 한 번(app.py 의 st.cache_resource) 또는 CLI 로: python migrations.py
+# - 여러 프로세스가 동시에 떠도 파일 잠금 안에서 한 곳만 실행한다. 각 단계는 다시 돌려도 안전(idempotent)
+# - 인덱스/캐시는 메모리 상태라 버전과 무관하게 프로세스마다 시작 시 한 번 데운다
+#   (마이그레이션이 끝나면 백그라운드 스레드에서 — 첫 화면은 기다리지 않고, 첫 조작은 파일을 읽지 않게)
+
+import os
+import sys
+import json
+import threading
+from datetime import datetime
+
+import storage
+from locking import file_lock, atomic_write_json
+from passwords import hash_pw, is_hashed
+from analytics import get_analytics
+
+SCHEMA_FILE = f"{storage.DATA_DIR}/schema_version.json"
+
+
+# -------------------- 단계들 --------------------
+def m001_create_dirs(store):
+    for sub in ("", "memories", "decos", "alerts", "sessions", "summary"):
+        os.makedirs(os.path.join(storage.DATA_DIR, sub), exist_ok=True)
+
+
+def m002_hash_plaintext_passwords(store):
+    for u in store.list_users():
+        if not is_hashed(u.get("password", "")):
+            store.set_password(u["username"], hash_pw(u.get("password", "")))
+
+
+def m003_group_ids(store):
+    groups = store.load(storage.GROUPS_FILE, {"groups": []})["groups"]
+    if any(not g.get("id") for g in groups):
+        store.save(storage.GROUPS_FILE, {"groups": [dict(g, id=g.get("id") or storage.new_group_id()) for g in groups]})
+
+
+def m004_shard_memories(store):
+    # JSON 백엔드: 예전 사용자별 한 파일 → 월별 샤드
+    for shards in (getattr(store, "mem_shards", None), getattr(store, "deco_shards", None)):
+        if shards is not None:
+            for user in shards.users():
+                shards.ensure_split(user)
+
+
+def m005_drop_global_session(store):
+    # 예전에는 마지막 로그인 한 건을 모든 브라우저에 복원했다 → 토큰 세션으로 대체
+    store.delete(storage.SESSION_FILE)
+
+
+def m006_day_summaries(store):
+    # 연간 히트맵용 하루 요약을 기존 데이터로 처음 채운다 (이후로는 저장할 때마다 그 날만 갱신)
+    users = {u["username"] for u in store.list_users()} | set(store.mem_users()) | set(store.deco_users())
+    for user in sorted(users):
+        store.rebuild_summary(user)
+
+
+MIGRATIONS = [
+    (1, "create_dirs", m001_create_dirs),
+    (2, "hash_plaintext_passwords", m002_hash_plaintext_passwords),
+    (3, "group_ids", m003_group_ids),
+    (4, "shard_memories", m004_shard_memories),
+    (5, "drop_global_session", m005_drop_global_session),
+    (6, "day_summaries", m006_day_summaries),
+]
+
+
+# -------------------- 실행 --------------------
+def read_version():
+    try:
+        with open(SCHEMA_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"version": 0, "applied": []}
+
+
+def migrate(store, log=None):
+    """밀린 단계를 순서대로 적용하고 적용한 단계 이름 목록을 돌려준다"""
+    os.makedirs(storage.DATA_DIR, exist_ok=True)
+    done = []
+    with file_lock(SCHEMA_FILE):
+        state = read_version()
+        for version, name, fn in MIGRATIONS:
+            if version <= state["version"]:
+                continue
+            if log:
+                log(f"[{version}] {name} ...")
+            fn(store)
+            state["version"] = version
+            state["applied"].append({"version": version, "name": name,
+                                     "at": datetime.now().isoformat(timespec="seconds")})
+            atomic_write_json(SCHEMA_FILE, state)  # 단계마다 기록: 중간에 죽으면 그 단계부터 다시
+            done.append(name)
+    return done
+
+
+def warm_indexes(store):
+    # 첫 요청이 인덱스를 만들지 않도록 미리 (JSON 백엔드 메모리 인덱스)
+    store.get_user("")
+    store.has_record("", "")
+    store.questions_for("")
+
+
+def warm_caches(store):
+    # 전역 파일 + 이번 달 샤드 + 받는이별 분석 열 (캐시 절반까지만 채워 실제 요청 몫을 남긴다)
+    store.groups_of("")
+    ym = datetime.now().strftime("%Y-%m")
+    analytics = get_analytics()
+    for u in store.list_users()[:storage.CACHE_MAX_ENTRIES // 4]:
+        name = u["username"]
+        store.load_mems_month(name, ym)
+        store.load_decos_month(name, ym)
+        if u.get("role") == "받는이":
+            analytics.series(store, name)
+
+
+def warm(store):
+    try:
+        warm_indexes(store)
+        warm_caches(store)
+    except Exception:
+        pass  # 데우기는 최적화일 뿐 — 실패해도 요청 때 다시 읽는다
+
+
+def startup(store):
+    done = migrate(store)
+    threading.Thread(target=warm, args=(store,), name="cache-warmer", daemon=True).start()
+    return done
+
+
+if __name__ == "__main__":
+    applied = migrate(storage.get_store(), log=print)
+    print(f"스키마 버전 {read_version()['version']} ({'적용: ' + ', '.join(applied) if applied else '변경 없음'})")
+    sys.exit(0)
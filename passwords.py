@@ -0,0 +1,199 @@
+# passwords.py — 비밀번호 해시
+# - 새 해시는 솔트를 붙인 scrypt: "scrypt$n$r$p$<salt>$<hash>" (scrypt 가 없는 빌드면 PBKDF2-SHA256)
+# - 예전 sha256 해시(솔트 없음)도 검증하고, 로그인에 성공하면 새 형식으로 바꿔 저장한다 (needs_rehash)
+# - 해시 계산은 크기가 정해진 스레드 풀에서 한다. 대기열이 차면 PasswordBusy 로 바로 거절
+#   (스크립트 스레드를 오래 막거나 무차별 대입이 풀을 독차지하지 않게)
+# - LoginThrottle: 아이디/IP 별 실패 횟수에 따라 잠시 막는다 (프로세스 메모리)
+#   IP 는 믿을 수 있을 때만 센다(throttle_ip). 모르는 IP(프록시 주소, localhost)를 키로 쓰면 모두가 한 키를 나눠 쓴다
+
+import os
+import hmac
+import ipaddress
+import time
+import base64
+import hashlib
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+SCRYPT_N = int(os.environ.get("PW_SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.environ.get("PW_SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("PW_SCRYPT_P", 1))
+PBKDF2_ITERS = int(os.environ.get("PW_PBKDF2_ITERS", 600000))
+PW_WORKERS = int(os.environ.get("PW_WORKERS", 2))
+PW_QUEUE = int(os.environ.get("PW_QUEUE", 8))          # 실행 중 + 대기 중 최대 개수
+PW_TIMEOUT = float(os.environ.get("PW_TIMEOUT", 10))   # 초
+
+HAS_SCRYPT = hasattr(hashlib, "scrypt")
+
+
+class PasswordBusy(Exception):
+    """해시 풀 대기열이 가득 참"""
+
+
+# -------------------- 해시 형식 --------------------
+def _b64(b): return base64.b64encode(b).decode("ascii")
+def _unb64(s): return base64.b64decode(s.encode("ascii"))
+
+
+def sha256_hex(pw: str) -> str:
+    return hashlib.sha256(pw.encode("utf-8")).hexdigest()
+
+
+def is_sha256_hex(s: str) -> bool:
+    return isinstance(s, str) and len(s) == 64 and all(c in "0123456789abcdef" for c in s)
+
+
+def is_hashed(s: str) -> bool:
+    return is_sha256_hex(s) or (isinstance(s, str) and s.split("$", 1)[0] in ("scrypt", "pbkdf2_sha256"))
+
+
+def _scrypt(pw, salt, n, r, p):
+    return hashlib.scrypt(pw.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * r * n + (1 << 20), dklen=32)
+
+
+def _hash_sync(pw):
+    salt = secrets.token_bytes(16)
+    if HAS_SCRYPT:
+        dk = _scrypt(pw, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(dk)}"
+    dk = hashlib.pbkdf2_hmac("sha256", pw.encode("utf-8"), salt, PBKDF2_ITERS)
+    return f"pbkdf2_sha256${PBKDF2_ITERS}${_b64(salt)}${_b64(dk)}"
+
+
+def _verify_sync(pw, stored):
+    if is_sha256_hex(stored):
+        return hmac.compare_digest(sha256_hex(pw), stored)
+    parts = (stored or "").split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            return hmac.compare_digest(_scrypt(pw, _unb64(parts[4]), n, r, p), _unb64(parts[5]))
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            dk = hashlib.pbkdf2_hmac("sha256", pw.encode("utf-8"), _unb64(parts[2]), int(parts[1]))
+            return hmac.compare_digest(dk, _unb64(parts[3]))
+    except (ValueError, TypeError):
+        return False
+    return False
+
+
+def needs_rehash(stored: str) -> bool:
+    """예전 sha256 이거나 현재 설정보다 약한 매개변수면 True"""
+    parts = (stored or "").split("$")
+    if HAS_SCRYPT:
+        return parts[:4] != ["scrypt", str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)]
+    return parts[:2] != ["pbkdf2_sha256", str(PBKDF2_ITERS)]
+
+
+# -------------------- 해시 풀 --------------------
+_pool = ThreadPoolExecutor(max_workers=PW_WORKERS, thread_name_prefix="pw-hash")
+_slots = threading.BoundedSemaphore(PW_QUEUE)
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordBusy()
+    try:
+        fut = _pool.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    fut.add_done_callback(lambda _: _slots.release())
+    try:
+        return fut.result(timeout=PW_TIMEOUT)
+    except FutureTimeout:
+        raise PasswordBusy()
+
+
+def hash_pw(pw: str) -> str:
+    return _run(_hash_sync, pw)
+
+
+def verify_pw(pw: str, stored: str) -> bool:
+    return _run(_verify_sync, pw, stored)
+
+
+# 없는 아이디도 같은 시간이 걸리게 비교할 더미 해시
+_DUMMY = None
+
+
+def verify_missing(pw: str) -> bool:
+    global _DUMMY
+    if _DUMMY is None:
+        _DUMMY = _hash_sync(secrets.token_hex(8))
+    verify_pw(pw, _DUMMY)
+    return False
+
+
+# -------------------- 로그인 시도 제한 --------------------
+THROTTLE_FREE = int(os.environ.get("LOGIN_FREE_ATTEMPTS", 5))     # 이만큼은 바로 다시 시도 가능
+THROTTLE_MAX_WAIT = int(os.environ.get("LOGIN_MAX_WAIT", 900))    # 초
+THROTTLE_WINDOW = int(os.environ.get("LOGIN_WINDOW", 900))        # 마지막 실패 후 이만큼 지나면 초기화
+THROTTLE_MAX_KEYS = 10000
+TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", 0))  # 앞단 리버스 프록시 수 (X-Forwarded-For 를 믿을 개수)
+
+
+def throttle_ip(forwarded_for, peer, trusted=TRUSTED_PROXIES):
+    """IP 별 제한에 쓸 주소. 믿을 수 없으면 None (그때는 아이디 별로만 센다)
+    - X-Forwarded-For 의 앞쪽은 클라이언트가 채울 수 있으므로 우리 프록시(trusted 개)가 덧붙인 오른쪽 끝만
+    - 프록시를 설정하지 않았는데 X-Forwarded-For 가 있으면 연결 주소는 프록시의 것 → None
+    - 연결 주소가 없거나 loopback 이면 (같은 호스트의 프록시/개발 서버) → None"""
+    hops = [h.strip() for h in (forwarded_for or "").split(",") if h.strip()]
+    if trusted:
+        ip = hops[-trusted] if len(hops) >= trusted else None
+    else:
+        ip = None if hops else peer
+    try:
+        return None if not ip or ipaddress.ip_address(ip).is_loopback else ip
+    except ValueError:
+        return None
+
+
+class LoginThrottle:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fails = {}  # key -> [실패 수, 마지막 실패 시각, 막힌 시각까지]
+
+    def wait_time(self, *keys):
+        """남은 대기 시간(초). 0 이면 시도 가능"""
+        now = time.time()
+        with self._lock:
+            return max([self._fails[k][2] - now for k in keys if k in self._fails] + [0])
+
+    def login_wait(self, user_key, ip_key=None):
+        """로그인 대기 시간. IP 키는 그 아이디에도 최근 실패가 있을 때만 센다
+        (한 IP 의 실패가 실패 없는 다른 계정까지 막지 않게)"""
+        now = time.time()
+        with self._lock:
+            u = self._fails.get(user_key)
+            if u is None or now - u[1] > THROTTLE_WINDOW:
+                return 0
+            waits = [u[2] - now, 0]
+            if ip_key in self._fails:
+                waits.append(self._fails[ip_key][2] - now)
+            return max(waits)
+
+    def fail(self, *keys):
+        now = time.time()
+        with self._lock:
+            if len(self._fails) > THROTTLE_MAX_KEYS:
+                self._prune(now)
+            for k in keys:
+                count, last, _ = self._fails.get(k, [0, 0, 0])
+                if now - last > THROTTLE_WINDOW:
+                    count = 0
+                count += 1
+                wait = 0 if count <= THROTTLE_FREE else min(2 ** (count - THROTTLE_FREE), THROTTLE_MAX_WAIT)
+                self._fails[k] = [count, now, now + wait]
+
+    def reset(self, *keys):
+        with self._lock:
+            for k in keys:
+                self._fails.pop(k, None)
+
+    def _prune(self, now):
+        for k in [k for k, v in self._fails.items() if now - v[1] > THROTTLE_WINDOW and v[2] < now]:
+            del self._fails[k]
+
+
+throttle = LoginThrottle()
@@ -0,0 +1,224 @@
+# profiling.py — rerun 단위 구간 측정 (PROFILE=1 일 때만)
+# - span("이름") 컨텍스트 / @timed("이름") 데코레이터로 구간 시간을 잰다. 중첩되면 자기 시간(자식 제외)만 더한다
+# - count_read / count_write 로 저장소가 읽고 쓴 바이트를 rerun 마다 센다
+# - rerun 하나 = 기록 하나: {ts, page, user, total_ms, spans: {이름: [ms, 횟수]}, other_ms, bytes_read, bytes_written}
+#   → 최근 PROFILE_KEEP 개는 메모리에(사이드바 패널용), 전부는 회전하는 JSONL 로그에
+# - st.rerun()/st.stop() 으로 끝까지 못 간 rerun 은 같은 세션의 다음 rerun 이 시작될 때 마무리한다
+#   (그 사이 fragment 만 다시 도는 rerun 은 스레드에 남은 그 기록에 붙지 않고 따로 기록)
+# - 꺼져 있으면 timed 는 원래 함수를 그대로 돌려주고, span 은 아무 일도 안 하는 객체 하나를 돌려준다
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+ENABLED = os.environ.get("PROFILE", "").lower() in ("1", "true", "yes", "on")
+PROFILE_LOG = os.environ.get("PROFILE_LOG", f"{os.environ.get('DATA_DIR', 'accounts')}/profile.jsonl")
+PROFILE_LOG_BYTES = int(os.environ.get("PROFILE_LOG_BYTES", 5 * 1024 * 1024))
+PROFILE_LOG_BACKUPS = int(os.environ.get("PROFILE_LOG_BACKUPS", 3))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 200))
+PROFILE_ADMINS = [u.strip() for u in os.environ.get("PROFILE_ADMINS", "").split(",") if u.strip()]
+
+_local = threading.local()
+_lock = threading.Lock()
+_recent = deque(maxlen=PROFILE_KEEP)
+_pending = {}  # 세션 키 -> 끝나지 않은 기록
+_log = None
+
+
+class _Null:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+
+_NULL = _Null()
+
+
+class _Span:
+    __slots__ = ("rec", "name", "t0", "child")
+
+    def __init__(self, rec, name):
+        self.rec, self.name = rec, name
+
+    def __enter__(self):
+        self.child = 0.0
+        _stack().append(self)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = (time.perf_counter() - self.t0) * 1000
+        stack = _stack()
+        stack.pop()
+        if stack:
+            stack[-1].child += elapsed
+        slot = self.rec["spans"].setdefault(self.name, [0.0, 0])
+        slot[0] += elapsed - self.child
+        slot[1] += 1
+        self.rec["_last"] = time.perf_counter()
+        return False
+
+
+def _stack():
+    st = getattr(_local, "stack", None)
+    if st is None:
+        st = _local.stack = []
+    return st
+
+
+def _current():
+    return getattr(_local, "rec", None)
+
+
+# -------------------- 측정 API --------------------
+def span(name):
+    rec = _current() if ENABLED else None
+    return _Span(rec, name) if rec is not None else _NULL
+
+
+def timed(name=None):
+    def deco(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__qualname__
+
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = fn.__name__, fn.__doc__, fn
+        return wrapper
+    return deco
+
+
+def count_read(n):
+    rec = _current() if ENABLED else None
+    if rec is not None:
+        rec["bytes_read"] += n
+
+
+def count_write(n):
+    rec = _current() if ENABLED else None
+    if rec is not None:
+        rec["bytes_written"] += n
+
+
+# -------------------- rerun 경계 --------------------
+def _new(page, user, session):
+    now = time.perf_counter()
+    return {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "page": page, "user": user, "session": session,
+            "spans": {}, "bytes_read": 0, "bytes_written": 0, "_t0": now, "_last": now}
+
+
+def begin_rerun(session, user=""):
+    """스크립트 맨 앞에서. 같은 세션의 끝나지 않은 기록이 있으면 먼저 마무리"""
+    if not ENABLED:
+        return
+    with _lock:
+        prev = _pending.pop(session, None)
+    if prev is not None:
+        _finish(prev, interrupted=True)
+    rec = _new("-", user, session)
+    _local.rec, _local.stack = rec, []
+    with _lock:
+        _pending[session] = rec
+
+
+def set_page(page, user=None):
+    rec = _current() if ENABLED else None
+    if rec is not None:
+        rec["page"] = page
+        if user is not None:
+            rec["user"] = user
+
+
+def end_rerun():
+    """스크립트 맨 끝에서"""
+    rec = _current() if ENABLED else None
+    if rec is None:
+        return
+    with _lock:
+        if _pending.get(rec["session"]) is rec:
+            del _pending[rec["session"]]
+    _finish(rec, interrupted=False)
+
+
+class fragment_scope:
+    """fragment 함수 감싸기: 전체 rerun 안이면 구간 하나, fragment 만 다시 돌 때는 기록 하나
+    partial=True(fragment 만 다시 도는 중)면 이 스레드에 남은 기록이 있어도 새로 시작한다 —
+    st.rerun() 으로 끊긴 전체 rerun 의 기록은 다음 begin_rerun 이 마무리할 몫이다"""
+
+    def __init__(self, name, partial=False):
+        self.name = name
+        self.partial = partial
+
+    def __enter__(self):
+        self.own = ENABLED and (self.partial or _current() is None)
+        if self.own:
+            _local.rec, _local.stack = _new(f"fragment:{self.name}", "", None), []
+        self.inner = span(f"fragment:{self.name}")
+        self.inner.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.inner.__exit__(*exc)
+        if self.own:
+            _finish(_local.rec, interrupted=exc[0] is not None)
+        return False
+
+
+def _finish(rec, interrupted):
+    end = time.perf_counter() if not interrupted else rec["_last"]
+    if getattr(_local, "rec", None) is rec:
+        _local.rec, _local.stack = None, []
+    out = {k: v for k, v in rec.items() if not k.startswith("_") and k != "session"}
+    out["total_ms"] = round((end - rec["_t0"]) * 1000, 2)
+    out["spans"] = {k: [round(v[0], 2), v[1]] for k, v in rec["spans"].items()}
+    out["other_ms"] = round(out["total_ms"] - sum(v[0] for v in out["spans"].values()), 2)
+    out["interrupted"] = interrupted
+    with _lock:
+        _recent.append(out)
+    _write_log(out)
+
+
+def _write_log(out):
+    global _log
+    try:
+        if _log is None:
+            os.makedirs(os.path.dirname(PROFILE_LOG) or ".", exist_ok=True)
+            handler = RotatingFileHandler(PROFILE_LOG, maxBytes=PROFILE_LOG_BYTES,
+                                          backupCount=PROFILE_LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _log = logging.getLogger("warm_memories.profile")
+            _log.setLevel(logging.INFO)
+            _log.propagate = False
+            _log.addHandler(handler)
+        _log.info(json.dumps(out, ensure_ascii=False))
+    except Exception:
+        pass  # 측정 로그 실패가 화면을 막지 않게
+
+
+# -------------------- 조회 (사이드바 패널) --------------------
+def can_view(username):
+    return ENABLED and (not PROFILE_ADMINS or username in PROFILE_ADMINS)
+
+
+def recent(n=20):
+    with _lock:
+        return list(_recent)[-n:][::-1]
+
+
+def _pct(sorted_vals, q):
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))]
+
+
+def page_stats():
+    """페이지별 rerun 수 / p50 / p95 (ms)"""
+    by_page = {}
+    with _lock:
+        for r in _recent:
+            by_page.setdefault(r["page"], []).append(r["total_ms"])
+    return [{"page": p, "n": len(v), "p50": _pct(sorted(v), 0.5), "p95": _pct(sorted(v), 0.95)}
+            for p, v in sorted(by_page.items())]
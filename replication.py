@@ -0,0 +1,325 @@
+# replication.py — 데이터 폴더를 버킷(Firebase/GCS)에 나중에 한꺼번에 복제 (write-behind)
+# - 로컬 쓰기가 언제나 먼저: 쓰기는 notify_write() 로 "바뀐 파일" 표시만 하고 바로 돌아간다
+# - 백그라운드 스레드가 바뀐 파일을 모아(REPLICA_BATCH) 올리고, 실패하면 지수 백오프로 다시 시도
+# - 복제 지연 상한(REPLICA_MAX_LAG 초): 가장 오래 기다린 파일이 상한에 닿으면 주기를 기다리지 않고 바로 올리고,
+#   그래도 상한의 두 배를 넘게 밀리면 화면 실행을 시작할 때(잠금을 쥐지 않은 곳) 잠시(REPLICA_BLOCK 초까지) 기다린다.
+#   업로드가 되는데 못 따라갈 때만 — 마지막 시도가 실패했으면 기다려도 줄지 않으므로 기다리지 않고 경고만 (notify_write 는 절대 기다리지 않는다)
+# - 콜드 스타트(로컬 데이터 폴더가 비어 있음)면 버킷에서 내려받아 복원한 뒤 저장소를 연다
+# - SQLite 백엔드: DB 파일은 backup API 로 일관된 사본을 떠서 올린다 (WAL 파일은 올리지 않음)
+# - REPLICATION=off|gcs|local (기본: FIREBASE_SERVICE_ACCOUNT/FIREBASE_BUCKET 이 있으면 gcs)
+#   local = 파일시스템 버킷 에뮬레이터 (LOCAL_SAVE_DIR) — 오프라인 확인용
+
+import os
+import json
+import time
+import atexit
+import shutil
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import storage
+from locking import on_write, holding_locks
+
+REPLICATION = os.environ.get("REPLICATION", "auto").lower()
+REPLICA_PREFIX = os.environ.get("REPLICA_PREFIX", "warm-memories").strip("/")
+REPLICA_INTERVAL = float(os.environ.get("REPLICA_INTERVAL", 5))      # 초: 모아서 올리는 주기
+REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", 60))       # 초: 복제 지연 상한
+REPLICA_BLOCK = float(os.environ.get("REPLICA_BLOCK", 5))            # 초: 상한을 크게 넘었을 때 쓰기가 기다리는 최대 시간
+REPLICA_BATCH = int(os.environ.get("REPLICA_BATCH", 64))
+REPLICA_MAX_BACKOFF = float(os.environ.get("REPLICA_MAX_BACKOFF", 300))
+LOCAL_SAVE_DIR = os.environ.get("LOCAL_SAVE_DIR", "shared_memories")
+
+# 복제하지 않는 것: 잠금/임시 파일, SQLite WAL, 다시 만들 수 있는 파생 파일, 측정 로그
+SKIP_SUFFIXES = (".lock", ".tmp", "-wal", "-shm", "-journal")
+SKIP_PARTS = ("/blobs/tmp/", "/blobs/derived/")
+SKIP_NAMES = ("profile.jsonl",)
+
+
+# -------------------- 버킷 --------------------
+class LocalBucket:
+    """파일시스템 버킷 에뮬레이터 (키 = 상대 경로)"""
+
+    def __init__(self, root=LOCAL_SAVE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key): return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key, path):
+        dst = self._path(key)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, dst)
+
+    def get(self, key, path):
+        shutil.copyfile(self._path(key), path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix):
+        base = self._path(prefix)
+        out = []
+        for dirpath, _, names in os.walk(base):
+            for name in names:
+                if not name.endswith(".tmp"):
+                    rel = os.path.relpath(os.path.join(dirpath, name), self.root)
+                    out.append(rel.replace(os.sep, "/"))
+        return out
+
+
+class GcsBucket:
+    """Firebase Storage(GCS) 버킷 — firebase-admin 으로 연결"""
+
+    def __init__(self, service_account, bucket_name):
+        import firebase_admin
+        from firebase_admin import credentials, storage as fb_storage
+        info = json.loads(service_account)
+        try:
+            app = firebase_admin.get_app("warm-memories-replica")
+        except ValueError:
+            app = firebase_admin.initialize_app(credentials.Certificate(info), {"storageBucket": bucket_name},
+                                                name="warm-memories-replica")
+        self.bucket = fb_storage.bucket(app=app)
+
+    def put(self, key, path):
+        self.bucket.blob(key).upload_from_filename(path)
+
+    def get(self, key, path):
+        self.bucket.blob(key).download_to_filename(path)
+
+    def delete(self, key):
+        from google.api_core.exceptions import NotFound
+        try:
+            self.bucket.blob(key).delete()
+        except NotFound:
+            pass
+
+    def list(self, prefix):
+        return [b.name for b in self.bucket.list_blobs(prefix=prefix + "/")]
+
+
+def make_bucket():
+    mode = REPLICATION
+    sa, name = os.environ.get("FIREBASE_SERVICE_ACCOUNT", ""), os.environ.get("FIREBASE_BUCKET", "")
+    if mode == "auto":
+        mode = "gcs" if sa.strip().startswith("{") and name else "off"
+    if mode == "gcs":
+        return GcsBucket(sa, name)
+    if mode == "local":
+        return LocalBucket()
+    return None
+
+
+# -------------------- 복제기 --------------------
+class Replicator:
+    def __init__(self, bucket, root=storage.DATA_DIR, prefix=REPLICA_PREFIX):
+        self.bucket = bucket
+        self.root = os.path.abspath(root)
+        self.prefix = prefix
+        self._cond = threading.Condition()
+        self._dirty = OrderedDict()  # 절대 경로 -> 처음 바뀐 시각
+        self._retry = {}             # 절대 경로 -> (시도 횟수, 다음 시도 시각)
+        self._db_mtime = None
+        self.last_error = None
+        self.failing = False  # 마지막 업로드 시도가 실패했는지
+        self.uploaded = 0
+        self._stop = False
+        self._thread = None
+
+    # 경로 ↔ 키
+    def key_of(self, path):
+        rel = os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+        return f"{self.prefix}/{rel}"
+
+    def _wanted(self, path):
+        p = os.path.abspath(path)
+        if not p.startswith(self.root + os.sep):
+            return False
+        norm = p.replace(os.sep, "/")
+        return (not norm.endswith(SKIP_SUFFIXES) and not any(s in norm for s in SKIP_PARTS)
+                and os.path.basename(norm) not in SKIP_NAMES)
+
+    # 쓰기 쪽
+    def mark(self, path):
+        if not self._wanted(path):
+            return
+        p = os.path.abspath(path)
+        with self._cond:
+            self._dirty.setdefault(p, time.time())
+            if len(self._dirty) >= REPLICA_BATCH or self._lag_locked() > REPLICA_MAX_LAG:
+                self._cond.notify()
+
+    def backpressure(self):
+        """업로드가 쓰기를 못 따라가 한참 밀렸으면 잠시 기다린다. 기다렸으면 True
+        (쓰는 쪽이 잠금을 쥐고 있거나 버킷이 실패 중이면 기다리지 않는다 — 백업 장애가 앱 장애가 되지 않게)"""
+        if threading.current_thread() is self._thread or holding_locks():
+            return False
+        with self._cond:
+            if self.failing or self._lag_locked() <= 2 * REPLICA_MAX_LAG:
+                return False
+            self._cond.notify()
+            self._cond.wait_for(lambda: self.failing or self._lag_locked() <= REPLICA_MAX_LAG, timeout=REPLICA_BLOCK)
+            return True
+
+    def _lag_locked(self):
+        if not self._dirty:
+            return 0.0
+        return time.time() - next(iter(self._dirty.values()))
+
+    def status(self):
+        with self._cond:
+            return {"pending": len(self._dirty), "lag": round(self._lag_locked(), 1),
+                    "uploaded": self.uploaded, "failing": self.failing, "last_error": self.last_error}
+
+    # 복원
+    def restore_if_empty(self):
+        """로컬에 데이터가 없으면 버킷에서 내려받는다. 내려받은 파일 수를 돌려준다"""
+        if os.path.exists(storage.ACCOUNTS_FILE) or os.path.exists(storage.DB_FILE):
+            return 0
+        n = 0
+        for key in self.bucket.list(self.prefix):
+            rel = key[len(self.prefix) + 1:]
+            dst = os.path.join(self.root, *rel.split("/"))
+            if not rel or not self._wanted(dst):
+                continue
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            tmp = f"{dst}.restore.tmp"
+            self.bucket.get(key, tmp)
+            os.replace(tmp, dst)
+            n += 1
+        return n
+
+    # 올리기
+    def _upload(self, path):
+        key = self.key_of(path)
+        if not os.path.exists(path):
+            self.bucket.delete(key)
+        elif path.endswith(".db"):
+            # SQLite: 쓰는 중이어도 일관된 사본을 떠서 올린다
+            snap = f"{path}.replica.tmp"
+            src, dst = sqlite3.connect(path), sqlite3.connect(snap)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+            try:
+                self.bucket.put(key, snap)
+            finally:
+                os.remove(snap)
+        else:
+            self.bucket.put(key, path)
+
+    def _take_batch(self):
+        now = time.time()
+        batch = []
+        for p in list(self._dirty):
+            tries, at = self._retry.get(p, (0, 0))
+            if at <= now:
+                batch.append((p, self._dirty.pop(p)))
+            if len(batch) >= REPLICA_BATCH:
+                break
+        return batch
+
+    def _check_db(self):
+        # SQLite 는 행 단위로 써서 notify_write 가 없다 → DB/WAL 수정 시각으로 변경을 알아챈다
+        db = os.path.abspath(storage.DB_FILE)
+        try:
+            m = max(os.path.getmtime(p) for p in (db, db + "-wal") if os.path.exists(p))
+        except ValueError:
+            return
+        if m != self._db_mtime:
+            self._db_mtime = m
+            with self._cond:
+                self._dirty.setdefault(db, time.time())
+
+    def run_once(self):
+        """밀린 것 한 묶음을 올린다 (실패한 것은 백오프 후 다시 목록에)"""
+        self._check_db()
+        with self._cond:
+            batch = self._take_batch()
+        for p, since in batch:
+            try:
+                self._upload(p)
+                self._retry.pop(p, None)
+                self.uploaded += 1
+                self.failing = False
+            except Exception as e:
+                tries = self._retry.get(p, (0, 0))[0] + 1
+                self._retry[p] = (tries, time.time() + min(REPLICA_MAX_BACKOFF, 2 ** tries))
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.failing = True
+                with self._cond:
+                    if p not in self._dirty:
+                        self._dirty[p] = since
+                        self._dirty.move_to_end(p, last=False)  # 원래 순서(가장 오래된 것)를 지킨다
+        with self._cond:
+            self._cond.notify_all()
+        return len(batch)
+
+    def _next_wait(self):
+        with self._cond:
+            if not self._dirty:
+                return REPLICA_INTERVAL
+            # 가장 오래된 파일이 지연 상한에 닿기 전에 깨어난다
+            return max(0.0, min(REPLICA_INTERVAL, REPLICA_MAX_LAG - self._lag_locked()))
+
+    def _loop(self):
+        while not self._stop:
+            with self._cond:
+                self._cond.wait(timeout=self._next_wait())
+            try:
+                while self.run_once() >= REPLICA_BATCH:
+                    pass
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.failing = True
+
+    def start(self):
+        on_write(self.mark)
+        self._thread = threading.Thread(target=self._loop, name="replicator", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def flush(self, timeout=10):
+        """남은 것을 (timeout 안에서) 모두 올린다 — 종료 직전에"""
+        end = time.time() + timeout
+        while time.time() < end:
+            with self._cond:
+                ready = any(self._retry.get(p, (0, 0))[1] <= time.time() for p in self._dirty)
+                if not self._dirty:
+                    return True
+            if not ready:
+                time.sleep(0.2)
+                continue
+            self.run_once()
+        return False
+
+
+_replicator = None
+_replicator_lock = threading.Lock()
+init_error = None  # 버킷 연결/복원 실패 사유 (앱은 로컬로만 계속 동작)
+
+
+def get_replicator():
+    """프로세스에 하나. 버킷이 설정돼 있으면 (필요하면 복원 후) 복제를 시작한다. 꺼져 있거나 실패하면 None"""
+    global _replicator, init_error
+    with _replicator_lock:
+        if _replicator is None:
+            _replicator = False
+            try:
+                bucket = make_bucket()
+                if bucket is not None:
+                    rep = Replicator(bucket)
+                    rep.restore_if_empty()
+                    rep.start()
+                    _replicator = rep
+            except Exception as e:
+                init_error = f"{type(e).__name__}: {e}"
+    return _replicator or None
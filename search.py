@@ -0,0 +1,192 @@
+# search.py — 사용자별 추억 전문 검색 (한글 글자 bigram 역색인)
+# - 토큰: 제목/내용을 정규화(NFKC, 소문자)하고 단어마다 두 글자씩 겹쳐 자른다 ("산책길" → 산책, 책길)
+#   한 글자 단어는 그대로 한 토큰. 띄어쓰기/조사가 달라도 부분 문자열이 맞으면 찾는다
+# - 색인: 문서 = 추억 한 건 [날짜, 제목, 내용 앞부분], 토큰 -> [문서 번호, 횟수, 문서 번호, 횟수, ...]
+# - 저장: search/<user>.json 스냅샷 + search/<user>.journal.jsonl 추가 전용 저널
+#   저장할 때마다 저널에 한 줄(O(1)), 저널이 커지면 스냅샷으로 합친다
+# - 스냅샷의 추억 수가 저장소와 다르면(통째 저장/가져오기 등) 저장소에서 다시 만든다
+#   고치기/지우기처럼 통째로 바꾼 쪽은 invalidate() 로 바로 다시 만든다 (건수만으로는 모른다)
+# - 점수: 맞은 토큰의 idf * (1 + log tf) 합. 질의 토큰을 대부분(짧으면 전부) 포함한 추억만
+
+import os
+import json
+import math
+import heapq
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import storage
+from journal import Journal
+from locking import file_lock, atomic_write_json
+from profiling import timed
+
+SEARCH_DIR = f"{storage.DATA_DIR}/search"
+SEARCH_CACHE_USERS = int(os.environ.get("SEARCH_CACHE_USERS", 64))
+SEARCH_COMPACT_BYTES = int(os.environ.get("SEARCH_COMPACT_BYTES", 256 * 1024))
+SNIPPET = 60
+
+
+def tokens(text):
+    """글자 bigram 목록 (중복 포함)"""
+    norm = unicodedata.normalize("NFKC", text or "").lower()
+    out = []
+    for word in "".join(c if c.isalnum() else " " for c in norm).split():
+        if len(word) == 1:
+            out.append(word)
+        else:
+            out.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return out
+
+
+class UserIndex:
+    def __init__(self):
+        self.docs = []   # [날짜, 제목, 내용 앞부분]
+        self.post = {}   # 토큰 -> [문서 번호, 횟수, ...]
+        self.seq = 0     # 반영한 저널 seq
+
+    def add(self, date_key, item):
+        doc_id = len(self.docs)
+        title, text = item.get("title", ""), item.get("text", "")
+        self.docs.append([date_key, title, text[:SNIPPET]])
+        tf = {}
+        for t in tokens(title) + tokens(text):
+            tf[t] = tf.get(t, 0) + 1
+        for t, n in tf.items():
+            self.post.setdefault(t, []).extend((doc_id, n))
+
+    def query(self, q, limit=20):
+        qt = list(dict.fromkeys(tokens(q)))
+        if not qt or not self.docs:
+            return []
+        n_docs = len(self.docs)
+        need = len(qt) if len(qt) <= 2 else math.ceil(len(qt) * 0.7)
+        score, hits = {}, {}
+        for t in qt:
+            plist = self.post.get(t)
+            if not plist:
+                continue
+            idf = math.log(1 + n_docs / (len(plist) // 2))
+            for i in range(0, len(plist), 2):
+                d = plist[i]
+                score[d] = score.get(d, 0.0) + idf * (1 + math.log(plist[i + 1]))
+                hits[d] = hits.get(d, 0) + 1
+        best = heapq.nlargest(limit, (d for d in score if hits[d] >= need),
+                              key=lambda d: (score[d], self.docs[d][0]))
+        return [{"date": self.docs[d][0], "title": self.docs[d][1], "snippet": self.docs[d][2],
+                 "score": round(score[d], 3)} for d in best]
+
+
+class SearchIndex:
+    def __init__(self, store, root=SEARCH_DIR):
+        self.store = store
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._users = OrderedDict()   # user -> UserIndex (최근 사용 순)
+        self._journals = {}
+
+    def snap_path(self, user): return f"{self.root}/{user}.json"
+
+    def _journal(self, user):
+        j = self._journals.get(user)
+        if j is None:
+            j = self._journals[user] = Journal(f"{self.root}/{user}.journal.jsonl")
+        return j
+
+    # 불러오기 / 다시 만들기
+    def _load(self, user):
+        ix = UserIndex()
+        snap = _read(self.snap_path(user))
+        j = self._journal(user)
+        if snap is not None:
+            ix.docs, ix.post, ix.seq = snap["docs"], snap["post"], snap.get("journal_seq", 0)
+        for seq, rec in j.entries(ix.seq):
+            ix.add(rec["d"], rec)
+            ix.seq = seq
+        if len(ix.docs) != self.store.count_mems(user):
+            ix = self._rebuild(user)
+        return ix
+
+    @timed("search.rebuild")
+    def _rebuild(self, user):
+        ix = UserIndex()
+        for date_key, items in sorted(self.store.load_mems(user).get("memories", {}).items()):
+            for item in items:
+                ix.add(date_key, item)
+        self._write_snapshot(user, ix)
+        return ix
+
+    def _write_snapshot(self, user, ix):
+        j = self._journal(user)
+        with file_lock(j.path):
+            ix.seq = max(ix.seq, j.current_seq())
+            atomic_write_json(self.snap_path(user), {"journal_seq": ix.seq, "docs": ix.docs, "post": ix.post},
+                              indent=None)
+            j.truncate(ix.seq)
+
+    def _get(self, user):
+        with self._lock:
+            ix = self._users.get(user)
+            if ix is None:
+                ix = self._load(user)
+                self._users[user] = ix
+                while len(self._users) > SEARCH_CACHE_USERS:
+                    self._users.popitem(last=False)
+            else:
+                # 다른 프로세스가 붙인 저널 줄만 따라잡기
+                j = self._journal(user)
+                if j.current_seq() > ix.seq:
+                    for seq, rec in j.entries(ix.seq):
+                        ix.add(rec["d"], rec)
+                        ix.seq = seq
+            self._users.move_to_end(user)
+            return ix
+
+    # 쓰기 (추억 저장 직후)
+    def add(self, user, date_key, item):
+        with self._lock:
+            ix = self._get(user)
+            if len(ix.docs) >= self.store.count_mems(user):
+                return  # 방금 저장소에서 다시 만들면서 이미 들어갔다
+            j = self._journal(user)
+            with file_lock(j.path):
+                if j.current_seq() > ix.seq:  # 그 사이 다른 프로세스가 붙인 줄부터
+                    for seq, rec in j.entries(ix.seq):
+                        ix.add(rec["d"], rec)
+                        ix.seq = seq
+                ix.seq = j.append({"d": date_key, "title": item.get("title", ""), "text": item.get("text", "")})
+            ix.add(date_key, item)
+            if j.size() > SEARCH_COMPACT_BYTES:
+                self._write_snapshot(user, ix)
+
+    def invalidate(self, user):
+        """추억을 통째로 바꾼 뒤(가져오기/고치기/지우기) — 건수가 같아도 저장소에서 다시 만든다"""
+        with self._lock:
+            self._users[user] = self._rebuild(user)
+            self._users.move_to_end(user)
+            while len(self._users) > SEARCH_CACHE_USERS:
+                self._users.popitem(last=False)
+
+    # 검색
+    @timed("search.query")
+    def search(self, user, q, limit=20):
+        return self._get(user).query(q, limit)
+
+
+def _read(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+_index = None
+
+
+def get_search(store):
+    global _index
+    if _index is None or _index.store is not store:
+        _index = SearchIndex(store)
+    return _index
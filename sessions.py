@@ -0,0 +1,119 @@
+# sessions.py — 토큰 기반 로그인 세션 (브라우저마다 따로)
+# - 로그인하면 임의 토큰을 만들어 주소의 ?sid= 에 넣고, 저장소에 {username, role, expires} 로 보관
+# - 복원은 프로세스 안 LRU → 없으면 저장소 한 건 조회 (O(1)). 만료된 토큰은 무시하고 지운다
+#   LRU 값은 SESSION_RECHECK 초 동안만 믿고 그 뒤에는 저장소에서 다시 확인한다
+#   (다른 프로세스에서 로그아웃한 토큰이 이 프로세스 LRU 에서 계속 살아 있지 않게)
+# - 백그라운드 스레드가 주기적으로 만료 세션을 정리한다
+# - 토큰은 주소에서 오므로 token_urlsafe(32) 모양(43자, [A-Za-z0-9_-])이 아니면 저장소에 닿기 전에 버린다
+
+import os
+import re
+import time
+import secrets
+import threading
+from collections import OrderedDict
+
+SESSION_TTL = int(os.environ.get("SESSION_TTL", 7 * 24 * 3600))          # 초
+SESSION_LRU_SIZE = int(os.environ.get("SESSION_LRU_SIZE", 4096))
+SESSION_SWEEP_INTERVAL = int(os.environ.get("SESSION_SWEEP_INTERVAL", 600))  # 초
+SESSION_RECHECK = float(os.environ.get("SESSION_RECHECK", 5))  # 초: LRU 값을 저장소 확인 없이 쓰는 시간
+
+TOKEN_RE = re.compile(r"[A-Za-z0-9_-]{43}")
+
+
+def valid_token(token):
+    return isinstance(token, str) and TOKEN_RE.fullmatch(token) is not None
+
+
+def valid_session(sess):
+    return (isinstance(sess, dict) and isinstance(sess.get("username"), str)
+            and isinstance(sess.get("expires"), (int, float)))
+
+
+class SessionStore:
+    def __init__(self, store, ttl=SESSION_TTL, lru_size=SESSION_LRU_SIZE, recheck=SESSION_RECHECK):
+        self.store = store
+        self.ttl = ttl
+        self.lru_size = lru_size
+        self.recheck = recheck
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # token -> (session, 저장소에서 확인한 시각)
+        threading.Thread(target=self._sweep_loop, name="session-sweeper", daemon=True).start()
+
+    def _remember(self, token, sess):
+        with self._lock:
+            self._lru[token] = (sess, time.monotonic())
+            self._lru.move_to_end(token)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _forget(self, token):
+        with self._lock:
+            self._lru.pop(token, None)
+
+    def create(self, username, role):
+        token = secrets.token_urlsafe(32)
+        sess = {"username": username, "role": role, "expires": time.time() + self.ttl}
+        self.store.session_put(token, sess)
+        self._remember(token, sess)
+        return token
+
+    def get(self, token):
+        if not valid_token(token):
+            return None
+        with self._lock:
+            ent = self._lru.get(token)
+            sess = None
+            if ent is not None and time.monotonic() - ent[1] < self.recheck:
+                sess = ent[0]
+                self._lru.move_to_end(token)
+        if sess is None:
+            sess = self.store.session_get(token)
+            if not valid_session(sess):
+                self._forget(token)
+                return None  # 없거나(다른 곳에서 로그아웃) 세션 모양이 아님 — 지우지 않는다
+            self._remember(token, sess)
+        now = time.time()
+        if sess["expires"] < now:
+            self.delete(token)
+            return None
+        if sess["expires"] - now < self.ttl / 2:
+            # 절반 넘게 지났을 때만 연장 (복원할 때마다 쓰지 않게)
+            sess = dict(sess, expires=now + self.ttl)
+            self.store.session_put(token, sess)
+            self._remember(token, sess)
+        return sess
+
+    def delete(self, token):
+        if not valid_token(token):
+            return
+        self._forget(token)
+        self.store.session_delete(token)
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            for token in [t for t, (s, _) in self._lru.items() if s.get("expires", 0) < now]:
+                del self._lru[token]
+        return self.store.session_sweep(now)
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(SESSION_SWEEP_INTERVAL)
+            try:
+                self.sweep()
+            except Exception:
+                pass
+
+
+_sessions = None
+_sessions_lock = threading.Lock()
+
+
+def get_sessions(store):
+    global _sessions
+    if _sessions is None:
+        with _sessions_lock:
+            if _sessions is None:
+                _sessions = SessionStore(store)
+    return _sessions
@@ -0,0 +1,145 @@
+# shards.py — 사용자별·월별 샤드 (추억/꾸미기)
+# - <root>/<user>/YYYY-MM.json  : 그 달의 {"memories": {...}} 또는 {"decos": {...}}
+# - <root>/<user>/manifest.json : {"months": [...], "counts": {"YYYY-MM": 건수}}
+# - 예전 한 파일(<root>/<user>.json)은 처음 접근할 때 한 번만 월별로 나누고 .migrated 로 이름을 바꾼다
+# - 달력/상세 패널은 보이는 달의 샤드 하나만 읽고 쓴다
+# - 쓰기는 사용자별 잠금(<root>/<user>.lock) 안에서, 파일은 임시 파일 + rename 으로 교체
+
+import os
+import json
+
+from locking import file_lock, atomic_write_json, notify_write
+from profiling import timed, count_read, ENABLED as PROFILING
+
+
+def month_of(date_key): return date_key[:7]
+
+
+class MonthShards:
+    def __init__(self, root, key, cache):
+        self.root = root      # 예: accounts/memories
+        self.key = key        # "memories" 또는 "decos"
+        self.cache = cache
+        self._split_done = set()
+
+    # 경로
+    def legacy_path(self, user): return f"{self.root}/{user}.json"
+    def user_dir(self, user): return f"{self.root}/{user}"
+    def shard_path(self, user, ym): return f"{self.root}/{user}/{ym}.json"
+    def manifest_path(self, user): return f"{self.root}/{user}/manifest.json"
+
+    def users(self):
+        out = set()
+        for name in os.listdir(self.root):
+            if name.endswith(".json"):
+                out.add(name[:-len(".json")])
+            elif os.path.isdir(f"{self.root}/{name}"):
+                out.add(name)
+        return sorted(out)
+
+    # 파일 입출력
+    def _read(self, path, default):
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    if PROFILING:
+                        count_read(os.fstat(f.fileno()).st_size)
+                    return json.load(f)
+            except Exception:
+                return default
+        return default
+
+    def _write(self, path, data):
+        atomic_write_json(path, data)
+        self.cache.invalidate(path)
+
+    def _count(self, bucket):
+        if self.key == "memories":
+            return sum(len(v) for v in bucket.values())
+        return len(bucket)
+
+    # 예전 한 파일 → 월별 샤드 (한 번만)
+    def ensure_split(self, user):
+        if user in self._split_done:
+            return
+        with file_lock(self.user_dir(user)):
+            legacy = self.legacy_path(user)
+            if os.path.exists(legacy):
+                data = self._read(legacy, {self.key: {}}).get(self.key, {})
+                self._write_all(user, data)
+                os.replace(legacy, legacy + ".migrated")
+                notify_write(legacy)
+                self.cache.invalidate(legacy)
+            self._split_done.add(user)
+
+    def manifest(self, user):
+        self.ensure_split(user)
+        path = self.manifest_path(user)
+        return self.cache.get(path, lambda: self._read(path, {"months": [], "counts": {}}))
+
+    def _set_month_count(self, user, ym, bucket):
+        man = self._read(self.manifest_path(user), {"months": [], "counts": {}})
+        n = self._count(bucket)
+        if n:
+            if ym not in man["months"]:
+                man["months"] = sorted(man["months"] + [ym])
+            man["counts"][ym] = n
+        else:
+            man["months"] = [m for m in man["months"] if m != ym]
+            man["counts"].pop(ym, None)
+        self._write(self.manifest_path(user), man)
+
+    # 읽기
+    @timed("shards.load_month")
+    def load_month(self, user, ym):
+        self.ensure_split(user)
+        path = self.shard_path(user, ym)
+        return self.cache.get(path, lambda: self._read(path, {self.key: {}}))
+
+    def load_all(self, user):
+        merged = {}
+        for ym in self.manifest(user)["months"]:
+            merged.update(self.load_month(user, ym).get(self.key, {}))
+        return {self.key: merged}
+
+    # 쓰기
+    def update_day(self, user, date_key, fn):
+        """date_key 가 속한 달의 샤드만 읽어 fn(bucket) 적용 후 저장"""
+        self.update_month(user, month_of(date_key), fn)
+
+    @timed("shards.update_month")
+    def update_month(self, user, ym, fn):
+        """한 달 샤드에 fn(bucket) 적용 후 저장 (가져오기처럼 여러 날을 한 번에 쓸 때도)"""
+        self.ensure_split(user)
+        with file_lock(self.user_dir(user)):
+            os.makedirs(self.user_dir(user), exist_ok=True)
+            path = self.shard_path(user, ym)
+            data = self._read(path, {self.key: {}})
+            before = self._count(data[self.key])
+            fn(data[self.key])
+            self._write(path, data)
+            if self._count(data[self.key]) != before:
+                self._set_month_count(user, ym, data[self.key])
+
+    def save_all(self, user, data):
+        self.ensure_split(user)
+        with file_lock(self.user_dir(user)):
+            self._write_all(user, data.get(self.key, {}))
+
+    def _write_all(self, user, bucket):
+        os.makedirs(self.user_dir(user), exist_ok=True)
+        by_month = {}
+        for d, v in bucket.items():
+            by_month.setdefault(month_of(d), {})[d] = v
+        old = self._read(self.manifest_path(user), {"months": []})["months"]
+        for ym in old:
+            if ym not in by_month and os.path.exists(self.shard_path(user, ym)):
+                os.remove(self.shard_path(user, ym))
+                notify_write(self.shard_path(user, ym))
+                self.cache.invalidate(self.shard_path(user, ym))
+        for ym, part in by_month.items():
+            self._write(self.shard_path(user, ym), {self.key: part})
+        self._write(self.manifest_path(user), {
+            "months": sorted(by_month),
+            "counts": {ym: self._count(part) for ym, part in by_month.items()},
+        })
@@ -0,0 +1,1010 @@
+# storage.py — 저장소 엔진 (JSON 파일 / SQLite WAL)
+# - STORAGE_BACKEND=json  : accounts/ 아래 JSON 파일 (소규모 설치, 기본값)
+# - STORAGE_BACKEND=sqlite: accounts/data.db 하나에 행 단위 저장 (WAL 모드)
+# - app.py 의 load_json/save_json/load_mems/save_decos 등은 모두 get_store() 를 거친다
+# - 기존 accounts/ 트리 가져오기: python storage.py migrate [--replace]
+
+import os
+import sys
+import json
+import time
+import secrets
+import sqlite3
+import threading
+
+from cache import FileCache
+from indexes import DataIndex
+from journal import Journal
+from locking import file_lock, atomic_write_json, update_json, peek_version, stamp, notify_write, WriteConflict
+from shards import MonthShards, month_of
+from summaries import DaySummaries, change, record_change, build as build_summary
+from profiling import timed, count_read, ENABLED as PROFILING
+from sessions import valid_token, valid_session
+from changefeed import (emits, publish, by_day, by_rows, by_keys, by_user, by_record, by_records,
+                        by_members, by_group, by_question, by_account)
+
+# -------------------- 경로 --------------------
+DATA_DIR = os.environ.get("DATA_DIR", "accounts")
+
+ACCOUNTS_FILE  = f"{DATA_DIR}/accounts.json"
+GROUPS_FILE    = f"{DATA_DIR}/groups.json"
+SESSION_FILE   = f"{DATA_DIR}/sessions.json"  # 예전 전역 세션 파일 (마이그레이션에서 제거)
+SESSIONS_DIR   = f"{DATA_DIR}/sessions"
+DIAGNOSIS_FILE = f"{DATA_DIR}/diagnosis.json"
+QUESTIONS_FILE = f"{DATA_DIR}/questions.json"
+DB_FILE        = f"{DATA_DIR}/data.db"
+
+# 자가진단 기록: 스냅샷(diagnosis.json) + 추가 전용 저널
+DIAGNOSIS_JOURNAL = f"{DATA_DIR}/diagnosis.journal.jsonl"
+JOURNAL_COMPACT_BYTES = int(os.environ.get("JOURNAL_COMPACT_BYTES", 1024 * 1024))
+JOURNAL_COMPACT_INTERVAL = int(os.environ.get("JOURNAL_COMPACT_INTERVAL", 600))  # 초
+
+# 공유 파일 캐시 한도 (사용자별 추억/꾸미기 파일에 적용)
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 512))
+
+# 통째 저장(save) 때 변경 알림 종류 (changefeed.py). 누구의 것인지 모르므로 users 는 비운다
+DOC_EVENTS = {ACCOUNTS_FILE: "user", GROUPS_FILE: "group", DIAGNOSIS_FILE: "record", QUESTIONS_FILE: "question"}
+
+
+class UserExists(Exception):
+    """이미 있는 아이디 (가입이 동시에 들어온 경우 포함)"""
+
+
+def new_group_id():
+    return f"g_{int(time.time() * 1000)}_{secrets.token_hex(3)}"
+
+
+def same_group(a, b):
+    # id 가 있으면 id 로, 예전 데이터(id 없음)는 이름+멤버 구성으로 같은 그룹인지 판단
+    if a.get("id") and b.get("id"):
+        return a["id"] == b["id"]
+    return a.get("group_name") == b.get("group_name") and a.get("members") == b.get("members")
+
+
+# -------------------- JSON 파일 백엔드 --------------------
+class JsonStore:
+    name = "json"
+
+    def __init__(self, root=DATA_DIR):
+        self.root = root
+        # 기록 스냅샷/저널과 세션 폴더도 root 기준 (migrate 가 기본 DATA_DIR 이 아닌 곳을 읽을 때)
+        self.diagnosis_file = f"{root}/diagnosis.json"
+        self.diagnosis_journal = f"{root}/diagnosis.journal.jsonl"
+        self.sessions_dir = f"{root}/sessions"
+        os.makedirs(root, exist_ok=True)
+        os.makedirs(f"{root}/memories", exist_ok=True)
+        os.makedirs(f"{root}/decos", exist_ok=True)
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        os.makedirs(f"{root}/summary", exist_ok=True)
+
+        self.cache = FileCache(CACHE_MAX_BYTES, CACHE_MAX_ENTRIES,
+                               pinned=(ACCOUNTS_FILE, GROUPS_FILE, SESSION_FILE, self.diagnosis_file, QUESTIONS_FILE))
+        self.index = DataIndex()
+        self.mem_shards = MonthShards(f"{root}/memories", "memories", self.cache)
+        self.deco_shards = MonthShards(f"{root}/decos", "decos", self.cache)
+        self.summaries = DaySummaries(f"{root}/summary", self.cache)
+        self.diag_journal = Journal(self.diagnosis_journal)
+        snap = self._read(self.diagnosis_file, {"records": []})
+        self.diag_journal.last_seq = max(self.diag_journal.last_seq, snap.get("journal_seq", 0))
+        self._compact_lock = threading.Lock()
+        threading.Thread(target=self._compact_loop, name="diagnosis-compactor", daemon=True).start()
+
+    # 문서 단위 (공유 캐시를 거친다 — 돌려받은 값은 읽기 전용)
+    @timed("store.load")
+    def load(self, path, default):
+        if path == self.diagnosis_file:
+            return self.cache.get(path, lambda: self._read_diagnosis(default), deps=(self.diagnosis_journal,))
+        return self.cache.get(path, lambda: self._read(path, default))
+
+    def _read_diagnosis(self, default):
+        # journal_seq: 목록 끝 기록의 저널 seq / journal_base: 마지막 통째 저장 때의 seq (records_since 용)
+        snap = self._read(self.diagnosis_file, default)
+        tail = self.diag_journal.entries(snap.get("journal_seq", 0))
+        if not tail:
+            return snap
+        return dict(snap, records=snap.get("records", []) + [rec for _, rec in tail], journal_seq=tail[-1][0])
+
+    def _read(self, path, default):
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    if PROFILING:
+                        count_read(os.fstat(f.fileno()).st_size)
+                    return json.load(f)
+            except Exception:
+                return default
+        return default
+
+    @timed("store.save")
+    def save(self, path, data):
+        if path == self.diagnosis_file:
+            # 통째 저장 = 새 스냅샷. 지금까지의 저널은 모두 반영된 것으로 본다
+            with self._compact_lock, file_lock(self.diagnosis_file), file_lock(self.diagnosis_journal):
+                seq = self.diag_journal.current_seq()
+                self._write_snapshot(path, dict(data, journal_seq=seq, journal_base=seq))
+                self.diag_journal.truncate(seq)
+            self.cache.invalidate(path)
+            for u in {r.get("username") for r in data.get("records", [])} | set(self.summaries.users()):
+                self.rebuild_summary(u)
+        else:
+            # 불러온 문서(_version 있음)를 통째로 저장할 때는 그 사이 다른 쓰기가 없었는지 확인한다
+            with file_lock(path):
+                ver = peek_version(path)
+                if "_version" in data and data["_version"] != ver:
+                    raise WriteConflict(path)
+                self._write(path, stamp(data, ver + 1))
+            self.cache.invalidate(path)
+        if path in DOC_EVENTS:
+            publish(DOC_EVENTS[path])
+
+    def _write(self, path, data):
+        atomic_write_json(path, data)
+
+    def _write_snapshot(self, path, data):
+        atomic_write_json(path, data, indent=None)
+
+    # 저널 압축: 스냅샷 + 저널 → 새 스냅샷, 반영된 줄만 저널에서 제거
+    def compact_diagnosis(self):
+        if not self._compact_lock.acquire(blocking=False):
+            return False  # 이미 다른 스레드가 압축 중
+        try:
+            with file_lock(self.diagnosis_file):  # 다른 프로세스의 압축과 겹치지 않게 (추가는 막지 않는다)
+                snap = self._read(self.diagnosis_file, {"records": []})
+                entries = self.diag_journal.entries(snap.get("journal_seq", 0))
+                if not entries:
+                    return False
+                upto = entries[-1][0]
+                records = snap.get("records", []) + [rec for _, rec in entries]
+                self._write_snapshot(self.diagnosis_file, {"records": records, "journal_seq": upto,
+                                                           "journal_base": snap.get("journal_base", 0)})
+                self.diag_journal.truncate(upto)
+            self.cache.invalidate(self.diagnosis_file)
+            return True
+        finally:
+            self._compact_lock.release()
+
+    def _compact_loop(self):
+        while True:
+            time.sleep(JOURNAL_COMPACT_INTERVAL)
+            try:
+                self.compact_diagnosis()
+            except Exception:
+                pass
+
+    def delete(self, path):
+        with file_lock(path):
+            if os.path.exists(path):
+                os.remove(path)
+                notify_write(path)
+        self.cache.invalidate(path)
+
+    # 추억/꾸미기 — 월별 샤드. 전체 로드/저장은 내보내기·마이그레이션용
+    def load_mems(self, username): return self.mem_shards.load_all(username)
+    def load_decos(self, username): return self.deco_shards.load_all(username)
+
+    @emits("memory", by_user)
+    def save_mems(self, username, data):
+        self.mem_shards.save_all(username, data)
+        self.rebuild_summary(username)
+
+    @emits("deco", by_user)
+    def save_decos(self, username, data):
+        self.deco_shards.save_all(username, data)
+        self.rebuild_summary(username)
+
+    def load_mems_month(self, username, ym): return self.mem_shards.load_month(username, ym)
+    def count_mems(self, username): return sum(self.mem_shards.manifest(username)["counts"].values())
+    def load_decos_month(self, username, ym): return self.deco_shards.load_month(username, ym)
+
+    def mems_for_day(self, username, date_key):
+        return self.load_mems_month(username, month_of(date_key))["memories"].get(date_key, [])
+
+    def mem_users(self): return self.mem_shards.users()
+    def deco_users(self): return self.deco_shards.users()
+
+    # 내보내기용 순회 — 한 번에 한 달 샤드만 메모리에
+    def iter_mems(self, username):
+        for ym in self.mem_shards.manifest(username)["months"]:
+            for d, items in sorted(self.load_mems_month(username, ym)["memories"].items()):
+                for it in items:
+                    yield d, it
+
+    def iter_decos(self, username):
+        for ym in self.deco_shards.manifest(username)["months"]:
+            yield from sorted(self.load_decos_month(username, ym)["decos"].items())
+
+    def iter_records(self, usernames):
+        by_user = self._indexed("records", self.diagnosis_file, {"records": []}).records_by_user
+        for u in usernames:
+            yield from list(by_user.get(u, []))
+
+    # 행 단위 쓰기 — 디스크의 최신 파일을 (캐시를 거치지 않고) 읽어 한 건만 바꾸고,
+    # 그 사이 다른 세션/프로세스가 먼저 썼으면(_version 변경) 다시 읽어서 재시도한다
+    @timed("store.update")
+    def _update(self, path, default, fn):
+        data = update_json(path, default, fn)
+        self.cache.invalidate(path)
+        return data
+
+    @timed("store.append")
+    def _append(self, path, default, fn, index_op):
+        # 인덱스가 달린 문서에 한 건 추가: 잠금 안에서 캐시 값이 디스크와 같으면 그 사본(맨 위 목록만 복사)에
+        # 고쳐 쓰고, 쓰기가 끝난 뒤에야 캐시 값을 바꿔 끼우며 인덱스도 한 건만 갱신한다.
+        # 캐시 객체는 읽기 전용 — fn 은 목록에 붙이거나 항목을 새 객체로 바꿔 끼울 뿐 항목을 고치지 않는다.
+        # 캐시에 없으면 파일을 새로 읽어 버전 확인 후 쓰고, 인덱스는 다음 조회 때 다시 만든다
+        with file_lock(path):
+            old = self.cache.peek(path)
+            if old is None:
+                return self._update(path, default, fn)
+            cur = {k: list(v) if isinstance(v, list) else v for k, v in old.items()}
+            fn(cur)
+            cur = stamp(cur, old.get("_version", 0) + 1)
+            self._write(path, cur)  # 실패하면 캐시/인덱스는 그대로
+            with self.index.swapping(old, cur):
+                self.cache.put(path, cur)
+                index_op(cur)
+            return cur
+
+    @emits("user", by_account)
+    def add_user(self, user):
+        def fn(d):
+            # 잠금 안에서 다시 확인 — 앱의 get_user 확인과 저장 사이에 같은 아이디가 들어올 수 있다
+            if any(u["username"] == user["username"] for u in d["users"]):
+                raise UserExists(user["username"])
+            d["users"].append(user)
+        self._append(ACCOUNTS_FILE, {"users": []}, fn, lambda doc: self.index.add_user(user, doc))
+
+    @emits("user", by_user)
+    def set_password(self, username, hashed):
+        def fn(d):
+            for u in d["users"]:
+                if u["username"] == username:
+                    u["password"] = hashed
+        self._update(ACCOUNTS_FILE, {"users": []}, fn)
+
+    def _swap_diagnosis(self, cur, recs, seq):
+        # 저널에 쓴 뒤: 캐시 문서는 읽기 전용이므로 목록을 복사해 붙인 새 문서로 바꿔 끼운다 (_append 와 같게)
+        new = dict(cur, records=cur["records"] + list(recs), journal_seq=seq)
+        with self.index.swapping(cur, new):
+            self.cache.put(self.diagnosis_file, new, deps=(self.diagnosis_journal,))
+            for rec in recs:
+                self.index.add_record(rec, new)
+
+    @emits("record", by_record)
+    def append_record(self, rec):
+        # 저널에 한 줄만 추가 (디스크 쓰기는 기록이 몇 년치든 O(1)). 크기가 넘으면 백그라운드에서 압축
+        with file_lock(self.diagnosis_journal):
+            cur = self.cache.peek(self.diagnosis_file, deps=(self.diagnosis_journal,))
+            seq = self.diag_journal.append(rec)
+            if cur is not None:
+                self._swap_diagnosis(cur, [rec], seq)
+        self.summaries.bump(rec.get("username", ""), [record_change(rec)])
+        if self.diag_journal.size() > JOURNAL_COMPACT_BYTES:
+            threading.Thread(target=self.compact_diagnosis, daemon=True).start()
+
+    @emits("question", by_question)
+    def add_question(self, item):
+        self._append(QUESTIONS_FILE, {"custom_questions": []},
+                     lambda d: d.setdefault("custom_questions", []).append(item),
+                     lambda doc: self.index.add_question(item, doc))
+
+    # 그룹 — 멤버십 인덱스(사용자 -> 그룹, 사용자 -> 같은 그룹 사람)도 그 그룹만큼만 갱신
+    @emits("group", by_members)
+    def create_group(self, group_name, members):
+        group = {"id": new_group_id(), "group_name": group_name, "members": list(members)}
+        self._append(GROUPS_FILE, {"groups": []}, lambda d: d["groups"].append(group),
+                     lambda doc: self.index.add_group(group, doc))
+        return group
+
+    @emits("group", by_group)
+    def add_group_member(self, group, username):
+        touched = []
+
+        def fn(d):
+            touched.clear()  # 버전 충돌로 다시 불릴 수 있다
+            for i, g in enumerate(d["groups"]):
+                if same_group(g, group) and username not in g["members"]:
+                    d["groups"][i] = g = dict(g, members=g["members"] + [username])
+                    touched.append(g)
+
+        def index_op(doc):
+            for g in touched:
+                self.index.add_group_member(g, username, doc)
+        self._append(GROUPS_FILE, {"groups": []}, fn, index_op)
+
+    @emits("group", by_group)
+    def leave_group(self, group, username):
+        touched = []
+
+        def fn(d):
+            touched.clear()
+            for i, g in enumerate(d["groups"]):
+                if same_group(g, group) and username in g["members"]:
+                    d["groups"][i] = g = dict(g, members=[m for m in g["members"] if m != username])
+                    touched.append(g)
+            d["groups"] = [g for g in d["groups"] if g["members"]]
+
+        def index_op(doc):
+            for g in touched:
+                self.index.remove_group_member(g, username, doc)
+        self._append(GROUPS_FILE, {"groups": []}, fn, index_op)
+
+    @emits("memory", by_day)
+    def add_memory(self, username, date_key, item):
+        self.mem_shards.update_day(username, date_key, lambda b: b.setdefault(date_key, []).append(item))
+        self.summaries.bump(username, [change(date_key, mems=1)])
+
+    @emits("deco", by_day)
+    def put_deco(self, username, date_key, conf):
+        def fn(b): b[date_key] = conf
+        self.deco_shards.update_day(username, date_key, fn)
+        self.summaries.bump(username, [change(date_key, deco=1)])
+
+    # 묶음 쓰기 (가져오기) — 달마다 샤드 한 번, 저널은 fsync 한 번
+    @emits("memory", by_rows)
+    def add_memories(self, username, rows):
+        for ym, part in _by_month(rows).items():
+            def fn(b, part=part):
+                for d, it in part:
+                    b.setdefault(d, []).append(it)
+            self.mem_shards.update_month(username, ym, fn)
+        self.summaries.bump(username, [change(d, mems=1) for d, _ in rows])
+
+    @emits("deco", by_keys)
+    def put_decos(self, username, decos):
+        for ym, part in _by_month(decos.items()).items():
+            self.deco_shards.update_month(username, ym, lambda b, part=part: b.update(part))
+        self.summaries.bump(username, [change(d, deco=1) for d in decos])
+
+    @emits("record", by_records)
+    def append_records(self, recs):
+        with file_lock(self.diagnosis_journal):
+            cur = self.cache.peek(self.diagnosis_file, deps=(self.diagnosis_journal,))
+            seq = self.diag_journal.append_many(recs)
+            if cur is not None:
+                self._swap_diagnosis(cur, recs, seq)
+        for u, part in _by_user(recs).items():
+            self.summaries.bump(u, [record_change(r) for r in part])
+        if self.diag_journal.size() > JOURNAL_COMPACT_BYTES:
+            threading.Thread(target=self.compact_diagnosis, daemon=True).start()
+
+    @emits("deco", by_day)
+    def delete_deco(self, username, date_key):
+        self.deco_shards.update_day(username, date_key, lambda b: b.pop(date_key, None))
+        self.summaries.bump(username, [change(date_key, deco=0)])
+
+    # 하루 요약 (연간 히트맵) — 요약 파일만 읽는다
+    def day_summaries(self, username, year):
+        return self.summaries.year(username, year)
+
+    def rebuild_summary(self, username):
+        counts = {}
+        for d, _ in self.iter_mems(username):
+            counts[d] = counts.get(d, 0) + 1
+        self.summaries.replace(username, build_summary(
+            counts.items(), [d for d, _ in self.iter_decos(username)], self.iter_records([username])))
+
+    # 로그인 세션 — 토큰마다 파일 하나 (세션 LRU 가 앞단에 있으므로 캐시를 거치지 않는다)
+    def _session_path(self, token): return f"{self.sessions_dir}/{token}.json"
+
+    def session_get(self, token):
+        if not valid_token(token):
+            return None
+        return self._read(self._session_path(token), None)
+
+    def session_put(self, token, sess):
+        if not valid_token(token):
+            raise ValueError("잘못된 세션 토큰")
+        atomic_write_json(self._session_path(token), sess)
+
+    def session_delete(self, token):
+        if not valid_token(token):
+            return
+        try:
+            os.remove(self._session_path(token))
+            notify_write(self._session_path(token))
+        except OSError:
+            pass
+
+    def session_sweep(self, now):
+        removed = 0
+        for name in os.listdir(self.sessions_dir):
+            if name.endswith(".json"):
+                token = name[:-len(".json")]
+                sess = self.session_get(token)
+                if valid_session(sess) and sess["expires"] < now:  # 읽지 못한 파일은 지우지 않는다
+                    self.session_delete(token)
+                    removed += 1
+        return removed
+
+    # 조회 (메모리 인덱스 — 결과 크기에 비례)
+    def _indexed(self, name, path, default):
+        self.index.ensure(name, self.load(path, default))
+        return self.index
+
+    def list_users(self):
+        return self.load(ACCOUNTS_FILE, {"users": []})["users"]
+
+    def get_user(self, username):
+        return self._indexed("users", ACCOUNTS_FILE, {"users": []}).users.get(username)
+
+    def has_record(self, username, date_key):
+        return (username, date_key) in self._indexed("records", self.diagnosis_file, {"records": []}).records
+
+    def records_for(self, usernames):
+        by_user = self._indexed("records", self.diagnosis_file, {"records": []}).records_by_user
+        return [r for u in usernames for r in by_user.get(u, [])]
+
+    def records_from(self, username, start):
+        """한 받는이의 날짜순 기록 중 start 번째부터 (모니터링 집계가 새로 붙은 끝부분만 읽게)"""
+        by_user = self._indexed("records", self.diagnosis_file, {"records": []}).records_by_user
+        return by_user.get(username, [])[start:]
+
+    def records_since(self, mark):
+        """mark(저널 seq) 이후에 붙은 기록과 새 seq. mark=None 이면 지금 끝 seq 만
+        저널 seq 는 기록마다 1씩 늘고 압축해도 순서가 그대로라 목록 끝에서부터 센다.
+        그 사이 통째 저장(마이그레이션 등)이 있었으면 어느 기록이 새 것인지 모르므로 끝 seq 부터 다시"""
+        doc = self.load(self.diagnosis_file, {"records": []})  # 캐시 문서는 바뀌지 않으므로 목록과 seq 가 늘 짝이 맞다
+        recs, end = doc["records"], doc.get("journal_seq", 0)
+        if mark is None or mark >= end or mark < doc.get("journal_base", 0):
+            return [], end
+        return recs[max(0, len(recs) - (end - mark)):], end
+
+    def questions_for(self, target):
+        return list(self._indexed("questions", QUESTIONS_FILE, {"custom_questions": []}).q_by_target.get(target, []))
+
+    def questions_by(self, creator):
+        return list(self._indexed("questions", QUESTIONS_FILE, {"custom_questions": []}).q_by_creator.get(creator, []))
+
+    def groups_of(self, username):
+        return self._indexed("groups", GROUPS_FILE, {"groups": []}).groups_of(username)
+
+    def receivers_of(self, username):
+        """나와 같은 그룹에 있는 사람들 (아이디순)"""
+        return self._indexed("groups", GROUPS_FILE, {"groups": []}).peers_of(username)
+
+    def search_users(self, prefix, limit=20, exclude=()):
+        """아이디 앞부분으로 찾기 (정렬된 목록에서 이분 탐색)"""
+        return self._indexed("users", ACCOUNTS_FILE, {"users": []}).search_users(prefix, limit, set(exclude))
+
+
+# -------------------- SQLite (WAL) 백엔드 --------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users(username TEXT PRIMARY KEY, body TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS groups(id TEXT PRIMARY KEY, group_name TEXT NOT NULL, seq INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS group_members(
+    group_id TEXT NOT NULL, username TEXT NOT NULL, pos INTEGER NOT NULL,
+    PRIMARY KEY(group_id, username));
+CREATE INDEX IF NOT EXISTS idx_group_members_user ON group_members(username);
+CREATE TABLE IF NOT EXISTS diagnosis(
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, date TEXT NOT NULL, body TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_diagnosis_user_date ON diagnosis(username, date);
+CREATE TABLE IF NOT EXISTS questions(
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL, creator TEXT, body TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_questions_creator ON questions(creator);
+CREATE TABLE IF NOT EXISTS question_targets(question_seq INTEGER NOT NULL, username TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_question_targets_user ON question_targets(username);
+CREATE TABLE IF NOT EXISTS memories(
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, date TEXT NOT NULL, body TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_memories_user_date ON memories(username, date);
+CREATE TABLE IF NOT EXISTS decos(
+    username TEXT NOT NULL, date TEXT NOT NULL, body TEXT NOT NULL, PRIMARY KEY(username, date));
+CREATE TABLE IF NOT EXISTS kv(key TEXT PRIMARY KEY, body TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sessions(token TEXT PRIMARY KEY, body TEXT NOT NULL, expires REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires);
+CREATE TABLE IF NOT EXISTS day_summary(
+    username TEXT NOT NULL, date TEXT NOT NULL, mems INTEGER NOT NULL DEFAULT 0, deco INTEGER,
+    mood REAL, pain REAL, PRIMARY KEY(username, date));
+"""
+
+
+def _dumps(obj): return json.dumps(obj, ensure_ascii=False)
+
+
+def _by_month(rows):
+    out = {}
+    for d, v in rows:
+        out.setdefault(month_of(d), []).append((d, v))
+    return out
+
+
+def _by_user(recs):
+    out = {}
+    for r in recs:
+        out.setdefault(r.get("username", ""), []).append(r)
+    return out
+
+
+class SqliteStore:
+    name = "sqlite"
+
+    def __init__(self, db_path=DB_FILE):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self.conn.executescript(SCHEMA)
+
+    @property
+    def conn(self):
+        # Streamlit 세션마다 스크립트 스레드가 다르므로 스레드별 커넥션을 쓴다
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @timed("sqlite.tx")
+    def _tx(self, fn):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            out = fn(conn)
+            conn.execute("COMMIT")
+            notify_write(self.db_path + "-wal")  # 변경 알림의 파일 감시가 자기 쓰기를 구분하도록
+            return out
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _exec(self, sql, args=()):
+        # 문장 하나짜리 쓰기 (자동 커밋)
+        cur = self.conn.execute(sql, args)
+        notify_write(self.db_path + "-wal")
+        return cur
+
+    @timed("sqlite.query")
+    def _bodies(self, sql, args=()):
+        rows = self.conn.execute(sql, args).fetchall()
+        if PROFILING:
+            count_read(sum(len(b) for (b,) in rows))
+        return [json.loads(b) for (b,) in rows]
+
+    # 문서 단위 (예전 JSON 모양으로 조립 / 통째로 교체)
+    @timed("store.load")
+    def load(self, path, default):
+        if path == ACCOUNTS_FILE:
+            return {"users": self.list_users()}
+        if path == GROUPS_FILE:
+            return {"groups": self._all_groups()}
+        if path == DIAGNOSIS_FILE:
+            return {"records": self._bodies("SELECT body FROM diagnosis ORDER BY seq")}
+        if path == QUESTIONS_FILE:
+            return {"custom_questions": self._bodies("SELECT body FROM questions ORDER BY seq")}
+        row = self.conn.execute("SELECT body FROM kv WHERE key=?", (path,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    @timed("store.save")
+    def save(self, path, data):
+        def fn(conn):
+            if path == ACCOUNTS_FILE:
+                conn.execute("DELETE FROM users")
+                self._insert_users(conn, data.get("users", []))
+            elif path == GROUPS_FILE:
+                conn.execute("DELETE FROM groups")
+                conn.execute("DELETE FROM group_members")
+                for g in data.get("groups", []):
+                    self._insert_group(conn, g)
+            elif path == DIAGNOSIS_FILE:
+                conn.execute("DELETE FROM diagnosis")
+                for r in data.get("records", []):
+                    self._insert_record(conn, r)
+                users = {r.get("username") for r in data.get("records", [])}
+                users |= {u for (u,) in conn.execute("SELECT DISTINCT username FROM day_summary")}
+                for u in users:
+                    self._rebuild_summary(conn, u)
+            elif path == QUESTIONS_FILE:
+                conn.execute("DELETE FROM questions")
+                conn.execute("DELETE FROM question_targets")
+                for q in data.get("custom_questions", []):
+                    self._insert_question(conn, q)
+            else:
+                # JSON 백엔드와 같게: 불러온 문서(_version 있음)는 그 사이 다른 저장이 없었을 때만
+                row = conn.execute("SELECT body FROM kv WHERE key=?", (path,)).fetchone()
+                ver = json.loads(row[0]).get("_version", 0) if row else 0
+                if "_version" in data and data["_version"] != ver:
+                    raise WriteConflict(path)
+                conn.execute("INSERT OR REPLACE INTO kv(key, body) VALUES(?, ?)", (path, _dumps(stamp(data, ver + 1))))
+        self._tx(fn)
+        if path in DOC_EVENTS:
+            publish(DOC_EVENTS[path])
+
+    def delete(self, path):
+        self._exec("DELETE FROM kv WHERE key=?", (path,))
+
+    def load_mems(self, username):
+        mems = {}
+        for d, b in self.conn.execute(
+                "SELECT date, body FROM memories WHERE username=? ORDER BY seq", (username,)):
+            mems.setdefault(d, []).append(json.loads(b))
+        return {"memories": mems}
+
+    @emits("memory", by_user)
+    def save_mems(self, username, data):
+        def fn(conn):
+            conn.execute("DELETE FROM memories WHERE username=?", (username,))
+            for d, items in data.get("memories", {}).items():
+                conn.executemany("INSERT INTO memories(username, date, body) VALUES(?, ?, ?)",
+                                 [(username, d, _dumps(it)) for it in items])
+            self._rebuild_summary(conn, username)
+        self._tx(fn)
+
+    def load_decos(self, username):
+        rows = self.conn.execute("SELECT date, body FROM decos WHERE username=?", (username,))
+        return {"decos": {d: json.loads(b) for d, b in rows}}
+
+    # 한 달치만 (username, date) 인덱스 범위 조회
+    def load_mems_month(self, username, ym):
+        mems = {}
+        for d, b in self.conn.execute(
+                "SELECT date, body FROM memories WHERE username=? AND date BETWEEN ? AND ? ORDER BY seq",
+                (username, f"{ym}-00", f"{ym}-99")):
+            mems.setdefault(d, []).append(json.loads(b))
+        return {"memories": mems}
+
+    def load_decos_month(self, username, ym):
+        rows = self.conn.execute("SELECT date, body FROM decos WHERE username=? AND date BETWEEN ? AND ?",
+                                 (username, f"{ym}-00", f"{ym}-99"))
+        return {"decos": {d: json.loads(b) for d, b in rows}}
+
+    def count_mems(self, username):
+        return self.conn.execute("SELECT COUNT(*) FROM memories WHERE username=?", (username,)).fetchone()[0]
+
+    def mems_for_day(self, username, date_key):
+        return self._bodies("SELECT body FROM memories WHERE username=? AND date=? ORDER BY seq",
+                            (username, date_key))
+
+    def iter_mems(self, username):
+        # 커서를 그대로 순회 (fetchall 없이)
+        for d, b in self.conn.execute(
+                "SELECT date, body FROM memories WHERE username=? ORDER BY date, seq", (username,)):
+            yield d, json.loads(b)
+
+    def iter_decos(self, username):
+        for d, b in self.conn.execute("SELECT date, body FROM decos WHERE username=? ORDER BY date", (username,)):
+            yield d, json.loads(b)
+
+    def iter_records(self, usernames):
+        for u in usernames:
+            for (b,) in self.conn.execute(
+                    "SELECT body FROM diagnosis WHERE username=? ORDER BY date, seq", (u,)):
+                yield json.loads(b)
+
+    def mem_users(self):
+        return [u for (u,) in self.conn.execute("SELECT DISTINCT username FROM memories ORDER BY username")]
+
+    def deco_users(self):
+        return [u for (u,) in self.conn.execute("SELECT DISTINCT username FROM decos ORDER BY username")]
+
+    @emits("deco", by_user)
+    def save_decos(self, username, data):
+        def fn(conn):
+            conn.execute("DELETE FROM decos WHERE username=?", (username,))
+            conn.executemany("INSERT INTO decos(username, date, body) VALUES(?, ?, ?)",
+                             [(username, d, _dumps(c)) for d, c in data.get("decos", {}).items()])
+            self._rebuild_summary(conn, username)
+        self._tx(fn)
+
+    # 삽입 헬퍼 (트랜잭션 안에서 호출)
+    def _insert_users(self, conn, users):
+        conn.executemany("INSERT OR REPLACE INTO users(username, body) VALUES(?, ?)",
+                         [(u["username"], _dumps(u)) for u in users])
+
+    def _insert_group(self, conn, g):
+        g = dict(g, id=g.get("id") or new_group_id())
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM groups").fetchone()[0]
+        conn.execute("INSERT INTO groups(id, group_name, seq) VALUES(?, ?, ?)", (g["id"], g["group_name"], seq))
+        conn.executemany("INSERT OR IGNORE INTO group_members(group_id, username, pos) VALUES(?, ?, ?)",
+                         [(g["id"], m, i) for i, m in enumerate(g["members"])])
+        return g
+
+    def _insert_record(self, conn, r):
+        conn.execute("INSERT INTO diagnosis(username, date, body) VALUES(?, ?, ?)",
+                     (r.get("username", ""), r.get("date", ""), _dumps(r)))
+
+    def _insert_question(self, conn, q):
+        cur = conn.execute("INSERT INTO questions(id, creator, body) VALUES(?, ?, ?)",
+                           (q.get("id", ""), q.get("creator"), _dumps(q)))
+        conn.executemany("INSERT INTO question_targets(question_seq, username) VALUES(?, ?)",
+                         [(cur.lastrowid, t) for t in q.get("targets", [])])
+
+    # 행 단위 쓰기
+    @emits("user", by_account)
+    def add_user(self, user):
+        # INSERT OR REPLACE 가 아니라 INSERT — 동시에 가입해도 먼저 들어온 계정을 덮어쓰지 않는다
+        try:
+            self._tx(lambda conn: conn.execute("INSERT INTO users(username, body) VALUES(?, ?)",
+                                               (user["username"], _dumps(user))))
+        except sqlite3.IntegrityError:
+            raise UserExists(user["username"]) from None
+
+    @emits("user", by_user)
+    def set_password(self, username, hashed):
+        def fn(conn):
+            row = conn.execute("SELECT body FROM users WHERE username=?", (username,)).fetchone()
+            if row:
+                u = json.loads(row[0]); u["password"] = hashed
+                conn.execute("UPDATE users SET body=? WHERE username=?", (_dumps(u), username))
+        self._tx(fn)
+
+    @emits("record", by_record)
+    def append_record(self, rec):
+        def fn(conn):
+            self._insert_record(conn, rec)
+            self._bump(conn, rec.get("username", ""), [record_change(rec)])
+        self._tx(fn)
+
+    @emits("question", by_question)
+    def add_question(self, item):
+        self._tx(lambda conn: self._insert_question(conn, item))
+
+    @emits("group", by_members)
+    def create_group(self, group_name, members):
+        return self._tx(lambda conn: self._insert_group(conn, {"group_name": group_name, "members": list(members)}))
+
+    @emits("group", by_group)
+    def add_group_member(self, group, username):
+        def fn(conn):
+            pos = conn.execute("SELECT COALESCE(MAX(pos), -1) + 1 FROM group_members WHERE group_id=?",
+                               (group["id"],)).fetchone()[0]
+            conn.execute("INSERT OR IGNORE INTO group_members(group_id, username, pos) VALUES(?, ?, ?)",
+                         (group["id"], username, pos))
+        self._tx(fn)
+
+    @emits("group", by_group)
+    def leave_group(self, group, username):
+        def fn(conn):
+            conn.execute("DELETE FROM group_members WHERE group_id=? AND username=?", (group["id"], username))
+            left = conn.execute("SELECT COUNT(*) FROM group_members WHERE group_id=?", (group["id"],)).fetchone()[0]
+            if not left:
+                conn.execute("DELETE FROM groups WHERE id=?", (group["id"],))
+        self._tx(fn)
+
+    # 행 + 그 날 요약 한 줄을 같은 트랜잭션에서
+    @emits("memory", by_day)
+    def add_memory(self, username, date_key, item):
+        def fn(conn):
+            conn.execute("INSERT INTO memories(username, date, body) VALUES(?, ?, ?)",
+                         (username, date_key, _dumps(item)))
+            self._bump(conn, username, [change(date_key, mems=1)])
+        self._tx(fn)
+
+    @emits("deco", by_day)
+    def put_deco(self, username, date_key, conf):
+        def fn(conn):
+            conn.execute("INSERT OR REPLACE INTO decos(username, date, body) VALUES(?, ?, ?)",
+                         (username, date_key, _dumps(conf)))
+            self._bump(conn, username, [change(date_key, deco=1)])
+        self._tx(fn)
+
+    @emits("deco", by_day)
+    def delete_deco(self, username, date_key):
+        def fn(conn):
+            conn.execute("DELETE FROM decos WHERE username=? AND date=?", (username, date_key))
+            self._bump(conn, username, [change(date_key, deco=0)])
+        self._tx(fn)
+
+    # 묶음 쓰기 (가져오기) — 트랜잭션 하나에 executemany
+    @emits("memory", by_rows)
+    def add_memories(self, username, rows):
+        def fn(conn):
+            conn.executemany("INSERT INTO memories(username, date, body) VALUES(?, ?, ?)",
+                             [(username, d, _dumps(it)) for d, it in rows])
+            self._bump(conn, username, [change(d, mems=1) for d, _ in rows])
+        self._tx(fn)
+
+    @emits("deco", by_keys)
+    def put_decos(self, username, decos):
+        def fn(conn):
+            conn.executemany("INSERT OR REPLACE INTO decos(username, date, body) VALUES(?, ?, ?)",
+                             [(username, d, _dumps(c)) for d, c in decos.items()])
+            self._bump(conn, username, [change(d, deco=1) for d in decos])
+        self._tx(fn)
+
+    @emits("record", by_records)
+    def append_records(self, recs):
+        def fn(conn):
+            conn.executemany("INSERT INTO diagnosis(username, date, body) VALUES(?, ?, ?)",
+                             [(r.get("username", ""), r.get("date", ""), _dumps(r)) for r in recs])
+            for u, part in _by_user(recs).items():
+                self._bump(conn, u, [record_change(r) for r in part])
+        self._tx(fn)
+
+    # 하루 요약 (연간 히트맵)
+    def _bump(self, conn, username, changes):
+        conn.executemany(
+            "INSERT INTO day_summary(username, date, mems, deco, mood, pain) VALUES(?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(username, date) DO UPDATE SET mems = MAX(0, mems + excluded.mems), "
+            "deco = COALESCE(excluded.deco, deco), mood = COALESCE(excluded.mood, mood), "
+            "pain = COALESCE(excluded.pain, pain)",
+            [(username, d, dm, deco, mood, pain) for d, dm, deco, mood, pain in changes])
+
+    def _rebuild_summary(self, conn, username):
+        counts = conn.execute("SELECT date, COUNT(*) FROM memories WHERE username=? GROUP BY date",
+                              (username,)).fetchall()
+        decos = [d for (d,) in conn.execute("SELECT date FROM decos WHERE username=?", (username,))]
+        recs = [json.loads(b) for (b,) in conn.execute(
+            "SELECT body FROM diagnosis WHERE username=? ORDER BY date, seq", (username,))]
+        days = build_summary(counts, decos, recs)
+        conn.execute("DELETE FROM day_summary WHERE username=?", (username,))
+        conn.executemany("INSERT INTO day_summary(username, date, mems, deco, mood, pain) VALUES(?, ?, ?, ?, ?, ?)",
+                         [(username, d, *row) for d, row in days.items()])
+
+    def rebuild_summary(self, username):
+        self._tx(lambda conn: self._rebuild_summary(conn, username))
+
+    def day_summaries(self, username, year):
+        rows = self.conn.execute(
+            "SELECT date, mems, deco, mood, pain FROM day_summary WHERE username=? AND date BETWEEN ? AND ?",
+            (username, f"{year}-00", f"{year}-99"))
+        return {d: [m, deco or 0, mood, pain] for d, m, deco, mood, pain in rows
+                if m or deco or mood is not None or pain is not None}
+
+    # 로그인 세션
+    def session_get(self, token):
+        if not valid_token(token):
+            return None
+        row = self.conn.execute("SELECT body FROM sessions WHERE token=?", (token,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def session_put(self, token, sess):
+        if not valid_token(token):
+            raise ValueError("잘못된 세션 토큰")
+        self._exec("INSERT OR REPLACE INTO sessions(token, body, expires) VALUES(?, ?, ?)",
+                   (token, _dumps(sess), sess.get("expires", 0)))
+
+    def session_delete(self, token):
+        if not valid_token(token):
+            return
+        self._exec("DELETE FROM sessions WHERE token=?", (token,))
+
+    def session_sweep(self, now):
+        return self._exec("DELETE FROM sessions WHERE expires < ?", (now,)).rowcount
+
+    # 조회 (인덱스 사용)
+    def list_users(self):
+        return self._bodies("SELECT body FROM users ORDER BY rowid")
+
+    def get_user(self, username):
+        row = self.conn.execute("SELECT body FROM users WHERE username=?", (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def has_record(self, username, date_key):
+        return self.conn.execute("SELECT 1 FROM diagnosis WHERE username=? AND date=? LIMIT 1",
+                                 (username, date_key)).fetchone() is not None
+
+    def records_for(self, usernames):
+        usernames = list(usernames)
+        if not usernames:
+            return []
+        marks = ",".join("?" * len(usernames))
+        return self._bodies(f"SELECT body FROM diagnosis WHERE username IN ({marks}) ORDER BY username, date, seq",
+                            usernames)
+
+    def records_from(self, username, start):
+        """한 받는이의 날짜순 기록 중 start 번째부터 (idx_diagnosis_user_date 로 건너뜀)"""
+        return self._bodies("SELECT body FROM diagnosis WHERE username=? ORDER BY date, seq LIMIT -1 OFFSET ?",
+                            (username, start))
+
+    def records_since(self, mark):
+        """mark(diagnosis.seq) 이후에 붙은 기록과 새 위치. mark=None 이면 지금 끝 위치만"""
+        if mark is None:
+            return [], self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM diagnosis").fetchone()[0]
+        rows = self.conn.execute("SELECT seq, body FROM diagnosis WHERE seq > ? ORDER BY seq", (mark,)).fetchall()
+        return [json.loads(b) for _, b in rows], (rows[-1][0] if rows else mark)
+
+    def questions_for(self, target):
+        return self._bodies(
+            "SELECT q.body FROM question_targets t JOIN questions q ON q.seq = t.question_seq "
+            "WHERE t.username=? ORDER BY q.seq", (target,))
+
+    def questions_by(self, creator):
+        return self._bodies("SELECT body FROM questions WHERE creator=? ORDER BY seq", (creator,))
+
+    def _groups_where(self, where="", args=()):
+        out = []
+        for gid, name in self.conn.execute(f"SELECT id, group_name FROM groups {where} ORDER BY seq", args).fetchall():
+            members = [m for (m,) in self.conn.execute(
+                "SELECT username FROM group_members WHERE group_id=? ORDER BY pos", (gid,))]
+            out.append({"id": gid, "group_name": name, "members": members})
+        return out
+
+    def _all_groups(self):
+        return self._groups_where()
+
+    def groups_of(self, username):
+        return self._groups_where(
+            "WHERE id IN (SELECT group_id FROM group_members WHERE username=?)", (username,))
+
+    def receivers_of(self, username):
+        return [u for (u,) in self.conn.execute(
+            "SELECT DISTINCT o.username FROM group_members m JOIN group_members o ON o.group_id = m.group_id "
+            "WHERE m.username=? AND o.username<>? ORDER BY o.username", (username, username))]
+
+    def search_users(self, prefix, limit=20, exclude=()):
+        exclude = set(exclude)
+        rows = self.conn.execute(
+            "SELECT username FROM users WHERE username >= ? AND username < ? ORDER BY username LIMIT ?",
+            (prefix, prefix + "\U0010ffff", limit + len(exclude)))
+        return [u for (u,) in rows if u not in exclude][:limit]
+
+
+# -------------------- 선택 --------------------
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = os.environ.get("STORAGE_BACKEND", "json").lower()
+                _store = SqliteStore() if backend == "sqlite" else JsonStore()
+    return _store
+
+
+# -------------------- 마이그레이션 (accounts/ → SQLite) --------------------
+def migrate(src_root=DATA_DIR, db_path=DB_FILE, replace=False):
+    src = JsonStore(src_root)
+    dst = SqliteStore(db_path)
+    tables = ("users", "groups", "group_members", "diagnosis", "questions", "question_targets", "memories", "decos",
+              "kv", "sessions", "day_summary")
+    has_data = any(dst.conn.execute(f"SELECT 1 FROM {t} LIMIT 1").fetchone() for t in tables)
+    if has_data and not replace:
+        raise SystemExit(f"{db_path} 에 이미 데이터가 있습니다. 덮어쓰려면 --replace 를 붙이세요.")
+
+    counts = {}
+
+    def fn(conn):
+        for t in tables:
+            conn.execute(f"DELETE FROM {t}")
+        users = src.load(f"{src_root}/accounts.json", {"users": []}).get("users", [])
+        dst._insert_users(conn, users)
+        counts["users"] = len(users)
+        grps = src.load(f"{src_root}/groups.json", {"groups": []}).get("groups", [])
+        for g in grps:
+            dst._insert_group(conn, g)
+        counts["groups"] = len(grps)
+        recs = src.load(src.diagnosis_file, {"records": []}).get("records", [])  # 저널까지 반영된 목록
+        for r in recs:
+            dst._insert_record(conn, r)
+        counts["records"] = len(recs)
+        qs = src.load(f"{src_root}/questions.json", {"custom_questions": []}).get("custom_questions", [])
+        for q in qs:
+            dst._insert_question(conn, q)
+        counts["questions"] = len(qs)
+        for name in os.listdir(src.sessions_dir):
+            sess = src.session_get(name[:-len(".json")]) if name.endswith(".json") else None
+            if sess:
+                conn.execute("INSERT OR REPLACE INTO sessions(token, body, expires) VALUES(?, ?, ?)",
+                             (name[:-len(".json")], _dumps(sess), sess.get("expires", 0)))
+
+        counts["memories"] = counts["decos"] = 0
+        for user in src.mem_users():
+            for d, items in src.load_mems(user).get("memories", {}).items():
+                conn.executemany("INSERT INTO memories(username, date, body) VALUES(?, ?, ?)",
+                                 [(user, d, _dumps(it)) for it in items])
+                counts["memories"] += len(items)
+        for user in src.deco_users():
+            decos = src.load_decos(user).get("decos", {})
+            conn.executemany("INSERT OR REPLACE INTO decos(username, date, body) VALUES(?, ?, ?)",
+                             [(user, d, _dumps(c)) for d, c in decos.items()])
+            counts["decos"] += len(decos)
+
+    dst._tx(fn)
+    for user in {u["username"] for u in dst.list_users()} | set(src.mem_users()) | set(src.deco_users()):
+        dst.rebuild_summary(user)
+    return counts
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] != "migrate":
+        print("사용법: python storage.py migrate [--replace]")
+        sys.exit(2)
+    result = migrate(replace="--replace" in args)
+    print("가져오기 완료: " + ", ".join(f"{k} {v}건" for k, v in result.items()))
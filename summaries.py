@@ -0,0 +1,101 @@
+# summaries.py — 사용자별 하루 요약 (연간 히트맵용)
+# - 하루 한 줄: [추억 수, 꾸미기 있음(0/1), 기분, 통증]  (자가진단이 없으면 기분/통증은 None)
+# - 추억/꾸미기/자가진단을 저장하는 저장소 메서드가 그 날 한 줄만 고친다 → 연간 화면은 요약만 읽는다
+# - JSON 백엔드: summary/<user>/<YYYY>.json = {"days": {"YYYY-MM-DD": [...]}} (해마다 수 KB)
+#   SQLite 백엔드는 day_summary 테이블 (storage.py)
+# - 통째 저장/마이그레이션 뒤에는 저장소의 rebuild_summary() 로 그 사용자 것을 처음부터 다시 만든다
+
+import os
+import json
+
+from locking import update_json, atomic_write_json
+
+FIELDS = ("mems", "deco", "mood", "pain")
+
+
+def change(date_key, mems=0, deco=None, mood=None, pain=None):
+    """한 날짜의 변화: mems 는 더할 수, 나머지는 None 이면 그대로"""
+    return date_key, mems, deco, mood, pain
+
+
+def record_change(rec):
+    a = rec.get("answers") or {}
+    return change(rec.get("date", ""), mood=_num(a.get("mood")), pain=_num(a.get("pain")))
+
+
+def _num(v):
+    return v if isinstance(v, (int, float)) and not isinstance(v, bool) else None
+
+
+def apply(days, changes):
+    for d, dm, deco, mood, pain in changes:
+        row = days.get(d) or [0, 0, None, None]
+        row[0] = max(0, row[0] + dm)
+        if deco is not None:
+            row[1] = int(bool(deco))
+        if mood is not None:
+            row[2] = mood
+        if pain is not None:
+            row[3] = pain
+        if row[0] or row[1] or row[2] is not None or row[3] is not None:
+            days[d] = row
+        else:
+            days.pop(d, None)
+
+
+def build(mems, decos, records):
+    """(날짜, 개수) / 꾸민 날짜 / 기록 → {날짜: 한 줄}"""
+    days = {}
+    apply(days, [change(d, mems=n) for d, n in mems])
+    apply(days, [change(d, deco=1) for d in decos])
+    apply(days, [record_change(r) for r in records])
+    return days
+
+
+class DaySummaries:
+    """JSON 백엔드용 — 사용자/연도별 파일 하나"""
+
+    def __init__(self, root, cache):
+        self.root = root
+        self.cache = cache
+
+    def path(self, user, year): return f"{self.root}/{user}/{year}.json"
+
+    def year(self, user, year):
+        path = self.path(user, year)
+        return self.cache.get(path, lambda: _read(path)).get("days", {})
+
+    def bump(self, user, changes):
+        by_year = {}
+        for c in changes:
+            by_year.setdefault(c[0][:4], []).append(c)
+        for y, part in by_year.items():
+            path = self.path(user, y)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            update_json(path, {"days": {}}, lambda doc, part=part: apply(doc.setdefault("days", {}), part))
+            self.cache.invalidate(path)
+
+    def replace(self, user, days):
+        """그 사용자 요약을 통째로 교체 (다시 만들기)"""
+        by_year = {}
+        for d, row in days.items():
+            by_year.setdefault(d[:4], {})[d] = row
+        udir = f"{self.root}/{user}"
+        os.makedirs(udir, exist_ok=True)
+        for name in os.listdir(udir):
+            if name.endswith(".json") and name[:-5] not in by_year:
+                by_year[name[:-5]] = {}
+        for y, part in by_year.items():
+            atomic_write_json(self.path(user, y), {"days": part}, indent=None)
+            self.cache.invalidate(self.path(user, y))
+
+    def users(self):
+        return sorted(n for n in os.listdir(self.root) if os.path.isdir(f"{self.root}/{n}"))
+
+
+def _read(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"days": {}}
@@ -0,0 +1,19 @@
+# conftest.py — 테스트마다 같은 임시 데이터 폴더 (storage 등은 import 때 DATA_DIR 을 읽는다)
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="warm-test-"))
+os.environ.setdefault("REPLICATION", "off")
+os.environ.setdefault("FEED_WATCH", "off")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request, tmp_path):
+    import storage
+    if request.param == "json":
+        return storage.JsonStore()
+    return storage.SqliteStore(str(tmp_path / "data.db"))
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import alerts
+
+
+def record(user, date, pain):
+    return {"username": user, "date": date, "answers": {"통증": pain}}
+
+
+def test_records_since_survives_compaction(store):
+    _, mark = store.records_since(None)
+    store.append_record(record("r", "2026-01-01", 1))
+    _, mid = store.records_since(mark)
+    store.append_record(record("r", "2026-01-02", 2))
+    store.append_record(record("r", "2026-01-03", 3))
+    if hasattr(store, "compact_diagnosis"):
+        assert store.compact_diagnosis()
+    recs, end = store.records_since(mid)
+    assert [r["date"] for r in recs] == ["2026-01-02", "2026-01-03"]
+    assert store.records_since(end) == ([], end)
+
+
+def test_racing_polls_fire_once(store):
+    engine = alerts.AlertEngine(store)
+    engine.add_rule("s", {"type": "compare", "field": "통증", "op": ">=", "value": 7})
+    store.append_record(record("r", datetime.now().strftime("%Y-%m-%d"), 9))
+    other_tab = []
+
+    def racing(state):
+        if not other_tab:  # 이 탭이 읽은 뒤 다른 탭이 먼저 평가하고 저장한다
+            other_tab.append(engine.poll("s", ["r"]))
+        return engine._poll(state, ["r"])
+
+    assert engine._change("s", racing) == 0
+    assert other_tab == [1]
+    assert len(engine.unread("s")) == 1
+    assert engine.poll("s", ["r"]) == 0
+
+
+def test_imported_history_does_not_fire(store):
+    engine = alerts.AlertEngine(store)
+    engine.add_rule("s2", {"type": "compare", "field": "통증", "op": ">=", "value": 7})
+    today = datetime.now().strftime("%Y-%m-%d")
+    store.append_record(record("r2", today, 1))
+    assert engine.poll("s2", ["r2"]) == 0
+    store.append_records([record("r2", "2025-03-01", 9), record("r2", "2025-03-02", 8)])  # 백업 복원
+    assert engine.poll("s2", ["r2"]) == 0
+    store.append_records([record("r3", "2025-03-01", 9)])  # 처음 보는 받는이의 지난 기록
+    assert engine.poll("s2", ["r2", "r3"]) == 0
+    store.append_record(record("r2", today, 9))
+    assert engine.poll("s2", ["r2"]) == 1
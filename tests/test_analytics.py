@@ -0,0 +1,111 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import analytics
+from analytics import METRICS, BASELINE_DAYS, MonitoringAnalytics, ReceiverSeries
+
+
+def full_rollup(recs):
+    """기록 전체를 한 번에 다시 계산 (증분 집계와 비교할 기준)"""
+    dates = np.array([r["date"] for r in recs], dtype="datetime64[D]")
+    start = dates.min()
+    days = np.arange(start, dates.max() + np.timedelta64(1, "D"), dtype="datetime64[D]")
+    pos = (dates - start).astype(np.int64)
+    week_start = days - ((days.astype(np.int64) - 4) % 7)
+    weeks, week_idx = np.unique(week_start, return_inverse=True)
+    out = {"days": days, "counts": np.bincount(pos, minlength=len(days)).astype(float), "weeks": weeks,
+           "daily": {}, "rolling7": {}, "delta": {}, "baseline": {}, "weekly": {}}
+    for m in METRICS:
+        v = np.array([analytics._num(r["answers"].get(m)) for r in recs])
+        ok = ~np.isnan(v)
+        s = np.bincount(pos[ok], weights=v[ok], minlength=len(days))
+        c = np.bincount(pos[ok], minlength=len(days)).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out["daily"][m] = np.where(c > 0, s / c, np.nan)
+            r7 = np.array([s[max(0, i - 6):i + 1].sum() / c[max(0, i - 6):i + 1].sum()
+                           if c[max(0, i - 6):i + 1].sum() else np.nan for i in range(len(days))])
+            base = v[ok][:BASELINE_DAYS]
+            out["rolling7"][m] = r7
+            out["baseline"][m] = float(base.mean()) if base.size else np.nan
+            out["delta"][m] = r7 - out["baseline"][m]
+            ws = np.bincount(week_idx, weights=s, minlength=len(weeks))
+            wc = np.bincount(week_idx, weights=c, minlength=len(weeks))
+            out["weekly"][m] = np.where(wc > 0, ws / wc, np.nan)
+    return out
+
+
+def assert_same(got, want):
+    assert np.array_equal(got["days"], want["days"])
+    assert np.array_equal(got["weeks"], want["weeks"])
+    np.testing.assert_allclose(got["counts"], want["counts"])
+    for m in METRICS:
+        for key in ("daily", "rolling7", "delta", "weekly"):
+            np.testing.assert_allclose(got[key][m], want[key][m], equal_nan=True, err_msg=f"{key}/{m}")
+        np.testing.assert_allclose(got["baseline"][m], want["baseline"][m], equal_nan=True)
+
+
+def history(user, n, seed):
+    # 같은 날 여러 건, 며칠씩 빈 날, 빠진 점수가 섞인 날짜순 기록
+    rnd = random.Random(seed)
+    day, recs = date(2025, 12, 27), []
+    for _ in range(n):
+        day += timedelta(days=rnd.choice([0, 0, 1, 1, 1, 2, 5, 9]))
+        answers = {m: rnd.randint(0, 10) for m in METRICS if rnd.random() > 0.2}
+        recs.append({"username": user, "date": day.isoformat(), "answers": answers})
+    return recs
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_incremental_rollup_matches_full_recompute(seed):
+    recs = history("r", 120, seed)
+    s = ReceiverSeries("r")
+    for i, rec in enumerate(recs):
+        s.extend([rec])
+        if i % 7 == 0 or i == len(recs) - 1:  # 중간중간 집계를 꺼내 두고 계속 붙인다
+            assert_same(s.rollup(), full_rollup(recs[:i + 1]))
+    assert s.n == len(recs) and s.last_date == recs[-1]["date"]
+
+
+def test_batched_and_single_appends_agree():
+    recs = history("r", 60, 7)
+    one = ReceiverSeries("r")
+    one.extend(recs)
+    many = ReceiverSeries("r")
+    for k in range(0, len(recs), 11):
+        many.extend(recs[k:k + 11])
+        many.rollup()
+    assert_same(many.rollup(), one.rollup())
+    assert many.summary() == one.summary()
+
+
+def test_series_reads_only_the_new_tail(store, monkeypatch):
+    recs = history("an-tail", 30, 5)
+    store.append_records(recs[:20])
+    engine = MonitoringAnalytics()
+    s = engine.series(store, "an-tail")
+    assert s.n == 20
+
+    seen = []
+    real = store.records_from
+    monkeypatch.setattr(store, "records_for", lambda users: pytest.fail("전체 목록을 다시 읽음"))
+    monkeypatch.setattr(store, "records_from", lambda u, start: seen.append(start) or real(u, start))
+    store.append_records(recs[20:])
+    assert engine.series(store, "an-tail") is s
+    assert seen == [19] and s.n == 30
+    assert_same(s.rollup(), full_rollup(recs))
+    assert engine.series(store, "an-tail") is s and s.n == 30
+
+
+def test_series_rebuilds_when_an_older_record_lands(store):
+    recs = history("an-late", 10, 9)
+    store.append_records(recs)
+    engine = MonitoringAnalytics()
+    assert engine.series(store, "an-late").n == 10
+    late = {"username": "an-late", "date": "2025-12-01", "answers": {"mood": 3}}
+    store.append_record(late)
+    s = engine.series(store, "an-late")
+    assert s.n == 11
+    assert_same(s.rollup(), full_rollup(store.records_for(["an-late"])))
@@ -0,0 +1,31 @@
+import io
+import hashlib
+
+import pytest
+
+from blobs import BlobStore, valid_sha, valid_attachment, kind_of
+
+
+def test_put_stream_is_content_addressed(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    sha, size, new = blobs.put_stream(io.BytesIO(b"hello"))
+    assert sha == hashlib.sha256(b"hello").hexdigest() and size == 5 and new
+    assert blobs.put_stream(io.BytesIO(b"hello"))[2] is False
+    assert blobs.exists(sha)
+
+
+@pytest.mark.parametrize("sha", ["../accounts/accounts.json", "", None, "A" * 64, "0" * 63, "0" * 64 + "/.."])
+def test_bad_sha_never_becomes_a_path(tmp_path, sha):
+    blobs = BlobStore(str(tmp_path))
+    assert not valid_sha(sha)
+    assert not blobs.exists(sha)
+    with pytest.raises(ValueError):
+        blobs.path(sha)
+
+
+def test_valid_attachment():
+    sha = "0" * 64
+    assert valid_attachment({"sha": sha, "kind": "image"})
+    assert not valid_attachment({"sha": sha})
+    assert not valid_attachment({"sha": sha, "kind": "video"})
+    assert kind_of("photo.heic") is None
@@ -0,0 +1,61 @@
+import os
+import json
+
+import storage
+from cache import FileCache
+
+
+def write(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_reloads_when_file_changes_outside(tmp_path):
+    path = str(tmp_path / "a.json")
+    write(path, {"n": 1})
+    cache = FileCache()
+    assert cache.get(path, lambda: read(path)) == {"n": 1}
+    assert cache.get(path, lambda: {"n": "stale loader"}) == {"n": 1}  # stat 이 같으면 다시 읽지 않는다
+    write(path, {"n": 22})
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert cache.get(path, lambda: read(path)) == {"n": 22}
+    assert cache.stats()["hits"] == 1
+
+
+def test_dependency_change_reloads(tmp_path):
+    path, dep = str(tmp_path / "snap.json"), str(tmp_path / "journal.jsonl")
+    write(path, {"n": 1})
+    open(dep, "w").close()
+    cache = FileCache()
+    cache.get(path, lambda: "first", deps=(dep,))
+    with open(dep, "a") as f:
+        f.write("x\n")
+    assert cache.get(path, lambda: "second", deps=(dep,)) == "second"
+    assert cache.peek(path) is None  # deps 없이 잡은 키와는 다르다
+
+
+def test_lru_eviction_keeps_pinned(tmp_path):
+    paths = []
+    for i in range(4):
+        p = str(tmp_path / f"{i}.json")
+        write(p, {"i": i})
+        paths.append(p)
+    cache = FileCache(max_entries=2, pinned=(paths[0],))
+    for p in paths:
+        cache.get(p, lambda p=p: read(p))
+    assert cache.peek(paths[0]) == {"i": 0}
+    assert cache.peek(paths[3]) == {"i": 3}
+    assert cache.peek(paths[1]) is None
+    assert cache.stats()["evictions"] == 2
+
+
+def test_stores_see_each_others_writes():
+    a, b = storage.JsonStore(), storage.JsonStore()  # 프로세스가 둘인 것처럼 캐시가 따로
+    b.get_user("")  # b 가 먼저 계정 문서를 캐시에 올려 둔다
+    a.add_user({"username": "cache-peer", "password": "x", "role": "보낸이"})
+    assert b.get_user("cache-peer")["role"] == "보낸이"
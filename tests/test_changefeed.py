@@ -0,0 +1,79 @@
+import os
+
+import changefeed
+from changefeed import ChangeFeed, FileWatcher, emits, by_day, event_for_path
+
+
+def test_since_filters_by_kind_and_user():
+    feed = ChangeFeed()
+    cursor = feed.seq
+    feed.publish("memory", ("a",), ("2026-01-02",))
+    feed.publish("record", ("b",))
+    feed.publish("group", ())  # 누구인지 모름 → 모두에게
+    feed.publish("db")         # SQLite: 종류도 모름 → 모든 구독자에게
+    evs, cur = feed.since(cursor, kinds=("memory", "group"), users={"a"})
+    assert [e.kind for e in evs] == ["memory", "group", "db"]
+    assert cur == feed.seq
+    assert feed.since(cur) == ([], cur)
+
+
+def test_old_cursor_means_reload_everything():
+    feed = ChangeFeed(keep=3)
+    for i in range(6):
+        feed.publish("record", (f"u{i}",))
+    evs, cur = feed.since(0)
+    assert evs is None and cur == 6
+    assert [e.seq for e in feed.since(3)[0]] == [4, 5, 6]
+
+
+def test_repeated_event_is_coalesced():
+    feed = ChangeFeed()
+    a = feed.publish("memory", ("a",), ("2026-01-02",))
+    assert feed.publish("memory", ("a",), ("2026-01-02",)) is a
+    assert feed.publish("memory", ("a",), ("2026-01-03",)).seq == a.seq + 1
+
+
+def test_emits_publishes_after_the_write():
+    seen = []
+    feed = changefeed.get_feed()
+    fn = feed.subscribe(seen.append)
+
+    class Store:
+        @emits("deco", by_day)
+        def put(self, username, date_key, conf):
+            assert not seen  # 쓰기가 끝나기 전에는 알리지 않는다
+            return "ok"
+    try:
+        assert Store().put("u", "2026-01-02", {}) == "ok"
+    finally:
+        feed.unsubscribe(fn)
+    assert [(e.kind, e.users, e.dates) for e in seen] == [("deco", ("u",), ("2026-01-02",))]
+
+
+def test_event_for_path(tmp_path):
+    root = str(tmp_path)
+    assert event_for_path(root, f"{root}/accounts.json") == ("user", (), ())
+    assert event_for_path(root, f"{root}/memories/u/2026-01.json") == ("memory", ("u",), ("2026-01",))
+    assert event_for_path(root, f"{root}/memories/u/manifest.json") is None
+    assert event_for_path(root, f"{root}/accounts.json.lock") is None
+    assert event_for_path(root, "/elsewhere/accounts.json") is None
+
+
+def test_watcher_skips_this_process_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(changefeed, "FEED_SETTLE", 0)
+    feed = ChangeFeed()
+    w = FileWatcher(str(tmp_path), feed)
+    mine, other = tmp_path / "groups.json", tmp_path / "questions.json"
+    mine.write_text("{}")
+    other.write_text("{}")
+    changefeed._remember(str(mine))
+    w.handle(str(mine))
+    w.handle(str(other))
+    w._timer.cancel()
+    w._flush()
+    assert [e.kind for e in feed.since(0)[0]] == ["question"]
+    os.utime(mine, ns=(0, os.stat(mine).st_mtime_ns + 1))  # 다른 프로세스가 다시 씀
+    w.handle(str(mine))
+    w._timer.cancel()
+    w._flush()
+    assert [e.kind for e in feed.since(1)[0]] == ["group"]
@@ -0,0 +1,97 @@
+import os
+import json
+import threading
+import multiprocessing
+
+import storage
+from journal import Journal
+
+
+def test_torn_last_line_is_cut(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    j = Journal(path)
+    j.append({"n": 1})
+    j.append({"n": 2})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"seq": 3, "rec": {"n"')  # 쓰다 끊긴 줄
+    j2 = Journal(path)
+    assert [r["n"] for r in j2.replay()] == [1, 2]
+    assert open(path, "rb").read().endswith(b"\n")
+    assert j2.append({"n": 3}) == 3
+
+
+def test_truncate_keeps_seq_and_newer_lines(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    j = Journal(path)
+    for n in range(5):
+        j.append({"n": n})
+    j.truncate(3)
+    assert [seq for seq, _ in Journal(path).entries()] == [4, 5]
+    j.truncate(5)
+    assert Journal(path).entries() == []
+    assert Journal(path).append({"n": 5}) == 6  # 비운 뒤에도 seq 가 되돌아가지 않는다
+
+
+def _append_many(path, n):
+    j = Journal(path)
+    for i in range(n):
+        j.append({"pid": os.getpid(), "i": i})
+
+
+def test_processes_get_unique_seqs(tmp_path):
+    path = str(tmp_path / "j.jsonl")
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_append_many, args=(path, 40)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    seqs = [seq for seq, _ in Journal(path).entries()]
+    assert seqs == list(range(1, 121))
+
+
+def test_append_load_compact_do_not_deadlock():
+    store = storage.JsonStore()
+    base = len(store.load(storage.DIAGNOSIS_FILE, {"records": []})["records"])
+    stop = threading.Event()
+    errors = []
+
+    def guard(fn):
+        def run():
+            try:
+                fn()
+            except Exception as e:  # pragma: no cover - 실패 시 원인 보존
+                errors.append(e)
+        return run
+
+    def submit(k):
+        for i in range(40):
+            store.append_record({"username": f"dl{k}", "date": f"2026-03-{i % 28 + 1:02d}", "answers": {"mood": i % 10}})
+
+    def load():
+        while not stop.is_set():
+            store.cache.invalidate(storage.DIAGNOSIS_FILE)
+            store.load(storage.DIAGNOSIS_FILE, {"records": []})
+
+    def compact():
+        while not stop.is_set():
+            store.compact_diagnosis()
+
+    writers = [threading.Thread(target=guard(lambda k=k: submit(k)), daemon=True) for k in range(3)]
+    others = [threading.Thread(target=guard(load), daemon=True) for _ in range(2)]
+    others.append(threading.Thread(target=guard(compact), daemon=True))
+    for t in writers + others:
+        t.start()
+    for t in writers:
+        t.join(10)
+    stop.set()
+    for t in others:
+        t.join(10)
+    assert not any(t.is_alive() for t in writers + others), "journal lock order deadlock"
+    assert not errors
+    store.cache.invalidate(storage.DIAGNOSIS_FILE)
+    records = store.load(storage.DIAGNOSIS_FILE, {"records": []})["records"]
+    assert len(records) == base + 120
+    raw = [json.loads(line) for line in open(storage.DIAGNOSIS_JOURNAL, encoding="utf-8")]
+    seqs = [e["seq"] for e in raw if "rec" in e]
+    assert seqs == sorted(set(seqs))
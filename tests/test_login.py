@@ -0,0 +1,32 @@
+# 로그인 화면: 한 사람의 틀린 비밀번호가 다른 계정을 막지 않는다 (IP 를 모르는 localhost 에서 돈다)
+import os
+
+from streamlit.testing.v1 import AppTest
+
+import storage
+from passwords import hash_pw, throttle, THROTTLE_FREE
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def login(at, uid, pw):
+    at.radio[0].set_value("로그인").run()
+    at.text_input[0].set_value(uid)
+    at.text_input[1].set_value(pw)
+    return at.button[0].click().run()
+
+
+def test_bad_passwords_for_one_account_do_not_lock_others():
+    store = storage.get_store()
+    for uid in ("victim", "attacked"):
+        if not store.get_user(uid):
+            store.add_user({"username": uid, "password": hash_pw("right"), "role": "보낸이"})
+    throttle.reset("user:victim", "user:attacked")
+    at = AppTest.from_file(APP, default_timeout=60).run()
+    for _ in range(THROTTLE_FREE + 1):
+        login(at, "attacked", "wrong")
+    login(at, "attacked", "wrong")
+    assert any("너무 많습니다" in e.value for e in at.error)
+    login(at, "victim", "right")
+    assert not at.exception
+    assert at.session_state.logged_in and at.session_state.username == "victim"
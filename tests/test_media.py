@@ -0,0 +1,19 @@
+import base64
+
+import media
+
+
+def test_thumbnails_stay_out_of_static():
+    assert "static" not in media.THUMB_DIR.replace("\\", "/").split("/")
+    assert media.THUMB_DIR.startswith(media.DERIVED_DIR)
+
+
+def test_cell_thumbnail_is_an_inline_jpeg(tmp_path):
+    from PIL import Image
+    src, dst = str(tmp_path / "src.png"), str(tmp_path / "t.jpg")
+    Image.new("RGB", (800, 600), "orange").save(src)
+    media.make_thumbnail(src, dst)
+    uri = media._cell_data_uri(dst)
+    assert uri.startswith("data:image/jpeg;base64,")
+    raw = base64.b64decode(uri.split(",", 1)[1])
+    assert raw[:2] == b"\xff\xd8" and len(raw) < 8000
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import migrations
+import storage
+from passwords import is_hashed, verify_pw
+
+
+@pytest.fixture
+def schema(tmp_path, monkeypatch):
+    path = str(tmp_path / "schema_version.json")
+    monkeypatch.setattr(migrations, "SCHEMA_FILE", path)
+    return path
+
+
+def test_runs_every_step_once_and_records_the_version(store, schema):
+    store.add_user({"username": "mg_plain", "password": "옛비번", "role": "받는이"})
+    done = migrations.migrate(store)
+    assert done == [name for _, name, _ in migrations.MIGRATIONS]
+    with open(schema, encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["version"] == migrations.MIGRATIONS[-1][0]
+    assert [a["version"] for a in state["applied"]] == [v for v, _, _ in migrations.MIGRATIONS]
+    stored = store.get_user("mg_plain")["password"]
+    assert is_hashed(stored) and verify_pw("옛비번", stored)
+
+    assert migrations.migrate(store) == []  # 두 번째는 아무것도 하지 않는다
+    assert migrations.read_version() == state
+    assert store.get_user("mg_plain")["password"] == stored
+
+
+def test_only_new_steps_run_and_bump_the_version(store, schema, monkeypatch):
+    migrations.migrate(store)
+    ran = []
+    latest = migrations.MIGRATIONS[-1][0]
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS + [(latest + 1, "extra", ran.append)])
+    assert migrations.migrate(store) == ["extra"]
+    assert ran == [store]
+    assert migrations.read_version()["version"] == latest + 1
+    assert migrations.migrate(store) == []
+
+
+def test_failed_step_is_retried_from_that_step(store, schema, monkeypatch):
+    def boom(store):
+        raise RuntimeError("중간에 죽음")
+    steps = migrations.MIGRATIONS[:2] + [(3, "boom", boom)]
+    monkeypatch.setattr(migrations, "MIGRATIONS", steps)
+    with pytest.raises(RuntimeError):
+        migrations.migrate(store)
+    assert migrations.read_version()["version"] == 2
+    monkeypatch.setattr(migrations, "MIGRATIONS", steps[:2] + [(3, "fixed", lambda s: None)])
+    assert migrations.migrate(store) == ["fixed"]
+
+
+def test_steps_are_idempotent(store):
+    store.add_user({"username": "mg_twice", "password": "pw", "role": "보낸이"})
+    store.save(storage.GROUPS_FILE, {"groups": [{"group_name": "옛그룹", "members": ["mg_twice"]}]})
+    for _, _, step in migrations.MIGRATIONS:
+        step(store)
+    pw = store.get_user("mg_twice")["password"]
+    ids = [g["id"] for g in store.groups_of("mg_twice")]
+    assert ids and all(ids)
+    for _, _, step in migrations.MIGRATIONS:
+        step(store)
+    assert store.get_user("mg_twice")["password"] == pw
+    assert [g["id"] for g in store.groups_of("mg_twice")] == ids
@@ -0,0 +1,39 @@
+import pytest
+
+import passwords
+from passwords import LoginThrottle, throttle_ip
+
+
+@pytest.mark.parametrize("fwd, peer, trusted, expected", [
+    ("", "203.0.113.5", 0, "203.0.113.5"),
+    ("", None, 0, None),                                    # localhost 개발 서버: 주소 없음
+    ("", "127.0.0.1", 0, None),                             # 같은 호스트의 프록시
+    ("198.51.100.7", "10.0.0.2", 0, None),                  # 설정 안 한 프록시 뒤 (Streamlit Cloud 등)
+    ("6.6.6.6, 198.51.100.7", "127.0.0.1", 1, "198.51.100.7"),  # 앞쪽은 클라이언트가 꾸민 것
+    ("6.6.6.6, 198.51.100.7, 10.0.0.3", "127.0.0.1", 2, "198.51.100.7"),
+    ("", "127.0.0.1", 1, None),
+    ("not-an-ip", "127.0.0.1", 1, None),
+])
+def test_throttle_ip(fwd, peer, trusted, expected):
+    assert throttle_ip(fwd, peer, trusted) == expected
+
+
+def test_user_key_blocks_after_free_attempts():
+    t = LoginThrottle()
+    for _ in range(passwords.THROTTLE_FREE):
+        t.fail("user:a")
+    assert t.login_wait("user:a") == 0
+    t.fail("user:a")
+    assert t.login_wait("user:a") > 0
+    t.reset("user:a")
+    assert t.login_wait("user:a") == 0
+
+
+def test_shared_ip_does_not_lock_out_clean_accounts():
+    t = LoginThrottle()
+    for i in range(passwords.THROTTLE_FREE + 5):
+        t.fail(f"user:guess{i}", "ip:198.51.100.7")
+    assert t.wait_time("ip:198.51.100.7") > 0
+    assert t.login_wait("user:someone-else", "ip:198.51.100.7") == 0
+    t.fail("user:someone-else", "ip:198.51.100.7")  # 이 아이디도 틀리기 시작하면 IP 기록이 적용된다
+    assert t.login_wait("user:someone-else", "ip:198.51.100.7") > 0
@@ -0,0 +1,42 @@
+import pytest
+
+import profiling
+
+
+@pytest.fixture
+def prof(monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    monkeypatch.setattr(profiling, "_write_log", lambda out: None)
+    profiling._recent.clear()
+    yield profiling
+    profiling._local.rec, profiling._local.stack = None, []
+    profiling._pending.clear()
+
+
+def test_fragment_inside_a_full_rerun_is_one_span(prof):
+    prof.begin_rerun("pf_full")
+    with prof.fragment_scope("grid"):
+        with prof.span("store.load"):
+            pass
+    prof.end_rerun()
+    (rec,) = prof._recent
+    assert {"fragment:grid", "store.load"} <= set(rec["spans"]) and not rec["interrupted"]
+
+
+def test_fragment_rerun_after_an_interrupted_rerun_gets_its_own_record(prof):
+    prof.begin_rerun("pf_cut")
+    with prof.span("calendar"):
+        pass
+    stale = prof._current()  # st.rerun() 으로 끊겨 end_rerun 을 못 부른 기록
+
+    with prof.fragment_scope("grid", partial=True):
+        with prof.span("store.load"):
+            pass
+    (frag,) = prof._recent
+    assert frag["page"] == "fragment:grid"
+    assert set(frag["spans"]) == {"fragment:grid", "store.load"}
+    assert set(stale["spans"]) == {"calendar"}
+    assert prof._current() is None
+
+    prof.begin_rerun("pf_cut")  # 다음 전체 rerun 이 끊긴 기록을 마무리
+    assert prof._recent[-1]["interrupted"] and set(prof._recent[-1]["spans"]) == {"calendar"}
@@ -0,0 +1,59 @@
+import time
+import threading
+
+import pytest
+
+import locking
+import replication
+from locking import atomic_write_json, file_lock, on_write
+
+
+class FailingBucket:
+    def put(self, key, path): raise OSError("bucket down")
+    def delete(self, key): raise OSError("bucket down")
+    def list(self, prefix): return []
+
+
+class SlowBucket:
+    def __init__(self): self.keys = []
+    def put(self, key, path): self.keys.append(key)
+    def delete(self, key): pass
+    def list(self, prefix): return []
+
+
+@pytest.fixture
+def fast_limits(monkeypatch):
+    monkeypatch.setattr(replication, "REPLICA_MAX_LAG", 0.05)
+    monkeypatch.setattr(replication, "REPLICA_BLOCK", 1.0)
+
+
+def test_writes_do_not_stall_when_bucket_is_down(tmp_path, fast_limits):
+    rep = replication.Replicator(FailingBucket(), root=str(tmp_path))
+    on_write(rep.mark)
+    try:
+        path = str(tmp_path / "a.json")
+        atomic_write_json(path, {"n": 0})
+        rep.run_once()
+        assert rep.failing
+        time.sleep(0.2)  # 지연이 상한의 두 배를 넘게
+        t0 = time.time()
+        for n in range(5):
+            atomic_write_json(path, {"n": n})
+        assert time.time() - t0 < 0.5
+        assert rep.backpressure() is False
+    finally:
+        locking._write_listeners.remove(rep.mark)
+
+
+def test_backpressure_waits_only_when_uploads_succeed(tmp_path, fast_limits):
+    rep = replication.Replicator(SlowBucket(), root=str(tmp_path))
+    path = str(tmp_path / "b.json")
+    atomic_write_json(path, {})
+    rep.mark(path)
+    time.sleep(0.2)
+    with file_lock(path):
+        assert rep.backpressure() is False  # 잠금을 쥔 채로는 기다리지 않는다
+    threading.Timer(0.1, rep.run_once).start()
+    t0 = time.time()
+    assert rep.backpressure() is True
+    assert time.time() - t0 < 0.9 and rep.status()["pending"] == 0
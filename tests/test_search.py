@@ -0,0 +1,60 @@
+import pytest
+
+from search import SearchIndex, tokens
+
+
+@pytest.fixture
+def index(store, tmp_path):
+    return SearchIndex(store, root=str(tmp_path / "search"))
+
+
+def save(store, index, user, date_key, title, text=""):
+    item = {"title": title, "text": text}
+    store.add_memory(user, date_key, item)
+    index.add(user, date_key, item)
+
+
+def test_tokens_are_character_bigrams():
+    assert tokens("산책길 A") == ["산책", "책길", "a"]
+    assert tokens("ＡＢ, 가!") == ["ab", "가"]
+    assert tokens("") == []
+
+
+def test_hits_and_misses(store, index):
+    save(store, index, "se_user", "2026-03-01", "공원 산책", "벚꽃이 폈다")
+    save(store, index, "se_user", "2026-03-02", "생일 파티", "케이크")
+    assert [h["date"] for h in index.search("se_user", "산책")] == ["2026-03-01"]
+    assert [h["title"] for h in index.search("se_user", "벚꽃이")] == ["공원 산책"]
+    assert index.search("se_user", "바다") == []
+    assert index.search("se_user", "") == []
+    assert index.search("se_other", "산책") == []  # 다른 사용자 추억은 안 보인다
+
+
+def test_journal_is_replayed_by_a_new_process(store, index):
+    save(store, index, "se_jr", "2026-04-01", "첫 등산")
+    again = SearchIndex(store, root=index.root)
+    assert [h["title"] for h in again.search("se_jr", "등산")] == ["첫 등산"]
+
+
+def test_edit_and_delete_are_seen(store, index):
+    save(store, index, "se_ed", "2026-05-01", "바닷가", "조개")
+    save(store, index, "se_ed", "2026-05-02", "도서관")
+    assert index.search("se_ed", "바닷가")
+
+    store.save_mems("se_ed", {"memories": {"2026-05-01": [{"title": "산길", "text": "조개"}],
+                                           "2026-05-02": [{"title": "도서관", "text": ""}]}})
+    index.invalidate("se_ed")  # 건수는 그대로
+    assert index.search("se_ed", "바닷가") == []
+    assert [h["date"] for h in index.search("se_ed", "산길")] == ["2026-05-01"]
+
+    store.save_mems("se_ed", {"memories": {"2026-05-01": [{"title": "산길", "text": "조개"}]}})
+    index.invalidate("se_ed")
+    assert index.search("se_ed", "도서관") == []
+    assert SearchIndex(store, root=index.root).search("se_ed", "도서관") == []
+
+
+def test_out_of_sync_snapshot_is_rebuilt(store, index):
+    save(store, index, "se_sync", "2026-06-01", "캠핑")
+    store.add_memories("se_sync", [("2026-06-02", {"title": "낚시", "text": ""})])  # 색인을 거치지 않은 가져오기
+    fresh = SearchIndex(store, root=index.root)
+    assert [h["title"] for h in fresh.search("se_sync", "낚시")] == ["낚시"]
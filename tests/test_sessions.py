@@ -0,0 +1,78 @@
+import os
+import time
+import secrets
+
+import pytest
+
+import storage
+from locking import atomic_write_json
+from sessions import SessionStore, valid_token
+
+
+def test_valid_token():
+    assert valid_token(secrets.token_urlsafe(32))
+    for bad in (None, "", "../accounts", "a" * 42, "a" * 44, "a" * 40 + "/.." , "가" * 43):
+        assert not valid_token(bad)
+
+
+@pytest.mark.parametrize("sid", ["../accounts", "../groups", "../diagnosis", "../questions", "..%2Faccounts"])
+def test_path_like_sid_never_touches_data_files(sid):
+    name = sid.split("/")[-1]
+    path = f"{storage.DATA_DIR}/{name}.json"
+    atomic_write_json(path, {"users": []})
+    sessions = SessionStore(storage.JsonStore())
+    assert sessions.get(sid) is None
+    sessions.delete(sid)
+    assert os.path.exists(path)
+
+
+def test_unparsable_session_file_is_not_deleted():
+    os.makedirs(storage.SESSIONS_DIR, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    path = f"{storage.SESSIONS_DIR}/{token}.json"
+    atomic_write_json(path, {"users": []})
+    st = storage.JsonStore()
+    assert SessionStore(st).get(token) is None
+    st.session_sweep(float("inf"))
+    assert os.path.exists(path)
+
+
+def test_create_get_delete(store):
+    sessions = SessionStore(store)
+    token = sessions.create("alice", "받는이")
+    assert valid_token(token)
+    assert sessions.get(token)["username"] == "alice"
+    sessions.delete(token)
+    assert sessions.get(token) is None
+
+
+def test_logout_in_another_worker_is_seen(store):
+    here, there = SessionStore(store, recheck=0), SessionStore(store, recheck=0)
+    token = here.create("alice", "받는이")
+    assert there.get(token)["username"] == "alice"  # 다른 프로세스 LRU 에 올라감
+    here.delete(token)
+    assert there.get(token) is None
+
+
+def test_lru_is_trusted_only_briefly(store, monkeypatch):
+    sessions = SessionStore(store, recheck=5)
+    token = sessions.create("alice", "받는이")
+    store.session_delete(token)  # 다른 프로세스의 로그아웃
+    assert sessions.get(token) is not None  # 확인 간격 안에서는 LRU 값
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 6)
+    assert sessions.get(token) is None
+
+
+def test_store_rejects_bad_tokens(store):
+    with pytest.raises(ValueError):
+        store.session_put("../accounts", {"username": "x", "expires": 1})
+    assert store.session_get("../accounts") is None
+    store.session_delete("../accounts")
+
+
+def test_expired_session_is_removed(store):
+    token = secrets.token_urlsafe(32)
+    store.session_put(token, {"username": "bob", "role": "받는이", "expires": 1})
+    assert SessionStore(store).get(token) is None
+    assert store.session_get(token) is None
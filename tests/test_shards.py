@@ -0,0 +1,68 @@
+import os
+import json
+
+import storage
+from cache import FileCache
+from shards import MonthShards, month_of
+
+
+def test_month_of():
+    assert month_of("2026-03-31") == "2026-03"
+
+
+def test_memories_land_in_their_month(store):
+    store.add_memory("sh_route", "2026-01-31", {"title": "1월", "text": ""})
+    store.add_memory("sh_route", "2026-02-01", {"title": "2월", "text": ""})
+    store.add_memory("sh_route", "2026-02-01", {"title": "2월 둘째", "text": ""})
+    assert store.load_mems_month("sh_route", "2026-01")["memories"] == {"2026-01-31": [{"title": "1월", "text": ""}]}
+    assert [it["title"] for it in store.mems_for_day("sh_route", "2026-02-01")] == ["2월", "2월 둘째"]
+    assert store.load_mems_month("sh_route", "2026-03")["memories"] == {}
+    assert store.count_mems("sh_route") == 3
+    assert [(d, it["title"]) for d, it in store.iter_mems("sh_route")] == [
+        ("2026-01-31", "1월"), ("2026-02-01", "2월"), ("2026-02-01", "2월 둘째")]
+    assert sorted(store.load_mems("sh_route")["memories"]) == ["2026-01-31", "2026-02-01"]
+    assert "sh_route" in store.mem_users()
+
+
+def test_decos_by_month_and_delete(store):
+    store.put_decos("sh_deco", {"2025-12-25": {"emoji": "🎄"}, "2026-01-01": {"emoji": "🎍"}})
+    store.put_deco("sh_deco", "2026-01-02", {"emoji": "⛄"})
+    assert sorted(store.load_decos_month("sh_deco", "2026-01")["decos"]) == ["2026-01-01", "2026-01-02"]
+    store.delete_deco("sh_deco", "2025-12-25")
+    assert store.load_decos_month("sh_deco", "2025-12")["decos"] == {}
+    assert [d for d, _ in store.iter_decos("sh_deco")] == ["2026-01-01", "2026-01-02"]
+
+
+def test_manifest_lists_only_months_with_data():
+    store = storage.JsonStore()
+    store.add_memories("sh_man", [("2026-04-02", {"title": "a"}), ("2026-06-09", {"title": "b"})])
+    store.put_deco("sh_man", "2026-05-05", {"emoji": "🎏"})
+    man = store.mem_shards.manifest("sh_man")
+    assert man == {"months": ["2026-04", "2026-06"], "counts": {"2026-04": 1, "2026-06": 1}}
+    assert os.path.exists(store.mem_shards.shard_path("sh_man", "2026-06"))
+    assert not os.path.exists(store.mem_shards.shard_path("sh_man", "2026-05"))
+    store.delete_deco("sh_man", "2026-05-05")
+    assert store.deco_shards.manifest("sh_man")["months"] == []
+
+
+def test_save_all_drops_emptied_months(store):
+    store.save_mems("sh_all", {"memories": {"2026-07-01": [{"title": "x"}], "2026-08-01": [{"title": "y"}]}})
+    store.save_mems("sh_all", {"memories": {"2026-08-01": [{"title": "y"}]}})
+    assert store.load_mems_month("sh_all", "2026-07")["memories"] == {}
+    assert store.count_mems("sh_all") == 1
+    if store.name == "json":
+        assert not os.path.exists(store.mem_shards.shard_path("sh_all", "2026-07"))
+
+
+def test_legacy_file_is_split_once(tmp_path):
+    root = str(tmp_path / "memories")
+    os.makedirs(root)
+    with open(f"{root}/old.json", "w", encoding="utf-8") as f:
+        json.dump({"memories": {"2025-11-03": [{"title": "가"}], "2025-12-24": [{"title": "나"}]}}, f)
+    shards = MonthShards(root, "memories", FileCache(1 << 20, 16))
+    assert shards.users() == ["old"]
+    assert shards.manifest("old")["months"] == ["2025-11", "2025-12"]
+    assert shards.load_month("old", "2025-12")["memories"] == {"2025-12-24": [{"title": "나"}]}
+    assert not os.path.exists(f"{root}/old.json") and os.path.exists(f"{root}/old.json.migrated")
+    assert MonthShards(root, "memories", FileCache(1 << 20, 16)).load_all("old")["memories"] == {
+        "2025-11-03": [{"title": "가"}], "2025-12-24": [{"title": "나"}]}
@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+import storage
+from locking import WriteConflict, atomic_write_json, stamp
+
+
+EMPTY = {storage.ACCOUNTS_FILE: {"users": []}, storage.GROUPS_FILE: {"groups": []},
+         storage.QUESTIONS_FILE: {"custom_questions": []}}
+
+
+@pytest.fixture
+def js():
+    # 테스트마다 빈 전역 문서로 시작
+    for path, doc in EMPTY.items():
+        atomic_write_json(path, stamp(doc, 1))
+    return storage.JsonStore()
+
+
+def test_append_does_not_touch_the_cached_document(js):
+    js.add_user({"username": "a", "password": "x"})
+    before = js.load(storage.ACCOUNTS_FILE, {"users": []})
+    js.add_user({"username": "b", "password": "x"})
+    assert [u["username"] for u in before["users"]] == ["a"]
+    after = js.load(storage.ACCOUNTS_FILE, {"users": []})
+    assert [u["username"] for u in after["users"]] == ["a", "b"]
+    assert js.get_user("b")["username"] == "b"
+
+
+def test_record_append_does_not_touch_the_cached_document(js):
+    js.append_record({"username": "cw", "date": "2026-02-01", "answers": {}})
+    before = js.load(storage.DIAGNOSIS_FILE, {"records": []})
+    n, seq = len(before["records"]), before["journal_seq"]
+    js.append_record({"username": "cw", "date": "2026-02-02", "answers": {}})
+    js.append_records([{"username": "cw", "date": "2026-02-03", "answers": {}}])
+    assert (len(before["records"]), before["journal_seq"]) == (n, seq)
+    after = js.load(storage.DIAGNOSIS_FILE, {"records": []})
+    assert len(after["records"]) == n + 2 and after["journal_seq"] == seq + 2
+    assert [r["date"] for r in js.records_for(["cw"])][-3:] == ["2026-02-01", "2026-02-02", "2026-02-03"]
+    assert js.has_record("cw", "2026-02-03")
+
+
+def test_failed_write_leaves_cache_and_index_unchanged(js, monkeypatch):
+    js.add_user({"username": "a", "password": "x"})
+    js.get_user("a")
+
+    def boom(path, data):
+        raise OSError("disk full")
+    monkeypatch.setattr(js, "_write", boom)
+    with pytest.raises(OSError):
+        js.add_user({"username": "ghost", "password": "x"})
+    monkeypatch.undo()
+    assert js.get_user("ghost") is None
+    assert [u["username"] for u in js.load(storage.ACCOUNTS_FILE, {"users": []})["users"]] == ["a"]
+
+
+def test_save_of_a_stale_document_is_refused(js):
+    doc = js.load(storage.QUESTIONS_FILE, {"custom_questions": []})
+    js.add_question({"id": "q1", "creator": "s", "targets": ["r"], "text": "?", "type": "yesno"})
+    with pytest.raises(WriteConflict):
+        js.save(storage.QUESTIONS_FILE, dict(doc, custom_questions=[]))
+    js.save(storage.QUESTIONS_FILE, {"custom_questions": []})  # 새 문서는 통째 교체
+
+
+def test_group_index_matches_documents(js):
+    rnd = random.Random(7)
+    people = [f"p{i}" for i in range(8)]
+    groups = [js.create_group(f"g{i}", rnd.sample(people, 3)) for i in range(5)]
+    js.groups_of("p0")
+    for _ in range(200):
+        g, u = rnd.choice(groups), rnd.choice(people)
+        (js.add_group_member if rnd.random() < 0.5 else js.leave_group)(g, u)
+    doc = js.load(storage.GROUPS_FILE, {"groups": []})["groups"]
+    for u in people:
+        mine = [g for g in doc if u in g["members"]]
+        assert [g["id"] for g in js.groups_of(u)] == [g["id"] for g in mine]
+        assert js.receivers_of(u) == sorted({m for g in mine for m in g["members"] if m != u})
+
+
+def test_duplicate_sign_up_keeps_the_first_account(store):
+    store.add_user({"username": "dup", "password": "first", "role": "보낸이"})
+    with pytest.raises(storage.UserExists):
+        store.add_user({"username": "dup", "password": "second", "role": "받는이"})
+    assert store.get_user("dup")["password"] == "first"
+
+
+def test_racing_sign_ups_create_one_account(store):
+    import threading
+    results = []
+
+    def sign_up(i):
+        try:
+            store.add_user({"username": "race", "password": f"pw{i}", "role": "보낸이"})
+            results.append(i)
+        except storage.UserExists:
+            pass
+    threads = [threading.Thread(target=sign_up, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 1
+    assert store.get_user("race")["password"] == f"pw{results[0]}"
+
+
+def test_migrate_reads_everything_from_the_given_root(tmp_path):
+    import secrets
+    root = str(tmp_path / "old")
+    src = storage.JsonStore(root)
+    atomic_write_json(f"{root}/accounts.json", {"users": [{"username": "mg", "password": "x", "role": "받는이"}]})
+    src.append_record({"username": "mg", "date": "2026-03-01", "answers": {}})  # 저널에만 있는 기록
+    src.append_record({"username": "mg", "date": "2026-03-02", "answers": {}})
+    mine, elsewhere = secrets.token_urlsafe(32), secrets.token_urlsafe(32)
+    src.session_put(mine, {"username": "mg", "role": "받는이", "expires": 9e9})
+    storage.JsonStore().session_put(elsewhere, {"username": "other", "role": "받는이", "expires": 9e9})
+
+    counts = storage.migrate(src_root=root, db_path=str(tmp_path / "data.db"))
+    dst = storage.SqliteStore(str(tmp_path / "data.db"))
+    assert counts["users"] == 1 and counts["records"] == 2
+    assert [r["date"] for r in dst.records_for(["mg"])] == ["2026-03-01", "2026-03-02"]
+    assert dst.session_get(mine)["username"] == "mg"
+    assert dst.session_get(elsewhere) is None
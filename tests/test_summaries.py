@@ -0,0 +1,56 @@
+from summaries import apply, build, change, record_change
+
+
+def test_apply_adds_counts_and_drops_empty_days():
+    days = {}
+    apply(days, [change("2026-01-01", mems=2), change("2026-01-01", deco=1), change("2026-01-02", mood=4)])
+    assert days == {"2026-01-01": [2, 1, None, None], "2026-01-02": [0, 0, 4, None]}
+    apply(days, [change("2026-01-01", mems=-2), change("2026-01-01", deco=0), change("2026-01-03", mems=-1)])
+    assert days == {"2026-01-02": [0, 0, 4, None]}
+
+
+def test_record_change_keeps_only_numbers():
+    assert record_change({"date": "2026-01-01", "answers": {"mood": 3, "pain": "심함"}}) == \
+        ("2026-01-01", 0, None, 3, None)
+    assert record_change({"date": "2026-01-01", "answers": {"mood": True}})[3] is None
+
+
+def test_build_matches_applying_one_by_one():
+    mems = [("2026-02-01", 2), ("2026-02-03", 1)]
+    recs = [{"date": "2026-02-01", "answers": {"mood": 2, "pain": 5}},
+            {"date": "2026-02-01", "answers": {"mood": 4}}]
+    days = {}
+    for d, n in mems:
+        for _ in range(n):
+            apply(days, [change(d, mems=1)])
+    apply(days, [change("2026-02-03", deco=1)])
+    for r in recs:
+        apply(days, [record_change(r)])
+    assert build(mems, ["2026-02-03"], recs) == days
+
+
+def test_incremental_updates_match_a_rebuild(store):
+    u = "sm_user"
+    store.add_memory(u, "2025-12-31", {"title": "송년", "text": ""})
+    store.add_memory(u, "2026-01-01", {"title": "새해", "text": ""})
+    store.add_memories(u, [("2026-01-01", {"title": "떡국"}), ("2026-03-10", {"title": "봄"})])
+    store.put_deco(u, "2026-01-01", {"emoji": "🎍"})
+    store.put_decos(u, {"2026-02-14": {"emoji": "🍫"}, "2026-03-10": {"emoji": "🌸"}})
+    store.delete_deco(u, "2026-02-14")
+    store.append_record({"username": u, "date": "2026-01-01", "answers": {"mood": 3, "pain": 2}})
+    store.append_records([{"username": u, "date": "2026-01-01", "answers": {"mood": 5}},
+                          {"username": u, "date": "2026-03-11", "answers": {"pain": 7}}])
+
+    incremental = {y: store.day_summaries(u, y) for y in ("2025", "2026")}
+    assert incremental["2025"] == {"2025-12-31": [1, 0, None, None]}
+    assert incremental["2026"] == {"2026-01-01": [2, 1, 5, 2], "2026-03-10": [1, 1, None, None],
+                                   "2026-03-11": [0, 0, None, 7]}
+    store.rebuild_summary(u)
+    assert {y: store.day_summaries(u, y) for y in ("2025", "2026")} == incremental
+
+
+def test_rebuild_clears_years_that_no_longer_have_data(store):
+    u = "sm_gone"
+    store.add_memory(u, "2024-05-05", {"title": "옛날", "text": ""})
+    store.save_mems(u, {"memories": {}})  # 통째 저장 → 다시 만들기
+    assert store.day_summaries(u, "2024") == {}
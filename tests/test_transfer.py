@@ -0,0 +1,70 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+import transfer
+from blobs import BlobStore
+from transfer import BadLine, validate
+
+
+@pytest.fixture
+def blobs(tmp_path):
+    return BlobStore(str(tmp_path))
+
+
+def memory(**att):
+    return {"type": "memory", "date": "2026-01-02", "title": "t", "text": "x", "attachments": [att]}
+
+
+@pytest.mark.parametrize("att", [
+    {"sha": "../accounts/accounts.json", "kind": "audio"},
+    {"sha": "../../etc/passwd", "kind": "image"},
+    {"sha": "0" * 64},
+    {"sha": "0" * 64, "kind": "video"},
+    {"kind": "image"},
+])
+def test_bad_attachment_rejects_line(blobs, att):
+    with pytest.raises(BadLine):
+        validate(memory(**att), "u", blobs)
+
+
+def test_attachment_is_rebuilt_from_whitelisted_fields(blobs):
+    sha, size, _ = blobs.put_stream(io.BytesIO(b"png"))
+    _, _, item = validate(memory(sha=sha, kind="image", name="a.png", mime=None, size=size,
+                                 path="/etc/passwd", extra={"x": 1}), "u", blobs)
+    assert item["attachments"] == [{"sha": sha, "kind": "image", "name": "a.png", "mime": "", "size": size}]
+
+
+def test_missing_blob_is_dropped_not_rejected(blobs):
+    _, _, item = validate(memory(sha="f" * 64, kind="image"), "u", blobs)
+    assert "attachments" not in item
+
+
+def test_import_then_zip_export_never_leaves_blob_dir(store):
+    lines = [memory(sha="../accounts/accounts.json", kind="audio"),
+             {"type": "memory", "date": "2026-01-03", "title": "ok", "text": "y"}]
+    data = io.BytesIO("\n".join(json.dumps(o) for o in lines).encode())
+    report = transfer.import_file(store, "imp_user", data, "backup.jsonl")
+    assert report["memories"] == 1 and len(report["errors"]) == 1
+
+    out = b"".join(transfer.iter_export(store, "imp_user", "zip"))
+    names = zipfile.ZipFile(io.BytesIO(out)).namelist()
+    assert not any(".." in n or not n.split("/")[0] for n in names)
+
+
+def test_jsonl_round_trip(store):
+    store.add_memory("rt_user", "2026-02-01", {"title": "산책", "text": "공원"})
+    out = b"".join(transfer.iter_export(store, "rt_user", "jsonl"))
+    report = transfer.import_file(store, "rt_user2", io.BytesIO(out), "x.jsonl")
+    assert report["memories"] == 1
+    assert [it["title"] for _, it in store.iter_mems("rt_user2")] == ["산책"]
+
+
+def test_spool_returns_the_export_bytes(store):
+    store.add_memory("sp_user", "2026-02-01", {"title": "바다", "text": "파도"})
+    chunks = list(transfer.iter_export(store, "sp_user", "jsonl"))
+    out = transfer.spool(iter(chunks))
+    assert isinstance(out, bytes)
+    assert out == b"".join(chunks)
@@ -0,0 +1,441 @@
+# transfer.py — 추억/꾸미기/자가진단 기록 내보내기·가져오기
+# - 내보내기는 모두 bytes 조각을 내는 제너레이터: 저장소를 한 달(또는 한 사람) 단위로 읽으며 바로 써 내려간다
+#   → 기록이 몇 년치든 메모리 사용량이 일정
+#   JSONL: 한 줄 = {"type": "memory"|"deco"|"record", "date": ..., ...}  (첫 줄은 {"type": "export", ...})
+#   CSV  : 추억 = date,title,text,ts / 기록 = username,date,item,value (긴 형식 — 질문이 사람마다 달라도 열이 고정)
+#   ZIP  : data.jsonl + records.csv + attachments/<sha> (첨부 원본) + manifest.json
+# - 화면(st.download_button)에는 spool() 로 임시 파일에 흘려 쓴 뒤 읽은 bytes 를 넘긴다 (누를 때만 만든다)
+#   큰 백업은 CLI 로 표준 출력에 바로: python transfer.py export <아이디> [zip|jsonl|csv] > backup.zip
+# - 가져오기: JSONL/ZIP/CSV 를 줄 단위로 검사하고 IMPORT_BATCH 건씩 묶어 한 번에 저장
+#   (save_mems 를 건마다 부르지 않는다). 이미 있는 추억/같은 날 기록은 건너뛴다
+
+import io
+import os
+import sys
+import csv
+import json
+import zipfile
+import tempfile
+from datetime import datetime
+
+import storage
+from blobs import get_blobs, valid_sha, BlobTooLarge, KINDS as ATTACHMENT_KINDS
+from profiling import timed
+
+EXPORT_FORMATS = ("zip", "jsonl", "csv")
+MIMES = {"zip": "application/zip", "jsonl": "application/x-ndjson", "csv": "text/csv"}
+IMPORT_BATCH = int(os.environ.get("IMPORT_BATCH", 500))
+MAX_IMPORT_ERRORS = 50
+VERSION = 1
+
+
+def _line(obj): return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def export_name(who, fmt, kind="backup"):
+    return f"{kind}_{who}_{datetime.now():%Y%m%d}.{fmt}"
+
+
+# -------------------- 내보내기 (제너레이터) --------------------
+def iter_jsonl(store, username, records=True):
+    yield _line({"type": "export", "version": VERSION, "user": username,
+                 "created": datetime.now().isoformat(timespec="seconds")})
+    for d, it in store.iter_mems(username):
+        yield _line({"type": "memory", "date": d, **it})
+    for d, conf in store.iter_decos(username):
+        yield _line({"type": "deco", "date": d, **conf})
+    if records:
+        for rec in store.iter_records([username]):
+            yield _line({"type": "record", **rec})
+
+
+class _Rows:
+    """csv.writer 가 쓴 한 줄을 바로 꺼내 가는 버퍼"""
+
+    def __init__(self):
+        self.buf = io.StringIO()
+        self.w = csv.writer(self.buf)
+
+    def row(self, values):
+        self.w.writerow(values)
+        out = self.buf.getvalue().encode("utf-8")
+        self.buf.seek(0)
+        self.buf.truncate()
+        return out
+
+
+def iter_csv_memories(store, username):
+    rows = _Rows()
+    yield "\ufeff".encode("utf-8")  # 엑셀에서 한글이 깨지지 않게 BOM
+    yield rows.row(["date", "title", "text", "ts"])
+    for d, it in store.iter_mems(username):
+        yield rows.row([d, it.get("title", ""), it.get("text", ""), it.get("ts", "")])
+
+
+def iter_csv_records(store, usernames, bom=True):
+    rows = _Rows()
+    if bom:
+        yield "\ufeff".encode("utf-8")
+    yield rows.row(["username", "date", "item", "value"])
+    for rec in store.iter_records(usernames):
+        u, d = rec.get("username", ""), rec.get("date", "")
+        for k, v in (rec.get("answers") or {}).items():
+            yield rows.row([u, d, k, v])
+        if rec.get("memo"):
+            yield rows.row([u, d, "memo", rec["memo"]])
+
+
+def iter_jsonl_records(store, usernames):
+    for rec in store.iter_records(usernames):
+        yield _line({"type": "record", **rec})
+
+
+class _Sink(io.RawIOBase):
+    """ZipFile 이 쓰는 바이트를 모아 두었다가 drain() 으로 넘긴다 (seek 불가 스트림)"""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def writable(self): return True
+
+    def write(self, b):
+        if b:
+            self.parts.append(bytes(b))
+            self.size += len(b)
+        return len(b)
+
+    def drain(self):
+        out = b"".join(self.parts)
+        self.parts, self.size = [], 0
+        return out
+
+
+def _zip(entries):
+    """entries: (이름, bytes 조각 제너레이터) 목록 → zip bytes 조각"""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, chunks in entries:
+            with zf.open(name, "w", force_zip64=True) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    if sink.size >= 1024 * 1024:
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _blob_chunks(path):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _attachment_entries(store, username):
+    blobs, seen = get_blobs(), set()
+    for _, it in store.iter_mems(username):
+        for att in it.get("attachments", []):
+            sha = att.get("sha")
+            if sha and sha not in seen and blobs.exists(sha):
+                seen.add(sha)
+                yield f"attachments/{sha}", _blob_chunks(blobs.path(sha))
+
+
+def iter_zip(store, username, attachments=True):
+    def entries():
+        yield "data.jsonl", iter_jsonl(store, username)
+        yield "records.csv", iter_csv_records(store, [username])
+        if attachments:
+            yield from _attachment_entries(store, username)
+        yield "manifest.json", iter([_line({"version": VERSION, "user": username,
+                                            "created": datetime.now().isoformat(timespec="seconds")})])
+    return _zip(entries())
+
+
+def iter_export(store, username, fmt):
+    """받는이/보낸이 본인 백업"""
+    if fmt == "zip":
+        return iter_zip(store, username)
+    if fmt == "jsonl":
+        return iter_jsonl(store, username)
+    if fmt == "csv":
+        return iter_csv_memories(store, username)
+    raise ValueError(fmt)
+
+
+def iter_records_export(store, usernames, fmt):
+    """보낸이가 받는이들의 자가진단 기록을 (예: 의사에게) 넘길 때"""
+    usernames = list(usernames)
+    if fmt == "csv":
+        return iter_csv_records(store, usernames)
+    if fmt == "jsonl":
+        return iter_jsonl_records(store, usernames)
+    if fmt == "zip":
+        return _zip([("records.csv", iter_csv_records(store, usernames)),
+                     ("records.jsonl", iter_jsonl_records(store, usernames))])
+    raise ValueError(fmt)
+
+
+@timed("transfer.spool")
+def spool(chunks):
+    """조각들을 임시 파일에 흘려 쓴 뒤 한 번에 읽어 bytes 로 돌려준다 (다운로드 버튼용)
+    만드는 동안 조각 목록과 합친 bytes 를 함께 들고 있지 않게 하고, 파일은 여기서 닫는다"""
+    with tempfile.TemporaryFile(prefix="export_") as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.seek(0)
+        return f.read()
+
+
+# -------------------- 가져오기 --------------------
+class BadLine(ValueError):
+    """한 줄이 형식에 맞지 않음"""
+
+
+def _date(v):
+    try:
+        return datetime.strptime(str(v), "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise BadLine(f"날짜 형식 오류: {v!r}")
+
+
+def _str(obj, key, limit=20000):
+    v = obj.get(key, "")
+    if not isinstance(v, str):
+        raise BadLine(f"{key} 는 문자열이어야 합니다")
+    if len(v) > limit:
+        raise BadLine(f"{key} 가 너무 깁니다")
+    return v
+
+
+def _scalar(v):
+    # CSV 값: 숫자처럼 보이면 숫자로 (슬라이더 답은 원래 정수)
+    if isinstance(v, str):
+        try:
+            return int(v)
+        except ValueError:
+            try:
+                return float(v)
+            except ValueError:
+                return v
+    return v
+
+
+def _attachment(a, blobs):
+    """첨부 참조 하나를 허용한 필드로만 다시 만든다. 원본이 없으면 None (첨부 없는 내보내기)"""
+    if not isinstance(a, dict) or not valid_sha(a.get("sha")):
+        raise BadLine("첨부 sha 가 올바르지 않습니다")
+    if a.get("kind") not in ATTACHMENT_KINDS:
+        raise BadLine(f"알 수 없는 첨부 종류: {a.get('kind')!r}")
+    if blobs is None or not blobs.exists(a["sha"]):
+        return None
+    fields = {k: a.get(k) or "" for k in ("name", "mime")}
+    att = {"sha": a["sha"], "kind": a["kind"], "name": _str(fields, "name", 255), "mime": _str(fields, "mime", 100)}
+    size = a.get("size")
+    if isinstance(size, int) and not isinstance(size, bool) and size >= 0:
+        att["size"] = size
+    return att
+
+
+def validate(obj, username, blobs=None):
+    """한 줄 검사 → (종류, 날짜, 저장할 값). 형식이 틀리면 BadLine"""
+    if not isinstance(obj, dict):
+        raise BadLine("JSON 객체가 아닙니다")
+    kind = obj.get("type")
+    if kind == "memory":
+        d = _date(obj.get("date"))
+        item = {"title": _str(obj, "title", 500), "text": _str(obj, "text")}
+        if not item["title"] and not item["text"]:
+            raise BadLine("제목과 내용이 모두 비어 있습니다")
+        if obj.get("ts"):
+            item["ts"] = _str(obj, "ts", 40)
+        atts = [att for att in (_attachment(a, blobs) for a in obj.get("attachments") or []) if att]
+        if atts:
+            item["attachments"] = atts
+        return kind, d, item
+    if kind == "deco":
+        d = _date(obj.get("date"))
+        conf = {}
+        if "bg" in obj:
+            conf["bg"] = _str(obj, "bg", 32)
+        if "radius" in obj:
+            conf["radius"] = _str(obj, "radius", 16)
+        stickers = obj.get("stickers", [])
+        if not isinstance(stickers, list) or not all(isinstance(s, str) for s in stickers):
+            raise BadLine("stickers 는 문자열 목록이어야 합니다")
+        if stickers:
+            conf["stickers"] = stickers[:20]
+        return kind, d, conf
+    if kind == "record":
+        d = _date(obj.get("date"))
+        if obj.get("username", username) != username:
+            raise BadLine("다른 사용자의 기록은 가져올 수 없습니다")
+        answers = obj.get("answers")
+        if not isinstance(answers, dict) or not answers:
+            raise BadLine("answers 가 없습니다")
+        if any(not isinstance(v, (str, int, float, bool)) for v in answers.values()):
+            raise BadLine("answers 값 형식 오류")
+        return kind, d, {"username": username, "date": d, "answers": answers, "memo": _str(obj, "memo")}
+    if kind == "export":
+        return kind, None, None
+    raise BadLine(f"알 수 없는 type: {kind!r}")
+
+
+def _jsonl_objects(fileobj):
+    for n, raw in enumerate(io.TextIOWrapper(fileobj, encoding="utf-8-sig"), 1):
+        if not raw.strip():
+            continue
+        try:
+            yield n, json.loads(raw)
+        except ValueError:
+            yield n, BadLine("JSON 해석 실패")
+
+
+def _csv_objects(fileobj):
+    reader = csv.DictReader(io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline=""))
+    cols = set(reader.fieldnames or [])
+    if {"date", "title", "text"} <= cols:
+        for row in reader:
+            yield reader.line_num, {"type": "memory", **{k: row.get(k) or "" for k in ("date", "title", "text", "ts")}}
+    elif {"username", "date", "item", "value"} <= cols:
+        # 긴 형식 → (사용자, 날짜) 가 바뀔 때마다 기록 하나 (내보낸 파일은 그 순서로 정렬돼 있다)
+        cur, line = None, 0
+        for row in reader:
+            key = (row["username"], row["date"])
+            if cur is None or (cur["username"], cur["date"]) != key:
+                if cur is not None:
+                    yield line, cur
+                cur, line = {"type": "record", "username": key[0], "date": key[1], "answers": {}, "memo": ""}, reader.line_num
+            if row["item"] == "memo":
+                cur["memo"] = row["value"]
+            else:
+                cur["answers"][row["item"]] = _scalar(row["value"])
+        if cur is not None:
+            yield line, cur
+    else:
+        yield 1, BadLine("알 수 없는 CSV 열 구성")
+
+
+def _zip_objects(fileobj, blobs, report):
+    with zipfile.ZipFile(fileobj) as zf:
+        names = zf.namelist()
+        # 첨부 원본 먼저 (추억 줄의 첨부 참조가 살아 있도록)
+        for name in names:
+            if name.startswith("attachments/") and not name.endswith("/"):
+                with zf.open(name) as f:
+                    try:
+                        _, _, new = blobs.put_stream(f)
+                        report["attachments"] += int(new)
+                    except BlobTooLarge:
+                        report["errors"].append((name, "첨부 파일이 너무 큽니다"))
+        if "data.jsonl" in names:
+            with zf.open("data.jsonl") as f:
+                yield from _jsonl_objects(f)
+        elif "records.csv" in names:
+            with zf.open("records.csv") as f:
+                yield from _csv_objects(f)
+
+
+class _Batch:
+    def __init__(self, store, username):
+        self.store, self.username = store, username
+        self.mems, self.decos, self.recs = [], {}, []
+        self.seen_recs = set()
+
+    def __len__(self): return len(self.mems) + len(self.decos) + len(self.recs)
+
+    def flush(self, report):
+        store, user = self.store, self.username
+        if self.mems:
+            # 이미 있는 추억(같은 날, 같은 제목/내용/시각)은 건너뛴다 — 달마다 한 번만 읽는다
+            existing = {}
+            fresh = []
+            for d, it in self.mems:
+                ym = d[:7]
+                if ym not in existing:
+                    existing[ym] = {(dd, x.get("title"), x.get("text"), x.get("ts"))
+                                    for dd, xs in store.load_mems_month(user, ym)["memories"].items() for x in xs}
+                key = (d, it.get("title"), it.get("text"), it.get("ts"))
+                if key in existing[ym]:
+                    report["skipped"] += 1
+                else:
+                    existing[ym].add(key)
+                    fresh.append((d, it))
+            if fresh:
+                store.add_memories(user, fresh)
+                report["memories"] += len(fresh)
+        if self.decos:
+            store.put_decos(user, self.decos)
+            report["decos"] += len(self.decos)
+        if self.recs:
+            store.append_records(self.recs)
+            report["records"] += len(self.recs)
+        self.mems, self.decos, self.recs = [], {}, []
+
+    def add(self, kind, d, value, report):
+        if kind == "memory":
+            self.mems.append((d, value))
+        elif kind == "deco":
+            self.decos[d] = value
+        elif kind == "record":
+            if d in self.seen_recs or self.store.has_record(self.username, d):
+                report["skipped"] += 1
+            else:
+                self.seen_recs.add(d)
+                self.recs.append(value)
+
+
+@timed("transfer.import")
+def import_file(store, username, fileobj, name="", batch=IMPORT_BATCH):
+    """업로드 파일(JSONL/ZIP/CSV)을 검사하며 batch 건씩 저장. 결과 요약 dict"""
+    report = {"memories": 0, "decos": 0, "records": 0, "attachments": 0, "skipped": 0, "errors": []}
+    blobs = get_blobs()
+    ext = os.path.splitext(name)[1].lower().lstrip(".")
+    if ext == "zip":
+        objects = _zip_objects(fileobj, blobs, report)
+    elif ext == "csv":
+        objects = _csv_objects(fileobj)
+    else:
+        objects = _jsonl_objects(fileobj)
+
+    pending = _Batch(store, username)
+    try:
+        for n, obj in objects:
+            try:
+                if isinstance(obj, BadLine):
+                    raise obj
+                kind, d, value = validate(obj, username, blobs)
+            except BadLine as e:
+                if len(report["errors"]) < MAX_IMPORT_ERRORS:
+                    report["errors"].append((n, str(e)))
+                continue
+            if d is not None:
+                pending.add(kind, d, value, report)
+            if len(pending) >= batch:
+                pending.flush(report)
+    except (zipfile.BadZipFile, UnicodeDecodeError) as e:
+        report["errors"].append((0, f"파일을 읽을 수 없습니다: {e}"))
+    pending.flush(report)
+    return report
+
+
+# -------------------- CLI --------------------
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) >= 2 and args[0] == "export":
+        fmt = args[2] if len(args) > 2 else "zip"
+        out = sys.stdout.buffer
+        for chunk in iter_export(storage.get_store(), args[1], fmt):
+            out.write(chunk)
+        out.flush()
+    elif len(args) >= 3 and args[0] == "import":
+        with open(args[2], "rb") as f:
+            result = import_file(storage.get_store(), args[1], f, name=args[2])
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        print("사용법: python transfer.py export <아이디> [zip|jsonl|csv] > 파일\n"
+              "        python transfer.py import <아이디> <파일>")
+        sys.exit(2)